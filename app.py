@@ -35,28 +35,53 @@ if current_dir not in sys.path:
     sys.path.append(current_dir)
 
 # --- 引用後端服務 ---
-from backend.services.climate_service import ClimateService
+from backend.services.climate_service import ClimateService, HOURLY_SOURCES
 from backend.services.resource_service import ResourceService
 from backend.services.market_service import MarketService
 from backend.services.simulation_service import SimulationService
+from backend.services.grid_service import GridService, GRID_METRICS
+from backend.services.optimizer_service import OptimizerService, OPT_OBJECTIVES, design_capex
+from backend.services.sweep_service import SweepService
+from backend.models.light_suitability import classify_ppfd
+from backend.models.greenhouse_physics import design_hour_ventilation, hourly_heat_balance
+from backend.models.extreme_wind import structure_cost_factor
+from backend.models.heat_events import HEAT_WAVE_TMAX, HEAT_WAVE_MIN_DAYS, RUN_LABELS
 
 
 # ==========================================
 # 2. 系統初始化 (實例化服務)
 # ==========================================
-climate_svc = ClimateService(base_folder='data/weather_data')
+# ClimateService 內含各測站的解析結果 (StationDataset)，跨 rerun 共用同一個實例
+@st.cache_resource
+def get_climate_service():
+    return ClimateService(base_folder='data/weather_data')
+
+climate_svc = get_climate_service()
+
+# MarketService 同樣跨 rerun 共用，資料夾有變動時才重新讀取
+@st.cache_resource
+def get_market_service():
+    return MarketService(base_folder='data/market_data')
 
 base_dir = os.path.dirname(os.path.abspath(__file__))
 data_path = os.path.join(base_dir, 'data')
 resource_svc = ResourceService(data_path=data_path)
 
-market_svc = MarketService(base_folder='data/market_data')
+market_svc = get_market_service()
+
+# 全臺網格適性圖 (結果依設計與氣候內容快取於 data/cache/grid)
+@st.cache_resource
+def get_grid_service():
+    return GridService(get_climate_service())
+
+grid_svc = get_grid_service()
 sim_svc = SimulationService()
+opt_svc = OptimizerService(SweepService(sim_svc))
 
-# 透過服務載入資料
+# 透過服務載入資料 (氣象/市場資料為增量更新：只重讀新增、變更的檔案)
 CROP_DB = resource_svc.load_crop_database()
-WEATHER_DB = climate_svc.scan_and_load_weather_data()
-MARKET_DB = market_svc.scan_and_load_market_prices()
+WEATHER_DB = climate_svc.refresh_weather_data()
+MARKET_DB = market_svc.refresh_market_prices()
 COST_DB = resource_svc.load_cost_parameters()
 
 
@@ -65,17 +90,16 @@ COST_DB = resource_svc.load_cost_parameters()
 gps_file_path = 'data/station_coords.csv'
 if os.path.exists(gps_file_path):
     try:
-        df_gps = pd.read_csv(gps_file_path)
-        gps_dict = df_gps.set_index('StationName').to_dict('index')
-        for key in WEATHER_DB.keys():
-            for gps_name, coords in gps_dict.items():
-                if gps_name in key: 
-                    WEATHER_DB[key]['lat'] = coords['Lat']
-                    WEATHER_DB[key]['lon'] = coords['Lon']
-                    break
+        # 站名完全相同者直接查表，其餘才做子字串比對
+        climate_svc.attach_station_coords(WEATHER_DB)
     except Exception as e:
         st.error(f"⚠️ 座標檔讀取錯誤: {e}")
 
+# 設計氣象條件 (0.4% / 1% / 2% 超越機率；各站只算一次並存於磁碟快取)
+climate_svc.attach_design_conditions(WEATHER_DB)
+# 實測氣溫日變化 (取代模擬中的 ±5°C 正弦)
+climate_svc.attach_diurnal_profiles(WEATHER_DB)
+
 # 載入設備庫
 FAN_DB = resource_svc.load_equipment_csv('equipment_data', 'greenhouse_fans.csv', 'fan')
 CIRC_DB = resource_svc.load_equipment_csv('equipment_data', 'greenhouse_fans.csv', 'fan', 'Category', 'Circulation')
@@ -120,6 +144,36 @@ with st.sidebar:
         index=default_index  
     )
     CURR_LOC = WEATHER_DB[loc_id]
+
+    # 氣候年份：典型年 (全部年份平均) / 最差年 / 指定年份 (逐年統計已快取，不必重讀 CSV)
+    loc_years = climate_svc.available_years(CURR_LOC['filename']) if CURR_LOC.get('filename') else []
+    if loc_years:
+        year_choice = st.selectbox(
+            "氣候年份", [None, 'worst'] + loc_years,
+            format_func=lambda y: "典型年 (全部年份平均)" if y is None else ("最差年 (夏季最熱)" if y == 'worst' else f"{y} 年"),
+            help="最差年：資料完整的年份中，月均最高溫平均最高的一年；該年缺資料的月份以全部年份平均補上"
+        )
+        if year_choice is not None:
+            year_data = climate_svc.get_year_summary(CURR_LOC['filename'], year_choice)
+            if year_data: CURR_LOC = {**CURR_LOC, 'data': year_data}
+            if year_choice == 'worst' and year_data and 'year' in year_data: st.caption(f"最差年：{year_data['year']} 年")
+
+    # 自訂場址：以鄰近測站反距離權重 (IDW) 內插的虛擬測站
+    if st.checkbox("📍 自訂場址座標 (虛擬測站)", value=False, help="場址位於測站之間時，以最近幾個測站依距離加權內插月氣候；逐時/光環境分析使用最近測站"):
+        v1, v2 = st.columns(2)
+        v_lat = v1.number_input("緯度", value=float(CURR_LOC.get('lat') or 23.5), step=0.01, format="%.4f")
+        v_lon = v2.number_input("經度", value=float(CURR_LOC.get('lon') or 120.5), step=0.01, format="%.4f")
+        v_k = st.slider("內插測站數", 1, 8, 4)
+        vs = climate_svc.virtual_station(v_lat, v_lon, k=v_k)
+        if vs:
+            nearest = vs['neighbors'][0]
+            CURR_LOC = {
+                'id': 'virtual', 'name': f"虛擬測站 ({v_lat:.3f}, {v_lon:.3f})", 'data': vs['data'],
+                'lat': v_lat, 'lon': v_lon, 'filename': nearest['filename'],
+                'description': "鄰近測站：" + "、".join(f"{nb['id']} {nb['distance_km']:.1f} km ({nb['weight']*100:.0f}%)" for nb in vs['neighbors'])
+            }
+        else:
+            st.warning("沒有可用的測站座標 (station_coords.csv)")
     st.caption(CURR_LOC.get('description', ''))
     if 'market_prices' not in st.session_state: st.session_state.market_prices = CURR_LOC['data']['marketPrice'].copy()
 
@@ -168,6 +222,11 @@ with tab1:
     st.markdown("---")
     st.subheader("🗺️ 氣象站位置")
     with st.expander("點擊查看氣象站位置", expanded=False):
+        # 區域適性網格：以 Tab 2 目前的溫室設計，對全臺每個格子內插氣候並模擬
+        g1, g2, g3 = st.columns([1.2, 1, 1])
+        show_grid = g1.checkbox("疊加區域適性網格", value=False, help="以鄰近測站反距離內插各格氣候，套用目前的溫室設計計算；離測站 30 km 以上的格子不顯示")
+        grid_metric = g2.selectbox("網格指標", list(GRID_METRICS.keys()), format_func=lambda k: GRID_METRICS[k])
+        grid_km = g3.selectbox("網格解析度 (km)", [1.0, 2.0, 5.0], index=1)
         map_data = []
         for key, value in WEATHER_DB.items():
             lat = value.get('lat') or value.get('latitude')
@@ -182,6 +241,29 @@ with tab1:
             })
         df_map = pd.DataFrame(map_data)
         m = folium.Map(location=[23.7, 121.0], zoom_start=7)
+        if show_grid:
+            if 'gh_specs' in st.session_state:
+                grid_crops = st.session_state.monthly_crops
+                grid_design = {
+                    'gh_specs': st.session_state.gh_specs, 'fan_specs': st.session_state.fan_specs,
+                    'crops': grid_crops, 'density': st.session_state.planting_density,
+                    'cycles': st.session_state.annual_cycles, 'prices': st.session_state.market_prices,
+                    'crop_db': CROP_DB, 'mat_db': MAT_DB,
+                    'seedling_unit_cost': sim_svc.seedling_unit_costs(grid_crops, CROP_DB)[0],
+                }
+                with st.spinner("計算全臺網格中..."):
+                    raster = grid_svc.evaluate(grid_design, grid_metric, cell_km=grid_km, workers=0)
+                if raster is not None:
+                    lat_min, lat_max, lon_min, lon_max = raster['bounds']
+                    worse_high = grid_metric != 'netRevenue' and grid_metric != 'totalYield'
+                    folium.raster_layers.ImageOverlay(
+                        image=GridService.to_rgba(raster['values'], reverse=worse_high),
+                        bounds=[[lat_min, lon_min], [lat_max, lon_max]], opacity=0.55, name=GRID_METRICS[grid_metric]
+                    ).add_to(m)
+                    st.caption(f"{GRID_METRICS[grid_metric]}：{np.nanmin(raster['values']):,.0f} ~ {np.nanmax(raster['values']):,.0f} "
+                               f"({'紅 = 低、綠 = 高' if not worse_high else '綠 = 低、紅 = 高'}；{raster['values'].shape[0]}×{raster['values'].shape[1]} 格)")
+            else:
+                st.info("請先開啟「2. 內部微氣候」設定溫室後再疊加網格。")
         for _, row in df_map.iterrows():
             is_current = (row['name'] == CURR_LOC['name'])
             icon_color = 'red' if is_current else 'green'
@@ -193,6 +275,14 @@ with tab1:
                 icon=folium.Icon(color=icon_color, icon=icon_type)
             ).add_to(m)
             
+        if CURR_LOC.get('id') == 'virtual':
+            folium.Marker(
+                location=[CURR_LOC['lat'], CURR_LOC['lon']],
+                popup=f"<b>{CURR_LOC['name']}</b><br>{CURR_LOC['description']}",
+                tooltip=CURR_LOC['name'],
+                icon=folium.Icon(color='blue', icon='home')
+            ).add_to(m)
+            
         st_folium(m, width=1000, height=500, use_container_width=True, returned_objects=[])
 
     st.subheader(f"📍 {CURR_LOC['name']} - 氣候數據")
@@ -248,6 +338,98 @@ with tab1:
         st.plotly_chart(fig2, use_container_width=True)
 
     
+    # --- 年際變異 ---
+    if CURR_LOC.get('filename'):
+        inter_stats = climate_svc.get_interannual_stats(CURR_LOC['filename'])
+        if inter_stats is not None and 'Temp_Mean' in inter_stats:
+            with st.expander("📈 年際變異 (各年份月平均比較)", expanded=False):
+                yearly_mon = climate_svc.get_yearly_monthly(CURR_LOC['filename'])
+                t_stats = inter_stats['Temp_Mean']
+                fig_yr = go.Figure()
+                fig_yr.add_trace(go.Scatter(x=list(t_stats.index) + list(t_stats.index[::-1]), y=list(t_stats['max']) + list(t_stats['min'][::-1]),
+                                            fill='toself', fillcolor='rgba(245,158,11,0.2)', line=dict(width=0), name='年際範圍', hoverinfo='skip'))
+                for yr, grp in yearly_mon['Temp_Mean'].groupby(level='Year'):
+                    fig_yr.add_trace(go.Scatter(x=grp.index.get_level_values('Month'), y=grp.values, mode='lines+markers', name=f"{yr} 年"))
+                fig_yr.update_layout(height=320, template="plotly_dark", margin=dict(l=10, r=10, t=30, b=10),
+                                     xaxis=dict(title="月份", dtick=1), yaxis=dict(title="月均溫 (°C)"))
+                st.plotly_chart(fig_yr, use_container_width=True)
+
+                df_var = pd.DataFrame({
+                    '月份': t_stats.index,
+                    '均溫 平均': t_stats['mean'].round(1), '均溫 標準差': t_stats['std'].round(2),
+                    '最冷年': t_stats['min_year'], '最熱年': t_stats['max_year'],
+                })
+                if 'Solar_Sum' in inter_stats:
+                    df_var['日射 標準差 (MJ/m²)'] = inter_stats[('Solar_Sum', 'std')].round(2).values
+                tmy_sel = climate_svc.tmy_selection(CURR_LOC['filename'])
+                if tmy_sel is not None:
+                    df_var['TMY 選用年'] = tmy_sel['Year'].where(tmy_sel['Year'] > 0).values
+                    df_var['TMY FS 分數'] = tmy_sel['FS'].round(3).values
+                st.dataframe(df_var, use_container_width=True, hide_index=True)
+
+    # --- 極端高溫事件 (逐時資料統計) ---
+    if CURR_LOC.get('filename'):
+        heat = climate_svc.get_heat_events()
+        if heat is not None and CURR_LOC['filename'] in heat['stations']:
+            with st.expander("🔥 極端高溫事件 (連續高溫時數 / 熱浪)", expanded=False):
+                h_idx = heat['stations'].index(CURR_LOC['filename'])
+                h_years = max(heat['years'][h_idx], 1e-9)
+                thr_labels = [f"≥{t:g}°C" for t in heat['thresholds']]
+                thr_sel = st.radio("高溫門檻", range(len(thr_labels)), format_func=lambda j: thr_labels[j], horizontal=True, key="heat_thr")
+
+                hc1, hc2, hc3, hc4 = st.columns(4)
+                hc1.metric("高溫時數 (時/年)", f"{heat['hours'][h_idx, thr_sel] / h_years:.0f}")
+                hc2.metric("連續事件 (次/年)", f"{heat['events'][h_idx, thr_sel] / h_years:.0f}")
+                hc3.metric("最長連續 (小時)", f"{heat['max_run'][h_idx, thr_sel]}")
+                hc4.metric("熱浪天數 (天/年)", f"{heat['heatwave_days'][h_idx] / h_years:.1f}", help=f"日最高溫 ≥{HEAT_WAVE_TMAX:g}°C 連續 {HEAT_WAVE_MIN_DAYS} 天以上")
+
+                prob = heat['exceed_prob'][h_idx, thr_sel] * 100
+                fig_hp = go.Figure(data=go.Heatmap(z=prob, x=list(range(24)), y=list(range(1, 13)), colorscale='YlOrRd', zmin=0, zmax=100,
+                                                   colorbar=dict(title="%"), hovertemplate="%{y}月 %{x}時：%{z:.0f}%<extra></extra>"))
+                fig_hp.update_layout(height=320, template="plotly_dark", margin=dict(l=10, r=10, t=30, b=10),
+                                     title=f"各月各時 氣溫{thr_labels[thr_sel]} 機率", xaxis=dict(title="時", dtick=2), yaxis=dict(title="月", dtick=1, autorange='reversed'))
+                st.plotly_chart(fig_hp, use_container_width=True)
+
+                fig_run = go.Figure(go.Bar(x=RUN_LABELS, y=heat['run_hist'][h_idx, thr_sel] / h_years, marker_color='#ef4444'))
+                fig_run.update_layout(height=250, template="plotly_dark", margin=dict(l=10, r=10, t=30, b=10),
+                                      title="連續高溫事件長度分布", xaxis_title="連續時數", yaxis_title="次/年")
+                st.plotly_chart(fig_run, use_container_width=True)
+
+                st.caption("各測站比較 (每年平均)")
+                st.dataframe(climate_svc.heat_event_table(heat).round(1).sort_values(f"Hours_{heat['thresholds'][thr_sel]:g}", ascending=False),
+                             use_container_width=True, hide_index=True)
+
+    # --- 颱風陣風極值 (最大瞬間風速) ---
+    if CURR_LOC.get('filename'):
+        gust = climate_svc.get_extreme_wind()
+        if gust is not None and CURR_LOC['filename'] in gust['stations']:
+            with st.expander("🌀 颱風陣風極值 (回歸期設計風速)", expanded=False):
+                g_idx = gust['stations'].index(CURR_LOC['filename'])
+                gc1, gc2, gc3 = st.columns(3)
+                gc1.metric("紀錄最大陣風", f"{gust['max_gust'][g_idx]:.1f} m/s",
+                           help=f"{pd.Timestamp(int(gust['max_gust_time'][g_idx])):%Y-%m-%d %H:%M}，風向 {gust['max_gust_dir'][g_idx]:.0f}°")
+                gc2.metric("50 年回歸期 (Gumbel)", f"{gust['gumbel_levels'][g_idx, list(gust['return_periods']).index(50)]:.1f} m/s")
+                g_annual = gust['basis'][g_idx] == 'annual'
+                gc3.metric("50 年回歸期 (GEV)", f"{gust['gev_levels'][g_idx, list(gust['return_periods']).index(50)]:.1f} m/s" if g_annual else "—")
+                if not g_annual:
+                    st.caption(f"資料僅 {gust['n_months'][g_idx]} 個月，以月最大值配適後換算年回歸期 (不提供 GEV)；長回歸期外插僅供參考，結構設計陣風不低於紀錄最大陣風")
+
+                fig_rp = go.Figure()
+                fig_rp.add_trace(go.Scatter(x=gust['return_periods'], y=gust['gumbel_levels'][g_idx], mode='lines+markers', name='Gumbel', line=dict(color='#38bdf8')))
+                if g_annual: fig_rp.add_trace(go.Scatter(x=gust['return_periods'], y=gust['gev_levels'][g_idx], mode='lines+markers', name='GEV', line=dict(color='#f97316', dash='dash')))
+                fig_rp.add_hline(y=float(COST_DB.get('Wind_Design_Base_Speed', 40)), line_dash="dot", line_color="#94a3b8", annotation_text="標準結構抗風等級")
+                fig_rp.update_layout(height=300, template="plotly_dark", margin=dict(l=10, r=10, t=30, b=10),
+                                     xaxis=dict(title="回歸期 (年)", type='log'), yaxis_title="設計陣風 (m/s)")
+                st.plotly_chart(fig_rp, use_container_width=True)
+
+                fig_dir = go.Figure(go.Barpolar(r=gust['dir_hist'][g_idx], theta=gust['direction_labels'], marker_color='#a78bfa'))
+                fig_dir.update_layout(height=280, template="plotly_dark", margin=dict(l=10, r=10, t=30, b=10), title="月最大陣風風向")
+                st.plotly_chart(fig_dir, use_container_width=True)
+
+                st.caption("各測站比較 (Gumbel，m/s)")
+                st.dataframe(climate_svc.extreme_wind_table(gust).round(1).sort_values('50yr', ascending=False),
+                             use_container_width=True, hide_index=True)
+
     # --- 光環境適性分析 (Tab 1 下半部) ---
     st.markdown("---")
     st.subheader(f"☀️ {CURR_LOC['name']} - 光環境適性分析")
@@ -298,16 +480,10 @@ with tab1:
                 #每小時MJ / m²換算 μmol / m² / s ，PPFD = MJ / m² * 1000000(MJ換算成J) * 45 % (有效光波長) * 4.57(太陽光，能量單位焦耳轉光子單位微莫耳的常數) / 3600 (秒) = 571
 
 
-        # 呼叫後端運算
-        matrix, dli_monthly = climate_svc.calculate_monthly_light_matrix(target_filename, transmittance_percent=trans_rate)
+        # 呼叫後端運算 (各站 12×24 基礎矩陣已快取，調整滑桿只做陣列縮放)
+        matrix, dli_monthly = climate_svc.calculate_monthly_light_matrix(target_filename, transmittance_percent=trans_rate, ppfd_coef=ppfd_coef)
         
         if matrix is not None:
-            # [關鍵修正] 在前端進行係數校正
-            # 原本後端是用 571.2 算的，我們把它還原再乘上新的係數
-            correction_factor = ppfd_coef / 571.2
-            matrix = matrix * correction_factor
-            dli_monthly = dli_monthly * correction_factor
-            
             with c_set2:
                 # -----------------------------------------------------------
                 # [圖表 1] DLI 分析
@@ -335,22 +511,16 @@ with tab1:
             z_values = matrix.values.round(0)
             
             # 2. 建立顏色分類矩陣 (0, 1, 2)
-            z_category = np.zeros_like(z_values)
-            z_category[(z_values >= comp_point) & (z_values <= sat_point)] = 1
-            z_category[z_values > sat_point] = 2
+            z_category = classify_ppfd(z_values, comp_point, sat_point)
             
             # 3. ★★★ 關鍵修改：在 Python 裡先把每一格的 Hover 文字組好 ★★★
-            # 這樣 Plotly 只要負責顯示就好，不用處理變數，保證能顯示數字
-            hover_text_matrix = []
-            for y_idx, month in enumerate(matrix.index):
-                row_txt = []
-                for x_idx, hour in enumerate(matrix.columns):
-                    val = z_values[y_idx][x_idx]
-                    # 直接組合成 HTML 字串
-                    txt = (f"<b>{int(month)}月 {int(hour)}:00</b><br>"
-                           f"平均 PPFD: <b>{int(val)}</b> μmol<br>")
-                    row_txt.append(txt)
-                hover_text_matrix.append(row_txt)
+            # 這樣 Plotly 只要負責顯示就好，不用處理變數，保證能顯示數字 (以陣列廣播一次組完 12×24 格)
+            month_txt = matrix.index.values.astype(int).astype(str)[:, None]
+            hour_txt = matrix.columns.values.astype(int).astype(str)[None, :]
+            val_txt = z_values.astype(int).astype(str)
+            hover_text_matrix = np.char.add(np.char.add(np.char.add(np.char.add(np.char.add(
+                "<b>", month_txt), "月 "), hour_txt), ":00</b><br>平均 PPFD: <b>"), val_txt)
+            hover_text_matrix = np.char.add(hover_text_matrix, "</b> μmol<br>").tolist()
 
             # 4. 定義 Excel 風格色票
             excel_colors = [
@@ -394,6 +564,19 @@ with tab1:
             cl2.markdown(f"🟨 **適當範圍** ({int(comp_point)}~{int(sat_point)})")
             cl3.markdown(f"🟥 **超過光飽和點** (>{int(sat_point)})")
             
+            # -----------------------------------------------------------
+            # [圖表 3] 全部測站排名 (同一作物、同一透光率)
+            # -----------------------------------------------------------
+            with st.expander(f"🏆 {sel_crop} 各測站光環境排名", expanded=False):
+                site_files = [v['filename'] for v in WEATHER_DB.values() if v.get('filename')]
+                suit = climate_svc.batch_light_suitability(site_files, crop_data, transmittance_percent=trans_rate, ppfd_coef=ppfd_coef)
+                if suit is not None:
+                    df_rank = climate_svc.rank_sites(suit, sel_crop)
+                    df_rank.columns = ['測站', '適當範圍 (時/年)', '低於補償點 (時/年)', '超過飽和點 (時/年)', 'DLI 不足量 (mol/m²/年)', 'DLI 不足月數']
+                    st.dataframe(df_rank.round(1), use_container_width=True, hide_index=True)
+                else:
+                    st.info("沒有可用的日射量資料。")
+            
         else:
             st.warning(f"⚠️ 讀取數據失敗：請確認 `{target_filename}` 格式是否正確。")
     else:
@@ -410,7 +593,8 @@ with tab2:
             w = st.number_input("寬度 (m)", value=50.0, step=1.0)
             l = st.number_input("長度 (m)", value=200.0, step=1.0)
             h = st.number_input("簷高 (m)", value=6.0, step=0.5)
-            r_type = st.selectbox("屋頂形式", ["Venlo", "Tunnel", "SingleSlope"])
+            roof_types = ["Venlo", "Tunnel", "SingleSlope"]
+            r_type = st.selectbox("屋頂形式", roof_types)
             r_angle = st.slider("屋頂角度 (°)", 0, 45, 22)
             m_key = st.selectbox("覆蓋材料", list(MAT_DB.keys()), format_func=lambda x: MAT_DB[x]['label']) if MAT_DB else 'glass'
 
@@ -424,7 +608,8 @@ with tab2:
                 st.session_state['sel_fan_power'] = f_power
             else: 
                 f_flow = 40000; f_power = 1000; st.session_state['sel_fan_power'] = 1000
-            f_count = st.number_input("排風扇數量 (台)", value=50, step=1)
+            if 'f_count' not in st.session_state: st.session_state['f_count'] = 50
+            f_count = st.number_input("排風扇數量 (台)", step=1, key='f_count')
 
             st.markdown("---")
             if not CIRC_DB.empty:
@@ -432,15 +617,18 @@ with tab2:
             c_count = st.number_input("循環扇數量 (台)", value=40, step=1)
 
         with st.expander("3. 環控與內裝 (Controls)", expanded=True):
-            shading = st.slider("遮蔭率 (%)", 0, 90, 40)
+            if 'shading' not in st.session_state: st.session_state['shading'] = 40
+            shading = st.slider("遮蔭率 (%)", 0, 90, key='shading')
             if not NET_DB.empty:
                 n_idx = st.selectbox("防蟲網規格", NET_DB.index, format_func=lambda x: NET_DB['Label'][x])
                 try: i_net = float(NET_DB.loc[n_idx, 'Openness_Percent'])
                 except: i_net = 70.0
             else: i_net = st.slider("網通風率 (%)", 0, 100, 70)
             c_type = st.selectbox("栽培系統", ["NFT", "DFT", "Soil", "Pot"])
-            r_vent = st.number_input("天窗面積 (m²)", value=3000.0)
-            s_vent = st.number_input("側窗面積 (m²)", value=1000.0)
+            if 'r_vent' not in st.session_state: st.session_state['r_vent'] = 3000.0
+            if 's_vent' not in st.session_state: st.session_state['s_vent'] = 1000.0
+            r_vent = st.number_input("天窗面積 (m²)", key='r_vent')
+            s_vent = st.number_input("側窗面積 (m²)", key='s_vent')
 
         with st.expander("4. 噴霧系統 (Fogging)", expanded=True):
             if not FOG_DB.empty:
@@ -459,20 +647,121 @@ with tab2:
         'width': w, 'length': l, 'gutterHeight': h, 'material': m_key,
         'roofVentArea': r_vent, 'sideVentArea': s_vent, 'shadingScreen': shading, 'insectNet': i_net,
         '_vol_coef': (1 + avg_h/h) * vol_map.get(c_type, 1.2), '_surf_coef': 1 / math.cos(rad), 
-        '_vent_eff': (1.0 + math.sin(rad)*0.5) * (i_net/100)*0.8
+        '_vent_eff': (1.0 + math.sin(rad)*0.5) * (i_net/100)*0.8,
+        # 通風效率的屋頂結構部分 (耦合通風模型只用這部分，防蟲網改由流量係數計算)
+        '_vent_struct': 1.0 + math.sin(rad)*0.5
     }
+    # 屋頂幾何透光修正：三種屋頂形式在同一角度下一次算完，選用的那組寫入 gh_specs
+    roof_trans = climate_svc.roof_transmittance(CURR_LOC['filename'], [(t, r_angle) for t in roof_types], lat=CURR_LOC.get('lat')) if CURR_LOC.get('filename') else None
+    if roof_trans is not None: gh_specs['_trans_coef'] = roof_trans['monthly'][roof_types.index(r_type)].tolist()
     fan_specs = {'exhaustCount': f_count, 'exhaustFlow': f_flow, 'circCount': c_count, 'circDistance': 15}
     st.session_state.gh_specs = gh_specs; st.session_state.fan_specs = fan_specs
 
-    res = sim_svc.run_simulation(
-        gh_specs, fan_specs, CURR_LOC['data'], 
-        st.session_state.monthly_crops, st.session_state.planting_density, 
-        st.session_state.annual_cycles, st.session_state.market_prices,
-        CROP_DB, MAT_DB
-    )
+    # --- 設計時刻排風扇選型 (以超越機率設計值取代月平均) ---
+    design_cond = CURR_LOC.get('design')
+    if design_cond is None and CURR_LOC.get('filename'):
+        design_cond = climate_svc.get_design_conditions([CURR_LOC['filename']]).get(CURR_LOC['filename'])
+    if design_cond is not None:
+        with ci:
+            with st.expander("5. 設計時刻選型 (Design Hour)", expanded=False):
+                lv_idx = st.radio("超越機率", range(len(design_cond['levels'])), index=1, horizontal=True,
+                                  format_func=lambda i: f"{design_cond['levels'][i]:g}%", help="全年只有這個比例的小時比設計值更熱")
+                d_db = float(design_cond['DB'][lv_idx]); d_rh = float(design_cond['MCRH'][lv_idx])
+                d_wind = float(np.nan_to_num(design_cond['MCWind'][lv_idx]))
+                solar_basis = st.radio("設計日射", ["同時日射 (高溫時段平均)", "日射設計值 (保守)"], horizontal=True)
+                d_solar = float(np.nan_to_num(design_cond['MCSolar' if solar_basis.startswith("同時") else 'Solar'][lv_idx]))
+                max_rise = st.slider("允許室內外溫差 ΔT (°C)", 1.0, 10.0, 3.0, 0.5)
+                if st.checkbox("以無風狀態選型 (不計風力通風)", value=True, help="排風扇需在無風的炎熱時刻也能獨立維持溫差；開啟浮力 + 風力耦合通風時仍計入浮力通風"): d_wind = 0.0
+                sizing = design_hour_ventilation(gh_specs, fan_specs, MAT_DB, d_solar, d_wind, max_rise, t_out=d_db,
+                                                 ventilation='coupled' if st.session_state.get('vent_coupled') else 'wind')
+
+                st.caption(f"設計時刻：乾球 {d_db:.1f}°C、同時濕度 {d_rh:.0f}%、日射 {d_solar:.0f} W/m²、風速 {d_wind:.1f} m/s")
+                dc1, dc2 = st.columns(2)
+                dc1.metric("建議排風扇", f"{sizing['exhaustCount']} 台", delta=f"{sizing['exhaustCount'] - f_count:+d} 台", delta_color="off")
+                dc2.metric("目前設計時刻室溫", f"{d_db + sizing['rise']:.1f}°C", delta=f"ΔT {sizing['rise']:.1f}°C", delta_color="inverse")
+                st.button("套用建議台數", on_click=lambda n=sizing['exhaustCount']: st.session_state.update(f_count=n))
+
+    # --- 設計最佳化：預算內搜尋排風扇台數 / 遮蔭率 / 天窗 / 側窗面積 ---
+    with ci:
+        with st.expander("6. 設計最佳化 (Optimizer)", expanded=False):
+            opt_obj = st.radio("最佳化目標", list(OPT_OBJECTIVES), format_func=lambda k: OPT_OBJECTIVES[k][0], horizontal=True)
+            ob1, ob2 = st.columns(2)
+            opt_fans = ob1.slider("排風扇台數", 0, 300, (0, 150))
+            opt_shade = ob2.slider("遮蔭率 (%)", 0, 90, (0, 70), key='opt_shade')
+            opt_roof = ob1.slider("天窗面積 (m²)", 0, 10000, (1000, 5000), step=100, key='opt_roof')
+            opt_side = ob2.slider("側窗面積 (m²)", 0, 5000, (0, 2000), step=100, key='opt_side')
+            cur_capex = float(design_capex(pd.DataFrame([{'exhaustCount': f_count, 'shadingScreen': shading, 'roofVentArea': r_vent, 'sideVentArea': s_vent}]), gh_specs, COST_DB)[0])
+            opt_budget = st.number_input("建置預算 (萬元)", value=int(round(cur_capex / 10000 * 1.1)), step=100,
+                                         help=f"目前設計約 {cur_capex/10000:,.0f} 萬元 (溫室結構 + 天/側窗 + 遮蔭/防蟲網 + 排風扇，COST_DB 單價)")
+            opt_parallel = st.checkbox("平行運算 (行程池)", value=True)
+            opt_tmy = st.checkbox("以典型氣象年 (TMY) 逐時評估", value=False, help="每組設計跑 8760 小時的熱平衡 / 通風 / 噴霧；較月平均模型慢")
+            if st.button("🔍 執行最佳化"):
+                opt_hourly = None
+                if opt_tmy:
+                    tmy_record = climate_svc.hourly_record(CURR_LOC['filename'], 'tmy') if CURR_LOC.get('filename') else None
+                    if tmy_record is None: st.warning("此測站無法建立典型氣象年，改用月平均模型")
+                    else: opt_hourly = {'record': tmy_record, 'fog': {'capacity': fog_cap, 'trigger': fog_trig},
+                                        'trans_mh': roof_trans['hourly'][roof_types.index(r_type)] if roof_trans is not None else None}
+                with st.spinner("搜尋設計中..."):
+                    st.session_state['opt_result'] = opt_svc.optimize(
+                        gh_specs, fan_specs, CURR_LOC['data'], st.session_state.monthly_crops, st.session_state.planting_density,
+                        st.session_state.annual_cycles, st.session_state.market_prices, CROP_DB, MAT_DB, COST_DB,
+                        bounds={'exhaustCount': opt_fans, 'shadingScreen': opt_shade, 'roofVentArea': opt_roof, 'sideVentArea': opt_side},
+                        objective=opt_obj, budget=opt_budget * 10000, workers=None if opt_parallel else 1,
+                        ventilation='coupled' if st.session_state.get('vent_coupled') else 'wind', hourly=opt_hourly)
+            opt = st.session_state.get('opt_result')
+            if opt is not None:
+                if not opt['feasible']:
+                    st.warning("預算內沒有可行的設計，請提高預算或放寬範圍")
+                else:
+                    st.caption(f"目標：{OPT_OBJECTIVES[opt['objective']][0]}｜評估 {opt['evaluations']:,} 組設計，耗時 {opt['elapsed']:.2f} 秒")
+                    best = opt['best']
+                    st.dataframe(pd.DataFrame({
+                        '排風扇': best['exhaustCount'].astype(int), '遮蔭 %': best['shadingScreen'].astype(int),
+                        '天窗 m²': best['roofVentArea'].round(0), '側窗 m²': best['sideVentArea'].round(0),
+                        '淨收益 (萬)': (best['netRevenue'] / 10000).round(1), '扣折舊 (萬)': (best['netProfit'] / 10000).round(1),
+                        '7月室溫': best['maxSummerTemp'].round(2), '建置成本 (萬)': (best['capex'] / 10000).round(0),
+                        '年折舊 (萬)': (best['capexAnnual'] / 10000).round(1)}), hide_index=True, use_container_width=True)
+                    b = best.iloc[0]
+                    st.button("套用最佳設計", on_click=lambda b=b: st.session_state.update(
+                        f_count=int(b['exhaustCount']), shading=int(b['shadingScreen']),
+                        r_vent=float(round(b['roofVentArea'])), s_vent=float(round(b['sideVentArea']))))
+
+    # 模擬模式：月平均模型 / 逐時模型 (測站全紀錄或典型氣象年每小時跑熱平衡、通風、噴霧，再彙整成逐月與年度)
+    with cr:
+        hourly_mode = st.toggle("⏱️ 逐時模擬", value=False, help="以每一小時的氣溫、日射、風速計算，逐月與年度結果由逐時結果彙整；關閉時使用月平均模型")
+        hourly_src = st.radio("逐時氣象", list(HOURLY_SOURCES), format_func=HOURLY_SOURCES.get, horizontal=True, disabled=not hourly_mode,
+                              help="測站全紀錄：所有實測小時；典型氣象年：每月選最接近長期分佈的一年拼成 8760 小時，較快且不受缺測年份影響")
+        vent_model = 'coupled' if st.toggle("🌬️ 浮力 + 風力通風 (耦合求解)", value=False, key='vent_coupled', help="自然通風量隨室內外溫差 (煙囪效應)、簷高與防蟲網開孔率的流量係數變動，與室溫迭代求解；屋頂角度的結構修正照樣套用，防蟲網效果改由流量係數計算 (取代通風效率中的網材部分)。關閉時為原本只看風速的公式") else 'wind'
+        transient_mode = st.toggle("🧱 熱慣性 (暫態模型)", value=False, disabled=not hourly_mode, help="逐時模式下，室溫改用空氣 + 地面/作物蓄熱體的暫態模型：白天蓄熱、夜間放熱，尖峰室溫延遲且較低")
+    res = None
+    if hourly_mode:
+        h_record = climate_svc.hourly_record(CURR_LOC['filename'], hourly_src) if CURR_LOC.get('filename') else None
+        if h_record is not None:
+            res = sim_svc.run_hourly_simulation(
+                gh_specs, fan_specs, h_record,
+                st.session_state.monthly_crops, st.session_state.planting_density,
+                st.session_state.annual_cycles, st.session_state.market_prices, CROP_DB, MAT_DB,
+                fog={'capacity': fog_cap, 'trigger': fog_trig},
+                trans_mh=roof_trans['hourly'][roof_types.index(r_type)] if roof_trans is not None else None,
+                transient=transient_mode, ventilation=vent_model)
+        with cr:
+            if res is None: st.warning("此測站沒有完整的逐時資料，改用月平均模型")
+            else: st.caption(f"逐時模擬 ({HOURLY_SOURCES[hourly_src]})：{len(res['hourly']['Time']):,} 小時 (約 {res['years']:.1f} 年)，耗時 {res['elapsed']*1000:.0f} ms")
+    if res is None:
+        res = sim_svc.run_simulation_vectorized(
+            gh_specs, fan_specs, CURR_LOC['data'], 
+            st.session_state.monthly_crops, st.session_state.planting_density, 
+            st.session_state.annual_cycles, st.session_state.market_prices,
+            CROP_DB, MAT_DB, ventilation=vent_model
+        )
     
     with cr:
         st.markdown(f"""<div style="background-color:#1e293b; padding:15px; border-radius:10px; border:1px solid #334155; margin-bottom:20px;"><strong style="color:#38bdf8">📊 物理模型參數</strong><br>• 溫室體積: {w*l*h*gh_specs['_vol_coef']:.0f} m³ (熱緩衝係數 {gh_specs['_vol_coef']:.2f})<br>• 總換氣率: {(f_count*f_flow)/3600*3600 / (w*l*h*gh_specs['_vol_coef']) if (w*l*h)>0 else 0:.1f} 次/小時 (ACH)<br>• 通風效率: {gh_specs['_vent_eff']*100:.0f}% (受結構與防蟲網影響)</div>""", unsafe_allow_html=True)
+        if roof_trans is not None:
+            coef = roof_trans['monthly']
+            st.caption(f"☀️ 屋頂入射角透光修正 ({r_angle}°，夏 7 月 / 冬 1 月)：" + "｜".join(
+                f"{'**' if t == r_type else ''}{t} {coef[k, 6]*100:.0f}% / {coef[k, 0]*100:.0f}%{'**' if t == r_type else ''}" for k, t in enumerate(roof_types)))
         df_sim = pd.DataFrame(res['data'])
         
         fig_sim = make_subplots(specs=[[{"secondary_y": True}]])
@@ -510,12 +799,13 @@ with tab2:
             for i, fname in enumerate(weather_files):
                 if current_id in fname: default_idx = i; break
             sel_f = st.selectbox("選擇氣候檔", weather_files, index=default_idx)
-            df_hourly = climate_svc.read_hourly_data(sel_f)
-            if df_hourly is not None:
-                d_strs = sorted(df_hourly['Time'].dt.strftime('%Y-%m-%d').unique(), reverse=True)
+            # 逐時 mmap 儲存：日期清單與單日切片都直接由日期索引取得
+            hourly_store = climate_svc.get_hourly_store(sel_f)
+            if hourly_store is not None:
+                d_strs = hourly_store.available_dates()
                 sel_date = st.selectbox("選擇日期", d_strs)
-                df_day = df_hourly[df_hourly['Time'].dt.strftime('%Y-%m-%d') == sel_date].copy().sort_values('Time')
-                df_day = df_day[df_day['Time'].dt.hour != 0]
+                df_day = hourly_store.day_frame(sel_date)
+                df_day = df_day[df_day['Time'].dt.hour != 0].copy()
                 if not df_day.empty: st.info(f"📊 {sel_date} 氣候摘要：\n\n• 均溫: {df_day['Temp'].mean():.1f}°C\n• 總日射: {df_day['Solar'].sum():.1f} MJ/m²")
                 else: st.warning("該日期無有效資料")
             else: st.error("讀取失敗")
@@ -524,27 +814,15 @@ with tab2:
             for col in ['Temp', 'Solar', 'Wind']:
                 if col in df_day.columns: df_day[col] = pd.to_numeric(df_day[col], errors='coerce')
                 else: df_day[col] = np.nan
-            df_day['Temp'].fillna(25.0, inplace=True); df_day['Solar'].fillna(0.0, inplace=True); df_day['Wind'].fillna(0.5, inplace=True)
+            df_day['Temp'] = df_day['Temp'].fillna(25.0); df_day['Solar'] = df_day['Solar'].fillna(0.0); df_day['Wind'] = df_day['Wind'].fillna(0.5)
             df_day['Solar_W'] = df_day['Solar'] * 277.78
             
-            res_24h = []
-            mat_info = MAT_DB.get(m_key, {'uValue':5.8, 'trans':0.9})
-            u_val = mat_info['uValue']; trans = mat_info['trans'] * (1 - shading/100)
-            surf_ratio = gh_specs.get('_surf_coef', 1.05); total_roof_area = (w * l) * surf_ratio 
-            
-            for _, row in df_day.iterrows():
-                t_out_h = row['Temp']; solar_h = row['Solar']; wind_h = row['Wind']
-                q_solar = (solar_h * 1000000 / 3600) * (w*l) * trans 
-                tot_vent = (wind_h * (r_vent + s_vent) * 0.4 * (i_net/100) * gh_specs['_vent_eff']) + ((f_count * f_flow) / 3600)
-                q_fog = (fog_cap * (w*l) * 2450 / 3600) * 0.8 if (fog_cap > 0 and t_out_h > fog_trig) else 0
-                surface_area = total_roof_area + 2*(w+l)*h
-                q_remove = (tot_vent * 1200) + (u_val * surface_area)
-                delta_t = (q_solar - q_fog) / q_remove if q_remove > 0 else 0
-                t_in_h = t_out_h + delta_t
-                if t_in_h < t_out_h - 2: t_in_h = t_out_h - 2
-                res_24h.append(t_in_h)
-            
-            df_day['TempIn'] = res_24h
+            # 逐時屋頂透光修正 (該月該時的太陽位置) + 與逐時模式相同的熱平衡 (陣列運算)
+            day_trans = climate_svc.roof_transmittance(sel_f, [(r_type, r_angle)])
+            trans_day = day_trans['hourly'][0][df_day['Time'].dt.month.to_numpy() - 1, df_day['Time'].dt.hour.to_numpy()] if day_trans is not None else 1.0
+            balance = hourly_heat_balance(gh_specs, fan_specs, MAT_DB, df_day['Temp'].to_numpy(), df_day['Solar'].to_numpy(), df_day['Wind'].to_numpy(),
+                                          trans_coef=trans_day, fog={'capacity': fog_cap, 'trigger': fog_trig}, ventilation=vent_model)
+            df_day['TempIn'] = balance['t_in']
             fig_24 = make_subplots(specs=[[{"secondary_y": True}]])
             fig_24.add_trace(go.Scatter(x=df_day['Time'].dt.hour, y=df_day['Solar_W'], name="日射強度 (W/m²)", mode='lines', line=dict(width=0), fill='tozeroy', fillcolor='rgba(245, 158, 11, 0.4)', marker=dict(color='#f59e0b')), secondary_y=True)
             fig_24.add_trace(go.Scatter(x=df_day['Time'].dt.hour, y=df_day['Temp'], name="外氣溫", mode='lines+markers', line=dict(color='#e2e8f0', width=2, dash='dot'), marker=dict(size=4)), secondary_y=False)
@@ -695,11 +973,11 @@ with tab3:
     # ==========================================
     
     # 執行物理模擬
-    res_sim = SimulationService.run_simulation(
+    res_sim = SimulationService.run_simulation_vectorized(
         st.session_state.gh_specs, st.session_state.fan_specs, CURR_LOC['data'], 
         st.session_state.monthly_crops, st.session_state.planting_density, 
         st.session_state.annual_cycles, st.session_state.market_prices, 
-        CROP_DB, MAT_DB
+        CROP_DB, MAT_DB, ventilation='coupled' if st.session_state.get('vent_coupled') else 'wind'
     )
     df_sim = pd.DataFrame(res_sim['data'])
     if 'price' not in df_sim.columns: df_sim['price'] = st.session_state.market_prices
@@ -727,6 +1005,20 @@ with tab3:
     
     capex_struct = area_m2 * float(COST_DB.get('Greenhouse_Structure_Price', 5500))
     life_struct = float(COST_DB.get('Structure_Life_Year', 20))
+
+    # 颱風：設計陣風超過標準結構抗風等級時，結構造價加成
+    wind_base = float(COST_DB.get('Wind_Design_Base_Speed', 40))
+    with st.expander("🌀 抗風結構 (颱風設計陣風)", expanded=False):
+        wind_T = st.select_slider("設計回歸期 (年)", options=[10, 20, 50, 100], value=50)
+        wind_gust = climate_svc.design_gust(CURR_LOC['filename'], wind_T) if CURR_LOC.get('filename') else None
+        if wind_gust is None:
+            st.caption("此測站沒有陣風資料")
+        else:
+            wind_factor = float(structure_cost_factor(wind_gust, wind_base, float(COST_DB.get('Wind_Structure_Premium', 0.3))))
+            wc1, wc2 = st.columns(2)
+            wc1.metric(f"{wind_T} 年設計陣風", f"{wind_gust:.1f} m/s", delta=f"標準 {wind_base:.0f} m/s", delta_color="off")
+            wc2.metric("結構造價倍率", f"×{wind_factor:.2f}")
+            if st.checkbox("依設計陣風調整結構造價", value=False): capex_struct *= wind_factor
     capex_fans = st.session_state.fan_specs['exhaustCount'] * float(COST_DB.get('Fan_Unit_Price', 16000))
     life_fans = float(COST_DB.get('Fan_Life_Year', 5))
     depr_annual = (capex_struct / life_struct) + (capex_fans / life_fans)
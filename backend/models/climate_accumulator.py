@@ -0,0 +1,126 @@
+# 檔案位置: backend/models/climate_accumulator.py
+import numpy as np
+
+# 日統計欄位 → (來源變數, 統計方式)；與 StationDataset.daily() 的欄位一致
+DAILY_FIELDS = {
+    'Temp_Mean': ('Temp', 'mean'), 'Temp_Max': ('Temp', 'max'), 'Temp_Min': ('Temp', 'min'),
+    'Solar_Sum': ('Solar', 'sum'), 'Wind_Mean': ('Wind', 'mean'), 'RH_Mean': ('RH', 'mean'),
+}
+
+
+def _months_of(days):
+    """日序 (1970-01-01 起算的天數) → 月份 1..12"""
+    return days.astype('datetime64[D]').astype('datetime64[M]').astype('int64') % 12 + 1
+
+
+class MonthlyAccumulator:
+    """
+    逐時資料 → 日統計 → 月平均 的線上累加器
+    每批 (chunk) 只保留「最後一天」尚未結束的累加值，其餘日統計立即併入 12 個月的
+    sum/count，因此記憶體用量與檔案長度無關。
+    結果與 resample('D') + groupby(month).mean() 相同 (缺漏日的日射量以 0 計)，
+    前提是氣象欄位全空的列也要傳進來 (只要時間有效)：這些日子同樣在 resample 的日序內，
+    日射量以 0 計、其他欄位不計；第一筆到最後一筆之間完全沒有列的日子由 _settle 補齊。
+    資料需大致依時間排序；已結算日子若又出現有效值，會記入 out_of_order。
+    """
+    def __init__(self, variables):
+        self.variables = [v for v in ['Temp', 'Solar', 'Wind', 'RH'] if v in variables]
+        self.fields = [f for f, (v, _) in DAILY_FIELDS.items() if v in self.variables]
+        self.month_sum = {f: np.zeros(13) for f in self.fields}
+        self.month_cnt = {f: np.zeros(13) for f in self.fields}
+        self.pending = None     # (day, {var: [sum, count, max, min]})
+        self.last_day = None    # 最後一個已結算的日序
+        self.rows = 0
+        self.out_of_order = 0
+
+    def add(self, days, values):
+        """
+        days: int64 日序陣列；values: {var: float 陣列} (NaN 表缺值)
+        """
+        if len(days) == 0: return
+        self.rows += len(days)
+        order = np.argsort(days, kind='stable')
+        days = days[order]
+        uniq, starts = np.unique(days, return_index=True)
+
+        # 各日 sum / count / max / min
+        stats = {}
+        for v in self.variables:
+            x = values[v][order]
+            valid = ~np.isnan(x)
+            stats[v] = [
+                np.add.reduceat(np.where(valid, x, 0.0), starts),
+                np.add.reduceat(valid.astype('int64'), starts),
+                np.maximum.reduceat(np.where(valid, x, -np.inf), starts),
+                np.minimum.reduceat(np.where(valid, x, np.inf), starts),
+            ]
+
+        # 與上一批未結束的那一天合併
+        if self.pending is not None:
+            p_day, p_stats = self.pending
+            hit = np.searchsorted(uniq, p_day)
+            if hit < len(uniq) and uniq[hit] == p_day:
+                for v in self.variables:
+                    s, c, mx, mn = stats[v]
+                    ps, pc, pmx, pmn = p_stats[v]
+                    s[hit] += ps; c[hit] += pc
+                    mx[hit] = max(mx[hit], pmx); mn[hit] = min(mn[hit], pmn)
+            else:
+                uniq = np.insert(uniq, hit, p_day)
+                for v in self.variables:
+                    stats[v] = [np.insert(a, hit, p) for p, a in zip(p_stats[v], stats[v])]
+
+        # 已結算過的日子又出現：全為缺值的列直接略過 (CWA 檔尾常附土壤含水量補遺列)
+        if self.last_day is not None:
+            late = uniq <= self.last_day
+            if late.any():
+                empty = np.all([stats[v][1] == 0 for v in self.variables], axis=0) if self.variables else late
+                self.out_of_order += int((late & ~empty).sum())
+                keep = ~(late & empty)
+                uniq = uniq[keep]
+                for v in self.variables: stats[v] = [a[keep] for a in stats[v]]
+                if len(uniq) == 0: return
+
+        # 最後一天保留到下一批，其餘結算
+        self.pending = (uniq[-1], {v: [a[-1] for a in stats[v]] for v in self.variables})
+        if len(uniq) > 1:
+            self._settle(uniq[:-1], {v: [a[:-1] for a in stats[v]] for v in self.variables})
+
+    def _settle(self, days, stats):
+        months = _months_of(days)
+        for f in self.fields:
+            var, how = DAILY_FIELDS[f]
+            s, c, mx, mn = stats[var]
+            has = c > 0
+            if how == 'sum':
+                daily, ok = s, np.ones(len(days), dtype=bool)
+            elif how == 'mean':
+                daily, ok = np.divide(s, c, out=np.zeros(len(days)), where=has), has
+            elif how == 'max':
+                daily, ok = mx, has
+            else:
+                daily, ok = mn, has
+            self.month_sum[f] += np.bincount(months[ok], weights=daily[ok], minlength=13)
+            self.month_cnt[f] += np.bincount(months[ok], minlength=13)
+
+        # resample('D') 會補齊中間缺漏的日子：日射日總量以 0 計入
+        new_days = days if self.last_day is None else days[days > self.last_day]
+        if len(new_days) == 0: return
+        if 'Solar_Sum' in self.fields:
+            start = new_days[0] if self.last_day is None else self.last_day + 1
+            full = np.arange(start, new_days[-1] + 1)
+            gaps = full[~np.isin(full, new_days)]
+            if len(gaps): self.month_cnt['Solar_Sum'] += np.bincount(_months_of(gaps), minlength=13)
+        self.last_day = new_days[-1]
+
+    def finish(self):
+        """結算最後一天，回傳 {欄位: 12 個月平均 (無資料為 NaN)}"""
+        if self.pending is not None:
+            p_day, p_stats = self.pending
+            self._settle(np.array([p_day]), {v: [np.array([a]) for a in p_stats[v]] for v in self.variables})
+            self.pending = None
+        result = {}
+        for f in self.fields:
+            cnt = self.month_cnt[f][1:]
+            result[f] = np.divide(self.month_sum[f][1:], cnt, out=np.full(12, np.nan), where=cnt > 0)
+        return result
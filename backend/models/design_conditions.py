@@ -0,0 +1,86 @@
+# 檔案位置: backend/models/design_conditions.py
+"""
+設計氣象條件 (參考 ASHRAE 的年超越機率 0.4% / 1% / 2%)
+乾球溫度、日射量為逐時紀錄的上側分位數；相對濕度、日射、風速為「同時發生值」：
+氣溫達到乾球設計值的那些小時的平均 (mean coincident)。
+多測站先補成等長矩陣 (NaN 補齊)，排序一次後以索引內插取分位數，不逐站迴圈。
+"""
+import numpy as np
+
+# 年超越機率 (%)
+DESIGN_LEVELS = (0.4, 1.0, 2.0)
+# 1 MJ/m²/h → W/m²
+MJ_H_TO_W = 1_000_000 / 3600
+
+
+def _pad(arrays):
+    """不等長的 1 維陣列 → (n, 最長) 矩陣，不足處補 NaN"""
+    n = len(arrays)
+    width = max((len(a) for a in arrays), default=0)
+    out = np.full((n, width), np.nan)
+    for i, a in enumerate(arrays): out[i, :len(a)] = a
+    return out
+
+
+def upper_quantiles(values, levels):
+    """
+    每列的上側分位數 (忽略 NaN，線性內插，同 np.nanquantile 的 linear 方法)
+    values: (n, m)；levels: 超越機率 (%)
+    回傳 (n, L)；整列無資料時為 NaN
+    """
+    s = np.sort(values, axis=1)                      # NaN 排在最後
+    count = (~np.isnan(values)).sum(axis=1)
+    q = 1 - np.asarray(levels, dtype='float64') / 100.0
+    pos = (count[:, np.newaxis] - 1) * q[np.newaxis, :]
+    lo = np.floor(pos).astype('int64')
+    hi = np.minimum(lo + 1, np.maximum(count[:, np.newaxis] - 1, 0))
+    lo = np.clip(lo, 0, max(s.shape[1] - 1, 0))
+    frac = pos - lo
+    if s.shape[1] == 0: return np.full(pos.shape, np.nan)
+    v_lo = np.take_along_axis(s, lo, axis=1)
+    v_hi = np.take_along_axis(s, hi, axis=1)
+    out = v_lo + (v_hi - v_lo) * frac
+    return np.where(count[:, np.newaxis] > 0, out, np.nan)
+
+
+def _coincident_mean(values, mask):
+    """mask 為 True 的位置取平均 (忽略 NaN)：(n, m), (n, L, m) → (n, L)"""
+    v = values[:, np.newaxis, :]
+    use = mask & ~np.isnan(v)
+    total = np.where(use, v, 0.0).sum(axis=-1)
+    count = use.sum(axis=-1)
+    return np.divide(total, count, out=np.full(total.shape, np.nan), where=count > 0)
+
+
+def design_conditions(temp_list, solar_list=None, rh_list=None, wind_list=None, levels=DESIGN_LEVELS):
+    """
+    多測站設計條件 (一次向量化)
+    *_list: 每站的逐時陣列 (同一站各變數等長、逐列對齊)；缺變數的站給 None 或全 NaN
+    回傳 dict (n = 測站數, L = 超越機率數)：
+      levels : (L,) 超越機率 (%)
+      DB     : (n, L) 乾球溫度設計值 (°C)
+      Solar  : (n, L) 日射設計值 (W/m²)，與氣溫無關的逐時日射分位數
+      MCRH   : (n, L) 同時相對濕度 (%)
+      MCSolar: (n, L) 同時日射 (W/m²)
+      MCWind : (n, L) 同時風速 (m/s)
+      Hours  : (n,) 有效氣溫時數
+    """
+    n = len(temp_list)
+    levels = np.asarray(levels, dtype='float64')
+    temp = _pad(temp_list)
+    other = lambda lst: _pad([np.full(len(t), np.nan) if (lst is None or lst[i] is None) else lst[i]
+                              for i, t in enumerate(temp_list)])
+    solar, rh, wind = other(solar_list), other(rh_list), other(wind_list)
+
+    db = upper_quantiles(temp, levels)
+    with np.errstate(invalid='ignore'):
+        hot = temp[:, np.newaxis, :] >= db[:, :, np.newaxis]     # (n, L, m)
+    return {
+        'levels': levels,
+        'DB': db,
+        'Solar': upper_quantiles(solar, levels) * MJ_H_TO_W,
+        'MCRH': _coincident_mean(rh, hot),
+        'MCSolar': _coincident_mean(solar, hot) * MJ_H_TO_W,
+        'MCWind': _coincident_mean(wind, hot),
+        'Hours': (~np.isnan(temp)).sum(axis=1).reshape(n),
+    }
@@ -0,0 +1,50 @@
+# 檔案位置: backend/models/diurnal_profile.py
+"""
+實測日變化曲線庫：各測站 × 12 個月 × 24 小時 × 變數 的平均值
+取代月模擬中固定的 ±5°C 正弦日變化 (DIURNAL_OFFSET)。
+所有測站一次以 bincount (測站×月×時 分組) 算完，存成 float32 四維陣列。
+"""
+import numpy as np
+
+from backend.models.greenhouse_physics import DIURNAL_OFFSET
+from backend.models.station_dataset import stack_hourly
+
+PROFILE_VARIABLES = ['Temp', 'Solar', 'RH', 'Wind']
+
+
+def diurnal_profiles(time_list, columns_list, variables=PROFILE_VARIABLES):
+    """
+    多測站平均日變化
+    time_list: 每站 int64 ns 時間；columns_list: 每站 {變數: 逐時陣列} (缺變數可省略)
+    回傳 float32 (測站, 12, 24, 變數)；缺少的整點以該月其餘時段平均補上，整月無資料為 NaN
+    """
+    n = len(time_list)
+    values = [[np.asarray(cols[v], dtype='float64') if v in cols else np.full(len(t), np.nan)
+               for t, cols in zip(time_list, columns_list)] for v in variables]
+    station, hours, stacked, _ = stack_hourly(time_list, *values)
+    t = hours.astype('datetime64[h]')
+    cell = station * 288 + (t.astype('datetime64[M]').astype('int64') % 12) * 24 + hours % 24
+
+    out = np.full((n, 12, 24, len(variables)), np.nan)
+    for j, x in enumerate(stacked):
+        ok = ~np.isnan(x)
+        total = np.bincount(cell[ok], weights=x[ok], minlength=n * 288)
+        count = np.bincount(cell[ok], minlength=n * 288)
+        out[..., j] = np.divide(total, count, out=np.full(n * 288, np.nan), where=count > 0).reshape(n, 12, 24)
+
+    valid = ~np.isnan(out)
+    hours_ok = valid.sum(axis=2, keepdims=True)
+    month_mean = np.divide(np.where(valid, out, 0.0).sum(axis=2, keepdims=True), hours_ok,
+                           out=np.full(hours_ok.shape, np.nan), where=hours_ok > 0)
+    return np.where(np.isnan(out), month_mean, out).astype('float32')
+
+
+def temperature_offsets(temp_profile):
+    """
+    氣溫日變化 → 相對於日平均的偏差 (..., 12, 24)，可直接取代 DIURNAL_OFFSET
+    整月無資料的月份退回正弦日變化
+    """
+    p = np.asarray(temp_profile, dtype='float64')
+    offsets = p - p.mean(axis=-1, keepdims=True)
+    missing = np.isnan(offsets).any(axis=-1, keepdims=True)
+    return np.where(missing, DIURNAL_OFFSET, offsets)
@@ -0,0 +1,208 @@
+# 檔案位置: backend/models/extreme_wind.py
+"""
+極端風速 (颱風) 分析：由逐時「最大瞬間風速/風向」取區段最大值 (月、年)，
+以 L-moments 配適 Gumbel 與 GEV 分佈，推估各回歸期的設計陣風。
+全部測站接成一條陣列、補成等長矩陣後一次計算 (不依賴 scipy)。
+
+資料年數少於 MIN_ANNUAL_YEARS 時改用「月最大值」配適，再以 F_年 = F_月^12 換算成年回歸期
+(假設各月獨立同分佈；颱風季集中在夏秋，會略為低估，資料年數足夠時以年最大值為準)。
+月最大值配適時 GEV 的形狀參數沒有意義 (同一年的月份並非同分佈)，gev_levels 一律為 NaN。
+"""
+import math
+import numpy as np
+
+from backend.models.station_dataset import stack_hourly
+
+# 回歸期 (年)
+RETURN_PERIODS = (2, 5, 10, 20, 50, 100)
+# 年最大值至少要有這麼多年才採用；否則用月最大值
+MIN_ANNUAL_YEARS = 10
+# 月/年區段的有效資料比例下限 (缺太多的區段最大值會偏低)
+MIN_MONTH_COVERAGE = 0.5
+MIN_YEAR_MONTHS = 10
+# GEV 形狀參數範圍 (樣本少時避免尾端發散)
+GEV_SHAPE_LIMIT = 0.3
+# 區段最大值少於此數時 GEV 退回 Gumbel (k = 0)：樣本太少估不出形狀參數
+MIN_GEV_BLOCKS = 20
+# 風向 8 方位 (以 0° 為北，順時針)
+DIRECTION_LABELS = ['N', 'NE', 'E', 'SE', 'S', 'SW', 'W', 'NW']
+EULER_GAMMA = 0.5772156649015329
+
+_gamma = np.vectorize(math.gamma, otypes=[float])
+
+
+def _pad_rows(values, owner, n):
+    """依 owner (已排序) 把一維值排成 (n, 最多筆數) 矩陣，不足處補 NaN"""
+    counts = np.bincount(owner, minlength=n)
+    width = int(counts.max()) if n else 0
+    out = np.full((n, width), np.nan)
+    col = np.arange(len(owner)) - np.repeat(np.cumsum(counts) - counts, counts)
+    out[owner, col] = values
+    return out
+
+
+def lmoments(samples):
+    """
+    每列樣本的前三個 L-moments (忽略 NaN)：回傳 (l1, l2, t3)，各為 (n,)
+    以無偏機率加權動差 b0/b1/b2 計算 (Hosking 1990)
+    """
+    x = np.sort(samples, axis=1)                     # NaN 排在最後
+    m = (~np.isnan(samples)).sum(axis=1).astype('float64')
+    i = np.arange(x.shape[1], dtype='float64')[np.newaxis, :]   # 0-based 排名
+    v = np.nan_to_num(x)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        b0 = v.sum(axis=1) / m
+        b1 = (v * i / (m[:, np.newaxis] - 1)).sum(axis=1) / m
+        b2 = (v * i * (i - 1) / ((m[:, np.newaxis] - 1) * (m[:, np.newaxis] - 2))).sum(axis=1) / m
+        l1 = b0
+        l2 = 2 * b1 - b0
+        l3 = 6 * b2 - 6 * b1 + b0
+        t3 = l3 / l2
+    l2 = np.where(m >= 2, l2, np.nan)
+    t3 = np.where(m >= 3, t3, np.nan)
+    return np.where(m >= 1, l1, np.nan), l2, t3
+
+
+def fit_gumbel(l1, l2):
+    """Gumbel 參數 (位置 xi, 尺度 alpha)"""
+    alpha = l2 / math.log(2)
+    return l1 - EULER_GAMMA * alpha, alpha
+
+
+def fit_gev(l1, l2, t3, n_blocks=None):
+    """
+    GEV 參數 (位置 xi, 尺度 alpha, 形狀 k；Hosking 記號，k > 0 為有上限的尾端)
+    形狀以 Hosking 近似式 k ≈ 7.8590c + 2.9554c² 求得；k≈0 或樣本 (n_blocks) 少於 MIN_GEV_BLOCKS 時退回 Gumbel
+    """
+    c = 2 / (3 + t3) - math.log(2) / math.log(3)
+    k = np.clip(7.8590 * c + 2.9554 * c ** 2, -GEV_SHAPE_LIMIT, GEV_SHAPE_LIMIT)
+    k = np.where(np.isnan(k), 0.0, k)
+    if n_blocks is not None: k = np.where(np.asarray(n_blocks) < MIN_GEV_BLOCKS, 0.0, k)
+    small = np.abs(k) < 1e-6
+    ks = np.where(small, 1.0, k)
+    g = _gamma(1 + ks)
+    alpha = np.where(small, l2 / math.log(2), l2 * ks / ((1 - 2.0 ** -ks) * g))
+    xi = np.where(small, l1 - EULER_GAMMA * alpha, l1 + alpha * (g - 1) / ks)
+    return xi, alpha, np.where(small, 0.0, k)
+
+
+def gumbel_quantile(xi, alpha, prob):
+    """Gumbel 分位數 (可廣播)"""
+    return xi - alpha * np.log(-np.log(prob))
+
+
+def gev_quantile(xi, alpha, k, prob):
+    """GEV 分位數 (可廣播，k=0 時為 Gumbel)"""
+    y = -np.log(prob)
+    small = np.abs(k) < 1e-6
+    ks = np.where(small, 1.0, k)
+    return np.where(small, xi - alpha * np.log(y), xi + alpha / ks * (1 - y ** ks))
+
+
+def block_probability(return_periods, blocks_per_year):
+    """年回歸期 T → 單一區段的不超越機率 (1 - 1/T)^(1/每年區段數)"""
+    T = np.asarray(return_periods, dtype='float64')
+    bpy = np.asarray(blocks_per_year, dtype='float64')
+    return (1 - 1 / T[np.newaxis, :]) ** (1 / bpy[:, np.newaxis])
+
+
+def gust_extremes(time_list, gust_list, dir_list=None, return_periods=RETURN_PERIODS):
+    """
+    多測站陣風極值分析 (一次向量化)
+    time_list / gust_list / dir_list: 每站 int64 ns 時間、逐時最大瞬間風速 (m/s)、風向 (°)
+    回傳 dict (n = 測站數, R = 回歸期數)：
+      max_gust / max_gust_dir / max_gust_time : (n,) 紀錄最大陣風與其風向、時間 (ns)
+      calendar_max  : (n, 12) 各月份歷年最大陣風
+      annual_max    : (n, 年數) 各年最大陣風 (year_labels 為年份；資料不足的年為 NaN)
+      n_months / n_years : (n,) 有效月/年區段數
+      basis         : (n,) 'annual' 或 'monthly' (配適所用的區段)
+      gumbel        : (n, 2) [xi, alpha]；gev: (n, 3) [xi, alpha, k]
+      return_periods: (R,)；gumbel_levels / gev_levels : (n, R) 各回歸期設計陣風 (m/s)
+                      (gev_levels 只在 basis == 'annual' 時有值，月最大值配適的測站為 NaN)
+      dir_hist      : (n, 8) 月最大陣風的風向分佈 (DIRECTION_LABELS)
+    """
+    n = len(time_list)
+    if dir_list is None: dir_list = [np.full(len(t), np.nan) for t in time_list]
+    station, hours, (gust, direction), _ = stack_hourly(time_list, gust_list, dir_list)
+    valid = ~np.isnan(gust)
+    station, hours, gust, direction = station[valid], hours[valid], gust[valid], direction[valid]
+
+    # --- 月區段：同站同月在排序後是連續的一段 ---
+    month_abs = hours.astype('datetime64[h]').astype('datetime64[M]').astype('int64')
+    first = np.flatnonzero(np.r_[True, (station[1:] != station[:-1]) | (month_abs[1:] != month_abs[:-1])])
+    size = np.diff(np.r_[first, len(gust)])
+    b_station, b_month = station[first], month_abs[first]
+    b_max = np.maximum.reduceat(gust, first) if len(first) else np.zeros(0)
+    # 區段最大值所在列 (同值取第一筆)
+    row_block = np.repeat(np.arange(len(first)), size)
+    at_max = np.flatnonzero(gust == b_max[row_block])
+    _, pick = np.unique(row_block[at_max], return_index=True)
+    b_row = at_max[pick]
+
+    m_dt = b_month.astype('datetime64[M]')
+    hours_in_month = ((m_dt + 1).astype('datetime64[h]') - m_dt.astype('datetime64[h]')).astype('int64')
+    b_ok = size >= MIN_MONTH_COVERAGE * hours_in_month
+    b_year = b_month // 12 + 1970
+    b_moy = b_month % 12
+
+    out = {'return_periods': np.asarray(return_periods, dtype='float64'), 'direction_labels': DIRECTION_LABELS}
+    out['max_gust'] = np.full(n, np.nan)
+    np.fmax.at(out['max_gust'], b_station, b_max)
+    top = np.full(n, -1, dtype='int64')
+    is_top = b_max == out['max_gust'][b_station]
+    top[b_station[is_top][::-1]] = b_row[is_top][::-1]      # 同站多筆取最早一筆
+    out['max_gust_dir'] = np.where(top >= 0, direction[np.maximum(top, 0)] if len(direction) else np.nan, np.nan)
+    out['max_gust_time'] = np.where(top >= 0, hours[np.maximum(top, 0)] * 3_600_000_000_000 if len(hours) else 0, 0)
+
+    cal = np.full((n, 12), np.nan)
+    np.fmax.at(cal, (b_station, b_moy), b_max)
+    out['calendar_max'] = cal
+
+    # --- 年區段：由有效月份再取最大值 ---
+    years = np.unique(b_year) if len(b_year) else np.zeros(0, dtype='int64')
+    y_idx = np.searchsorted(years, b_year)
+    annual = np.full((n, len(years)), np.nan)
+    np.fmax.at(annual, (b_station[b_ok], y_idx[b_ok]), b_max[b_ok])
+    month_count = np.zeros((n, len(years)), dtype='int64')
+    np.add.at(month_count, (b_station[b_ok], y_idx[b_ok]), 1)
+    annual = np.where(month_count >= MIN_YEAR_MONTHS, annual, np.nan)
+    out['annual_max'], out['year_labels'] = annual, years
+    out['n_months'] = np.bincount(b_station[b_ok], minlength=n)
+    out['n_years'] = (~np.isnan(annual)).sum(axis=1)
+
+    # --- L-moments 配適 (兩種區段都算，依年數選用) ---
+    monthly = _pad_rows(b_max[b_ok], b_station[b_ok], n)
+    use_annual = out['n_years'] >= MIN_ANNUAL_YEARS
+    lm_m, lm_a = lmoments(monthly), lmoments(annual)
+    l1, l2, t3 = (np.where(use_annual, a, m) for a, m in zip(lm_a, lm_m))
+    out['basis'] = np.where(use_annual, 'annual', 'monthly')
+
+    g_xi, g_alpha = fit_gumbel(l1, l2)
+    e_xi, e_alpha, e_k = fit_gev(l1, l2, t3, np.where(use_annual, out['n_years'], out['n_months']))
+    out['gumbel'] = np.stack([g_xi, g_alpha], axis=-1)
+    out['gev'] = np.stack([e_xi, e_alpha, e_k], axis=-1)
+    prob = block_probability(return_periods, np.where(use_annual, 1, 12))
+    out['gumbel_levels'] = gumbel_quantile(g_xi[:, np.newaxis], g_alpha[:, np.newaxis], prob)
+    out['gev_levels'] = np.where(use_annual[:, np.newaxis],
+                                 gev_quantile(e_xi[:, np.newaxis], e_alpha[:, np.newaxis], e_k[:, np.newaxis], prob), np.nan)
+
+    # --- 月最大陣風的風向 (8 方位) ---
+    d = direction[b_row[b_ok]]
+    has_dir = ~np.isnan(d)
+    sector = (np.round(d[has_dir] / 45).astype('int64')) % 8
+    out['dir_hist'] = np.bincount(b_station[b_ok][has_dir] * 8 + sector, minlength=n * 8).reshape(n, 8)
+    return out
+
+
+def wind_pressure(speed):
+    """動態風壓 q = ½ρV² (Pa，ρ = 1.225 kg/m³)"""
+    return 0.5 * 1.225 * np.asarray(speed, dtype='float64') ** 2
+
+
+def structure_cost_factor(design_gust, base_speed, premium):
+    """
+    結構造價倍率：設計風壓超過標準結構的抗風等級時，
+    超出比例 × premium (受風力控制的構材占造價比例) 加到造價上；未超過時為 1
+    """
+    ratio = wind_pressure(design_gust) / wind_pressure(base_speed)
+    return 1 + premium * np.maximum(0.0, ratio - 1)
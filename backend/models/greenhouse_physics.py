@@ -0,0 +1,388 @@
+# 檔案位置: backend/models/greenhouse_physics.py
+"""
+溫室月平均物理模型 (NumPy 向量化版)
+與 SimulationService.run_simulation 的逐月公式相同，但氣候可以是任意形狀 (..., 12) 的陣列，
+例如 (網格數, 12)，一次算完所有格點；設計參數 (gh_specs / fan_specs) 可為純量，或 (設計數, 1) 陣列做批次比較。
+"""
+import math
+import numpy as np
+
+from backend.models.psychrometrics import PsychroModel
+from backend.models.station_dataset import hour_index
+from backend.models.ventilation import natural_ventilation, solve_coupled
+
+# 日變化：5 * sin((h - 9) * π / 12)，以 math.sin 預先算好 (與逐時迴圈版逐位元相同)
+DIURNAL_OFFSET = np.array([5 * math.sin((h - 9) * math.pi / 12) for h in range(24)])
+# 暫態模型 (transient_heat_balance)：地面/作物蓄熱體
+MASS_CAPACITY = 2.0e5      # 蓄熱量 J/m²·K (約 10 cm 潮濕土壤 + 作物)
+MASS_COUPLING = 10.0       # 蓄熱體與空氣的對流+輻射交換係數 W/m²·K
+SOLAR_TO_MASS = 0.7        # 室內日射被地面/作物吸收的比例 (其餘直接加熱空氣)
+# 自然通風模型：'wind' = 風速 × 窗面積 × 0.4 × 網 × 通風效率 (原公式)；'coupled' = 浮力 + 風力耦合求解 (ventilation.py)
+# 'coupled' 不用 _vent_eff：其中的屋頂結構修正改由 _vent_struct 帶入，防蟲網部分由流量係數 Cd 取代
+VENTILATION_MODELS = ('wind', 'coupled')
+
+
+_PSY = PsychroModel()
+
+
+def saturation_vapor_pressure(t_c, table=False):
+    """[ASAE標準] 飽和水氣壓 Pws (kPa)，陣列版 (PsychroModel.get_saturation_vapor_pressure_array)"""
+    return _PSY.get_saturation_vapor_pressure_array(t_c, table)
+
+
+# 逐點呼叫 PsychroModel (math.exp / log / pow)：NumPy 的 SIMD exp、log、**3 最後一位會與 libm 不同
+_exact_pws = np.frompyfunc(_PSY.get_saturation_vapor_pressure, 1, 1)
+
+
+def vpd(t_c, rh_percent, exact=False, table=False):
+    """
+    飽差 VPD (kPa)；exact=True 時飽和水氣壓逐點用 PsychroModel 計算 (與 run_simulation 逐位元相同)
+    table=True 時 -10~60°C 用 Pws 查表內插 (psychrometrics.PWS_TABLE_RANGE)
+    """
+    if not exact: return _PSY.get_vpd_array(t_c, rh_percent, table)
+    pws = _exact_pws(np.asarray(t_c, dtype='float64')).astype('float64')
+    pw = pws * (np.asarray(rh_percent, dtype='float64') / 100.0)
+    return pws - pw
+
+
+def sequential_sum(a):
+    """沿最後一軸依序累加 (與 Python 逐月 += 的捨入順序相同)"""
+    a = np.asarray(a, dtype='float64')
+    total = np.zeros(a.shape[:-1])
+    for i in range(a.shape[-1]): total = total + a[..., i]
+    return total
+
+
+def crop_parameters(crops, crop_db):
+    """12 個月的作物參數陣列 (找不到的作物用 crop_db 第一筆，與 run_simulation 相同)"""
+    fallback = list(crop_db.values())[0]
+    rows = [crop_db.get(crops[i], fallback) for i in range(12)]
+    return {
+        'name': [r['name'] for r in rows],
+        'idealTemp': np.array([float(r['idealTemp']) for r in rows]),
+        'tempTolerance': np.array([float(r['tempTolerance']) for r in rows]),
+        'lightSaturation': np.array([float(r['lightSaturation']) for r in rows]),
+        'baseWeight': np.array([float(r['baseWeight']) for r in rows]),
+    }
+
+
+def material_properties(material, mat_db):
+    """覆蓋材料 → (U 值, 透光率)；material 可為單一代碼或代碼陣列 (批次設計)"""
+    default = {'uValue': 5.8, 'trans': 0.9}
+    if isinstance(material, str):
+        mat = mat_db.get(material, default)
+        return mat['uValue'], mat['trans']
+    codes = np.asarray(material)
+    rows = [mat_db.get(m, default) for m in codes.ravel()]
+    return (np.array([float(r['uValue']) for r in rows]).reshape(codes.shape),
+            np.array([float(r['trans']) for r in rows]).reshape(codes.shape))
+
+
+def greenhouse_geometry(gh_specs, mat_db):
+    """
+    幾何與材料參數 (與 run_simulation 相同的公式)
+    各設計值可為純量或陣列 (例如 (設計數, 1))，與月份軸廣播後一次算完多個設計
+    """
+    floor_area = gh_specs['width'] * gh_specs['length']
+    vol_coef = gh_specs.get('_vol_coef', 1.2)
+    surf_coef = gh_specs.get('_surf_coef', 1.15)
+    u_value, trans = material_properties(gh_specs['material'], mat_db)
+    return {
+        'floor_area': floor_area,
+        'volume': floor_area * gh_specs['gutterHeight'] * vol_coef,
+        'surface_area': (floor_area * surf_coef) + (2 * (gh_specs['width'] + gh_specs['length']) * gh_specs['gutterHeight']),
+        'planting_area': floor_area * 0.6,
+        'vent_eff': gh_specs.get('_vent_eff', 1.0),
+        'u_value': u_value, 'trans': trans,
+        # 屋頂幾何透光修正 (12 個月，見 solar_geometry)；沒有時為 1
+        'trans_coef': np.asarray(gh_specs.get('_trans_coef', 1.0), dtype='float64'),
+    }
+
+
+def simulate_monthly(gh_specs, fan_specs, climate, crops, density, cycles, prices, crop_db, mat_db,
+                     seedling_unit_cost=None, exact=False, ventilation='wind'):
+    """
+    月平均溫室模擬 (向量化)
+    climate: {'temps','solar','wind','humidities'}，每個值形狀 (..., 12)；
+             選填 'tempProfile' (..., 12, 24) 實測日變化 (相對日均的偏差)，沒有時用 DIURNAL_OFFSET
+    gh_specs / fan_specs 的數值 (與 material) 也可以是 (設計數, 1) 陣列，一次模擬多個設計 (見 sweep_service)
+    seedling_unit_cost: 12 個月的種苗單價 (None = 不計種苗成本)
+    exact: VPD 逐點用 PsychroModel 計算，結果與 run_simulation 逐位元相同 (較慢，大批網格用 False)
+    ventilation: 'wind' (與 run_simulation 相同) 或 'coupled' (自然通風量隨室內外溫差變動，見 ventilation.py)
+    回傳 dict：逐月陣列 (..., 12) 與年度合計 (...)，鍵名同 run_simulation 的輸出欄位
+    """
+    geo = greenhouse_geometry(gh_specs, mat_db)
+    crop = crop_parameters(crops, crop_db)
+    t_out = np.asarray(climate['temps'], dtype='float64')
+    solar = np.asarray(climate['solar'], dtype='float64')
+    wind = np.asarray(climate['wind'], dtype='float64')
+    rh = np.asarray(climate['humidities'], dtype='float64')
+
+    # --- A. 熱平衡 ---
+    t_trans = geo['trans'] * (1 - gh_specs['shadingScreen']/100) * geo['trans_coef']
+    q_solar = (solar * 1000000 / 43200) * geo['floor_area'] * t_trans
+
+    forced_vent = (fan_specs['exhaustCount'] * fan_specs['exhaustFlow']) / 3600
+    if ventilation == 'coupled':
+        nat_vent = solve_coupled(gh_specs, q_solar, geo['u_value'] * geo['surface_area'], forced_vent, t_out, wind)['nat_vent']
+    else:
+        vent_area = gh_specs['roofVentArea'] + gh_specs['sideVentArea']
+        nat_vent = wind * vent_area * 0.4 * (gh_specs['insectNet']/100) * geo['vent_eff']
+    total_vent = nat_vent + forced_vent
+    volume = geo['volume']
+    ach = np.divide(total_vent * 3600, volume, out=np.zeros(np.broadcast(total_vent, volume).shape), where=np.asarray(volume) > 0)
+
+    q_vent = total_vent * 1200
+    q_cond = geo['u_value'] * geo['surface_area']
+    q_loss = q_vent + q_cond
+    delta_t = np.divide(q_solar, q_loss, out=np.zeros(np.broadcast(q_solar, q_loss).shape), where=q_loss > 0)
+    t_in = t_out + delta_t
+    vpd_in = vpd(t_in, rh, exact)
+
+    # --- B. 高溫累積時數 (每日 24 小時 × 日變化) ---
+    t_base = t_out + delta_t * 1.5
+    offset = DIURNAL_OFFSET if climate.get('tempProfile') is None else np.asarray(climate['tempProfile'], dtype='float64')
+    hours_at = lambda t, limit: ((t[..., np.newaxis] + offset) >= limit).sum(axis=-1)
+
+    return {
+        'tempOut': t_out, 'tempIn': t_in, 'vpd': vpd_in, 'ach': np.broadcast_to(ach, t_in.shape),
+        'heat30_Base': hours_at(t_base, 30) * 30, 'heat35_Base': hours_at(t_base, 35) * 30,
+        'heat30_In': hours_at(t_in, 30) * 30, 'heat35_In': hours_at(t_in, 35) * 30,
+        **crop_response(t_in, vpd_in, solar * t_trans, crop, fan_specs, geo, density, cycles, prices, seedling_unit_cost),
+    }
+
+
+def crop_response(t_in, vpd_in, solar_in, crop, fan_specs, geo, density, cycles, prices, seedling_unit_cost=None):
+    """
+    逐月生物產能與種苗成本 (月模擬與逐時模擬共用)
+    t_in / vpd_in: 月平均室溫、飽差 (..., 12)；solar_in: 室內日射 (MJ/m²/日)
+    """
+    # --- C. 生物產能 ---
+    t_diff = np.abs(t_in - crop['idealTemp'])
+    score_temp = np.maximum(0, 1 - (t_diff / (crop['tempTolerance'] * 1.5)))
+    score_temp = np.where(np.asarray(fan_specs['circCount']) > 0, score_temp * 1.1, score_temp)
+
+    score_vpd = np.select(
+        [(vpd_in >= 0.8) & (vpd_in <= 1.2), (vpd_in >= 0.3) & (vpd_in < 0.8), (vpd_in > 1.2) & (vpd_in <= 2.5)],
+        [1.0, 0.5 + 0.5 * ((vpd_in - 0.3) / 0.5), 1.0 - 0.5 * ((vpd_in - 1.2) / 1.3)],
+        default=0.5)
+
+    lsp = crop['lightSaturation']
+    lcp = lsp * 0.2
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ramp = (solar_in - lcp) / (lsp - lcp)
+    score_light = np.where(solar_in >= lsp, 1.0, np.where(solar_in <= lcp, 0.0, ramp))
+
+    efficiency = score_temp * score_vpd * score_light
+    yield_kg = geo['planting_area'] * density * crop['baseWeight'] * efficiency * (cycles / 12)
+    rev = yield_kg * np.asarray(prices, dtype='float64')
+
+    # --- D. 種苗成本 (與氣候無關) ---
+    monthly_plants_needed = geo['planting_area'] * density * (cycles / 12)
+    unit_cost = np.zeros(12) if seedling_unit_cost is None else np.asarray(seedling_unit_cost, dtype='float64')
+    seedling_cost = np.broadcast_to(monthly_plants_needed * unit_cost, np.broadcast(t_in, monthly_plants_needed * unit_cost).shape)
+
+    total_revenue = sequential_sum(rev)
+    total_seedling_cost = sequential_sum(seedling_cost)
+    return {
+        'yield': yield_kg, 'revenue': rev, 'seedling_cost': seedling_cost,
+        'efficiency': efficiency * 100,
+        'cropName': crop['name'], 'seedling_unit_cost': unit_cost,
+        'totalYield': sequential_sum(yield_kg), 'totalRevenue': total_revenue,
+        'totalSeedlingCost': total_seedling_cost,
+        'netRevenue': total_revenue - total_seedling_cost,
+        'maxSummerTemp': t_in[..., 6],
+    }
+
+
+def _hourly_heat_terms(gh_specs, fan_specs, mat_db, t_out, solar, wind, trans_coef=1.0, fog=None, ventilation='wind'):
+    """逐時熱平衡的各項 (W 與 W/K)：日射得熱、噴霧潛熱、通風+傳導散熱係數 (穩態與暫態模型共用)"""
+    geo = greenhouse_geometry(gh_specs, mat_db)
+    t_trans = geo['trans'] * (1 - gh_specs['shadingScreen']/100) * np.asarray(trans_coef, dtype='float64')
+    q_solar = (np.asarray(solar, dtype='float64') * 1000000 / 3600) * geo['floor_area'] * t_trans
+
+    capacity = (fog or {}).get('capacity', 0)
+    q_fog = np.where((capacity > 0) & (t_out > (fog or {}).get('trigger', np.inf)),
+                     (capacity * geo['floor_area'] * 2450 / 3600) * 0.8, 0.0)
+
+    forced_vent = (fan_specs['exhaustCount'] * fan_specs['exhaustFlow']) / 3600
+    if ventilation == 'coupled':
+        nat_vent = solve_coupled(gh_specs, q_solar - q_fog, geo['u_value'] * geo['surface_area'], forced_vent, t_out, wind)['nat_vent']
+    else:
+        vent_area = gh_specs['roofVentArea'] + gh_specs['sideVentArea']
+        nat_vent = np.asarray(wind, dtype='float64') * vent_area * 0.4 * (gh_specs['insectNet']/100) * geo['vent_eff']
+    total_vent = nat_vent + forced_vent
+    volume = geo['volume']
+    ach = np.divide(total_vent * 3600, volume, out=np.zeros(np.broadcast(total_vent, volume).shape), where=np.asarray(volume) > 0)
+    q_remove = total_vent * 1200 + geo['u_value'] * geo['surface_area']
+    return {'geo': geo, 'q_solar': q_solar, 'q_fog': q_fog, 'q_remove': q_remove,
+            'total_vent': total_vent, 'ach': ach, 't_trans': t_trans}
+
+
+def hourly_heat_balance(gh_specs, fan_specs, mat_db, t_out, solar, wind, trans_coef=1.0, fog=None, ventilation='wind'):
+    """
+    逐時熱平衡 (與 24 小時模擬相同的公式)，輸入為等長陣列
+    solar: 日射 (MJ/m²/h)；trans_coef: 屋頂透光修正 (純量或逐時陣列)
+    fog: {'capacity': 噴霧量 (g/m²/h), 'trigger': 啟動溫度 (°C)}，外氣溫超過啟動溫度時噴霧帶走潛熱；None 為不噴霧
+    ventilation: 自然通風模型 (VENTILATION_MODELS)
+    回傳 {'t_in', 'delta_t', 'delta_solar' (不含噴霧的溫升), 'total_vent', 'ach', 't_trans'}；室溫不低於外氣 2°C 以下
+    """
+    t_out = np.asarray(t_out, dtype='float64')
+    h = _hourly_heat_terms(gh_specs, fan_specs, mat_db, t_out, solar, wind, trans_coef, fog, ventilation)
+    q_solar, q_remove = h['q_solar'], h['q_remove']
+    shape = np.broadcast(q_solar, q_remove).shape
+    delta_t = np.divide(q_solar - h['q_fog'], q_remove, out=np.zeros(shape), where=q_remove > 0)
+    delta_solar = np.divide(q_solar, q_remove, out=np.zeros(shape), where=q_remove > 0)
+    return {'t_in': np.maximum(t_out + delta_t, t_out - 2), 'delta_t': delta_t, 'delta_solar': delta_solar,
+            'total_vent': h['total_vent'], 'ach': h['ach'], 't_trans': h['t_trans']}
+
+
+def transient_heat_balance(gh_specs, fan_specs, mat_db, time_ns, t_out, solar, wind, trans_coef=1.0, fog=None,
+                           ventilation='wind'):
+    """
+    暫態雙節點熱平衡 (室內空氣 + 地面/作物蓄熱體)，逐時以隱式 Euler 推進，保留前一小時的熱量 (熱慣性)
+      C_air  dTa/dt = (1-f)·Q_solar - Q_fog - G_loss·(Ta - To) + G_m·(Tm - Ta)
+      C_mass dTm/dt =    f ·Q_solar                             - G_m·(Tm - Ta)
+    C_air = 1200·容積；C_mass = MASS_CAPACITY·地板面積；G_m = MASS_COUPLING·地板面積；f = SOLAR_TO_MASS
+    G_loss = 通風×1200 + U·A (與穩態模型相同)，所以日射固定時收斂到 hourly_heat_balance 的溫升
+    gh_specs / fan_specs 可為 (設計數, 1) 陣列：所有係數先算成 (時數, 設計數) 陣列，
+    時間軸依序推進 (每步只有幾個向量運算)，多個設計同時計算
+    time_ns: 逐時時間 (int64 ns)，缺的小時以實際間隔計算；氣溫缺值的小時以前後內插推進，輸出為 NaN
+    gh_specs['_mass_capacity'] 可覆寫蓄熱量 (J/m²·K)
+    ventilation='coupled' 時各小時的自然通風量取該小時穩態耦合解 (ventilation.solve_coupled)，再進入時間推進
+    回傳 {'t_in', 't_mass' (形狀 (..., 時數)), 'delta_solar', 'total_vent', 'ach', 't_trans'}；室溫不低於外氣 2°C 以下
+    """
+    t_out = np.asarray(t_out, dtype='float64')
+    n = t_out.shape[-1]
+    valid = ~np.isnan(t_out)
+    if n == 0 or not valid.any():
+        return {'t_in': np.full(t_out.shape, np.nan), 't_mass': np.full(t_out.shape, np.nan)}
+    steps = np.arange(n)
+    t_fill = np.interp(steps, steps[valid], t_out[valid])
+    h = _hourly_heat_terms(gh_specs, fan_specs, mat_db, t_fill, solar, wind, trans_coef, fog, ventilation)
+    geo = h['geo']
+
+    # --- 預先算好的係數 (時數, 設計數) ---
+    shape = np.broadcast(h['q_solar'], h['q_remove']).shape
+    to_steps = lambda a: np.ascontiguousarray(np.broadcast_to(a, shape).reshape(-1, n).T)
+    dt = np.diff(np.asarray(time_ns, dtype='int64'), prepend=np.int64(time_ns[0]) - 3600 * 10**9) / 1e9
+    dt = np.clip(dt, 3600.0, 24 * 3600.0)[:, np.newaxis]
+    q_solar, q_fog, g_loss, to = to_steps(h['q_solar']), to_steps(h['q_fog']), to_steps(h['q_remove']), to_steps(t_fill)
+    area = to_steps(geo['floor_area'])
+    c_air = to_steps(geo['volume']) * 1200 / dt
+    c_mass = to_steps(gh_specs.get('_mass_capacity', MASS_CAPACITY)) * area / dt
+    g_m = MASS_COUPLING * area
+    q_air, q_mass = q_solar * (1 - SOLAR_TO_MASS) - q_fog, q_solar * SOLAR_TO_MASS
+    # 蓄熱體方程式解出 Tm' = m1·Tm + m0 + k·Ta'，代入空氣方程式得 Ta' = a1·Ta + a2·Tm + a0
+    s = c_mass + g_m
+    k, m1, m0 = g_m / s, c_mass / s, q_mass / s
+    den = c_air + g_loss + g_m * (1 - k)
+    a1, a2, a0 = c_air / den, g_m * m1 / den, (g_loss * to + q_air + g_m * m0) / den
+
+    # 初始狀態：第一小時的穩態
+    ta = to[0] + np.divide(q_air[0] + q_mass[0], g_loss[0], out=np.zeros(shape=to[0].shape), where=g_loss[0] > 0)
+    tm = ta + q_mass[0] / g_m[0]
+    t_air, t_mass = np.empty_like(a0), np.empty_like(a0)
+    for i in range(n):
+        ta = a1[i] * ta + a2[i] * tm + a0[i]
+        tm = m1[i] * tm + m0[i] + k[i] * ta
+        t_air[i], t_mass[i] = ta, tm
+
+    back = lambda a: a.T.reshape(shape)
+    t_in = np.where(valid, np.maximum(back(t_air), t_out - 2), np.nan)
+    delta_solar = np.divide(h['q_solar'], h['q_remove'], out=np.zeros(shape), where=h['q_remove'] > 0)
+    return {'t_in': t_in, 't_mass': np.where(valid, back(t_mass), np.nan), 'delta_solar': delta_solar,
+            'total_vent': h['total_vent'], 'ach': h['ach'], 't_trans': h['t_trans']}
+
+
+def simulate_hourly(gh_specs, fan_specs, hourly, crops, density, cycles, prices, crop_db, mat_db,
+                    seedling_unit_cost=None, fog=None, trans_mh=None, transient=False, ventilation='wind'):
+    """
+    逐時模擬：測站全紀錄的每個小時一次以陣列運算 (hourly_heat_balance)，再彙整成與 simulate_monthly 相同的欄位
+    hourly: {'Time': int64 ns, 'Temp', 'Solar' (MJ/m²/h), 'Wind', 'RH'}；
+            氣溫缺值的小時不計，日射缺值以 0、風速缺值以 0.5 m/s 計 (同 24 小時模擬)
+    trans_mh: (12, 24) 逐月逐時屋頂透光修正 (solar_geometry)；沒有時用 gh_specs['_trans_coef'] 的月值
+    transient: 室溫改用暫態雙節點模型 (transient_heat_balance，含蓄熱體的熱慣性)；高溫基準 (Base) 仍為穩態
+    ventilation: 自然通風模型 (VENTILATION_MODELS)
+    gh_specs / fan_specs 可為 (設計數, 1) 陣列，逐時結果為 (設計數, 時數)、逐月為 (設計數, 12)
+    逐月值為該月所有小時的平均；高溫時數 = 室溫 ≥ 門檻的小時比例 × 24 × 30 (與月模型同單位)
+    另回傳 'hours' (12,) 各月有效時數、'years' 有效資料年數、'hourly' {'Time','tempOut','tempIn'}
+    """
+    geo = greenhouse_geometry(gh_specs, mat_db)
+    crop = crop_parameters(crops, crop_db)
+    time_ns = np.asarray(hourly['Time'], dtype='int64')
+    t_out = np.asarray(hourly['Temp'], dtype='float64')
+    solar = np.nan_to_num(np.asarray(hourly['Solar'], dtype='float64'), nan=0.0)
+    wind = np.nan_to_num(np.asarray(hourly['Wind'], dtype='float64'), nan=0.5)
+    rh = np.asarray(hourly['RH'], dtype='float64') if 'RH' in hourly else np.full(len(t_out), np.nan)
+
+    hours = hour_index(time_ns)
+    month = hours.astype('datetime64[h]').astype('datetime64[M]').astype('int64') % 12
+    if trans_mh is not None: coef = np.asarray(trans_mh, dtype='float64')[month, hours % 24]
+    else: coef = np.broadcast_to(geo['trans_coef'], (12,))[month]
+    if transient: bal = transient_heat_balance(gh_specs, fan_specs, mat_db, time_ns, t_out, solar, wind, coef, fog, ventilation)
+    else: bal = hourly_heat_balance(gh_specs, fan_specs, mat_db, t_out, solar, wind, coef, fog, ventilation)
+    t_in = bal['t_in']
+    t_base = t_out + bal['delta_solar'] * 1.5
+
+    valid = ~np.isnan(t_out)
+    count = np.bincount(month[valid], minlength=12)
+
+    def monthly_mean(x, mask=valid):
+        n = np.bincount(month[mask], minlength=12)
+        x = np.asarray(x)
+        if x.ndim == 1: total = np.bincount(month[mask], weights=x[mask], minlength=12)
+        else: total = x[..., mask] @ (month[mask, np.newaxis] == np.arange(12))    # (設計數, 時數) → (設計數, 12)
+        return np.divide(total, n, out=np.full(total.shape, np.nan), where=n > 0)
+
+    t_in_m = monthly_mean(t_in)
+    vpd_m = monthly_mean(vpd(t_in, rh, table=True), valid & ~np.isnan(rh))
+    hot = lambda t, limit: monthly_mean((t >= limit).astype('float64')) * 24 * 30
+    return {
+        'tempOut': monthly_mean(t_out), 'tempIn': t_in_m, 'vpd': vpd_m, 'ach': monthly_mean(bal['ach']),
+        'heat30_Base': hot(t_base, 30), 'heat35_Base': hot(t_base, 35),
+        'heat30_In': hot(t_in, 30), 'heat35_In': hot(t_in, 35),
+        **crop_response(t_in_m, vpd_m, monthly_mean(solar * bal['t_trans']) * 24,
+                        crop, fan_specs, geo, density, cycles, prices, seedling_unit_cost),
+        'hours': count, 'years': valid.sum() / 8760.0,
+        'hourly': {'Time': time_ns, 'tempOut': t_out, 'tempIn': t_in},
+    }
+
+
+def design_hour_ventilation(gh_specs, fan_specs, mat_db, solar_w, wind, max_rise, t_out=None, ventilation='wind'):
+    """
+    設計時刻的排風扇選型 (與 simulate_monthly 同一條熱平衡：ΔT = Q_solar / (通風×1200 + U·A))
+    solar_w: 設計日射 (W/m²)；wind: 同時風速 (m/s)；max_rise: 允許室內外溫差 ΔT (°C)
+    ventilation: 'wind' 或 'coupled' (與模擬相同的自然通風模型；coupled 需要設計乾球溫度 t_out)
+      coupled 時自然通風取溫差剛好等於 max_rise 時的浮力 + 風力流量，目前溫差以 solve_coupled 求解
+    回傳 {'q_solar','q_cond','required_vent','natural_vent','fan_vent','exhaustCount','rise'}
+    (通風量單位 m³/s；rise 為目前 exhaustCount 下的溫差)
+    """
+    if ventilation not in VENTILATION_MODELS: raise ValueError(f"未知的通風模型: {ventilation}")
+    if ventilation == 'coupled' and t_out is None: raise ValueError("耦合通風模型需要設計乾球溫度 t_out")
+    geo = greenhouse_geometry(gh_specs, mat_db)
+    # 屋頂透光修正取全年最大的月份 (保守)
+    t_trans = geo['trans'] * (1 - gh_specs['shadingScreen']/100) * float(np.max(geo['trans_coef']))
+    q_solar = solar_w * geo['floor_area'] * t_trans
+    q_cond = geo['u_value'] * geo['surface_area']
+    if ventilation == 'coupled':
+        natural_vent = float(natural_ventilation(gh_specs, max_rise, wind, t_out))
+    else:
+        vent_area = gh_specs['roofVentArea'] + gh_specs['sideVentArea']
+        natural_vent = wind * vent_area * 0.4 * (gh_specs['insectNet']/100) * geo['vent_eff']
+
+    required_vent = max(0.0, (q_solar / max_rise - q_cond) / 1200) if max_rise > 0 else math.inf
+    fan_vent = max(0.0, required_vent - natural_vent)
+    flow = fan_specs['exhaustFlow'] / 3600
+    count = math.ceil(fan_vent / flow) if (flow > 0 and math.isfinite(fan_vent)) else 0
+
+    if ventilation == 'coupled':
+        rise = float(solve_coupled(gh_specs, q_solar, q_cond, fan_specs['exhaustCount'] * flow, t_out, wind)['delta_t'])
+    else:
+        current = natural_vent + fan_specs['exhaustCount'] * flow
+        q_loss = current * 1200 + q_cond
+        rise = q_solar / q_loss if q_loss > 0 else 0.0
+    return {
+        'q_solar': q_solar, 'q_cond': q_cond, 'required_vent': required_vent,
+        'natural_vent': natural_vent, 'fan_vent': fan_vent, 'exhaustCount': count, 'rise': rise,
+    }
@@ -0,0 +1,116 @@
+# 檔案位置: backend/models/heat_events.py
+"""
+極端高溫事件分析 (直接由逐時氣溫計算，取代固定正弦日變化的估算)
+所有測站先接成一條長陣列，再以向量化 run-length encoding 一次找出每段連續高溫，
+不需逐站、逐小時迴圈。
+"""
+import numpy as np
+
+from backend.models.station_dataset import stack_hourly
+
+# 逐時高溫門檻 (°C)
+HEAT_THRESHOLDS = (30.0, 35.0)
+# 熱浪：日最高溫 ≥ HEAT_WAVE_TMAX 且連續 HEAT_WAVE_MIN_DAYS 天以上
+HEAT_WAVE_TMAX = 35.0
+HEAT_WAVE_MIN_DAYS = 3
+# 連續高溫時數分級 (上限，含)：1 / 2~3 / 4~6 / 7~12 / 13~24 / >24 小時
+RUN_BINS = (1, 3, 6, 12, 24)
+RUN_LABELS = ['1h', '2-3h', '4-6h', '7-12h', '13-24h', '>24h']
+
+
+def run_lengths(mask, breaks):
+    """
+    向量化 run-length encoding
+    mask  : bool 陣列，True 為「事件中」
+    breaks: bool 陣列，True 表示此點與前一點不連續 (換站、缺時)
+    回傳 (每段起點索引, 每段長度)
+    """
+    mask = np.asarray(mask, dtype=bool)
+    prev = np.r_[False, mask[:-1]]
+    starts = mask & (np.asarray(breaks, dtype=bool) | ~prev)
+    run_id = np.cumsum(starts) - 1
+    lengths = np.bincount(run_id[mask], minlength=int(starts.sum()))
+    return np.flatnonzero(starts), lengths
+
+
+def _run_stats(station, starts, lengths, n):
+    """每站的事件數 / 最長 / 平均時數 / 分級次數"""
+    owner = station[starts]
+    events = np.bincount(owner, minlength=n)
+    longest = np.zeros(n, dtype='int64')
+    np.maximum.at(longest, owner, lengths)
+    mean = np.divide(np.bincount(owner, weights=lengths, minlength=n), events,
+                     out=np.zeros(n), where=events > 0)
+    bins = np.searchsorted(RUN_BINS, lengths, side='left')
+    hist = np.bincount(owner * (len(RUN_BINS) + 1) + bins, minlength=n * (len(RUN_BINS) + 1))
+    return events, longest, mean, hist.reshape(n, len(RUN_BINS) + 1)
+
+
+def heat_event_stats(time_list, temp_list, thresholds=HEAT_THRESHOLDS):
+    """
+    多測站高溫事件統計 (一次向量化)
+    time_list / temp_list: 每站的 int64 ns 時間與逐時氣溫 (°C)
+    回傳 dict (n = 測站數, T = 門檻數)：
+      years        : (n,) 有效資料年數 (有效時數 / 8760)
+      hours        : (n, T) 高於門檻的總時數
+      events       : (n, T) 連續高溫事件數
+      max_run      : (n, T) 最長連續時數
+      mean_run     : (n, T) 平均每次時數
+      run_hist     : (n, T, 6) 事件長度分級次數 (RUN_LABELS)
+      exceed_prob  : (n, T, 12, 24) 各月各時氣溫 ≥ 門檻的機率 (無資料為 NaN)
+      hot_days     : (n,) 日最高溫 ≥ HEAT_WAVE_TMAX 的天數
+      heatwaves    : (n,) 熱浪次數 (連續 ≥ HEAT_WAVE_MIN_DAYS 天)
+      heatwave_days: (n,) 熱浪期間總天數
+      longest_wave : (n,) 最長熱浪天數
+    """
+    n = len(time_list)
+    thresholds = np.asarray(thresholds, dtype='float64')
+    T = len(thresholds)
+    station, hours, (temp,), breaks = stack_hourly(time_list, temp_list)
+    valid = ~np.isnan(temp)
+
+    out = {'thresholds': thresholds,
+           'years': np.bincount(station[valid], minlength=n) / 8760.0,
+           'hours': np.zeros((n, T)), 'events': np.zeros((n, T), dtype='int64'),
+           'max_run': np.zeros((n, T), dtype='int64'), 'mean_run': np.zeros((n, T)),
+           'run_hist': np.zeros((n, T, len(RUN_BINS) + 1), dtype='int64'),
+           'exceed_prob': np.full((n, T, 12, 24), np.nan)}
+
+    # 月×時 分組 (station × 288 格)
+    t = hours.astype('datetime64[h]')
+    cell = station * 288 + (t.astype('datetime64[M]').astype('int64') % 12) * 24 + hours % 24
+    count = np.bincount(cell[valid], minlength=n * 288)
+
+    with np.errstate(invalid='ignore'):
+        for j, thr in enumerate(thresholds):
+            hot = valid & (temp >= thr)
+            starts, lengths = run_lengths(hot, breaks)
+            events, longest, mean, hist = _run_stats(station, starts, lengths, n)
+            out['hours'][:, j] = np.bincount(station[hot], minlength=n)
+            out['events'][:, j], out['max_run'][:, j], out['mean_run'][:, j] = events, longest, mean
+            out['run_hist'][:, j] = hist
+            exceed = np.bincount(cell[hot], minlength=n * 288)
+            prob = np.divide(exceed, count, out=np.full(n * 288, np.nan), where=count > 0)
+            out['exceed_prob'][:, j] = prob.reshape(n, 12, 24)
+
+    # 日最高溫：同站同日為連續區段，用 reduceat 一次取最大值
+    day = np.floor_divide(hours[valid], 24)
+    st_v, temp_v = station[valid], temp[valid]
+    first = np.flatnonzero(np.r_[True, (st_v[1:] != st_v[:-1]) | (day[1:] != day[:-1])])
+    if len(first):
+        tmax = np.maximum.reduceat(temp_v, first)
+        d_station, d_day = st_v[first], day[first]
+        d_breaks = np.r_[True, (d_station[1:] != d_station[:-1]) | (d_day[1:] - d_day[:-1] != 1)]
+        hot_day = tmax >= HEAT_WAVE_TMAX
+        starts, lengths = run_lengths(hot_day, d_breaks)
+        wave = lengths >= HEAT_WAVE_MIN_DAYS
+        owner = d_station[starts[wave]]
+        out['hot_days'] = np.bincount(d_station[hot_day], minlength=n)
+        out['heatwaves'] = np.bincount(owner, minlength=n)
+        out['heatwave_days'] = np.bincount(owner, weights=lengths[wave], minlength=n).astype('int64')
+        longest = np.zeros(n, dtype='int64')
+        np.maximum.at(longest, owner, lengths[wave])
+        out['longest_wave'] = longest
+    else:
+        for k in ('hot_days', 'heatwaves', 'heatwave_days', 'longest_wave'): out[k] = np.zeros(n, dtype='int64')
+    return out
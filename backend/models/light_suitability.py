@@ -0,0 +1,62 @@
+# 檔案位置: backend/models/light_suitability.py
+import numpy as np
+
+# 平年各月天數 (年時數換算用)
+DAYS_IN_MONTH = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+
+# 分類代碼：0 低於光補償點 / 1 適當範圍 / 2 超過光飽和點 (與 Tab 1 熱圖色票一致)
+BELOW, IN_RANGE, ABOVE = 0, 1, 2
+
+
+def classify_ppfd(ppfd, comp, sat):
+    """
+    PPFD 與光補償點/飽和點比較 (可廣播)
+    comp <= ppfd <= sat → 1，ppfd > sat → 2，其餘 → 0
+    """
+    ppfd = np.asarray(ppfd)
+    return ((ppfd >= comp).astype('int8') + (ppfd > sat).astype('int8')).astype('int8')
+
+
+def crop_arrays(crops):
+    """作物字典 {名稱: {'comp','sat','dli'}} → (名稱清單, comp, sat, dli) 陣列"""
+    names = list(crops.keys())
+    comp = np.array([float(crops[n]['comp']) for n in names])
+    sat = np.array([float(crops[n]['sat']) for n in names])
+    dli = np.array([float(crops[n].get('dli', 17)) for n in names])
+    return names, comp, sat, dli
+
+
+def light_suitability(ppfd, comp, sat, target_dli):
+    """
+    多測站 × 多作物 × 月 × 時 的光環境分類 (一次向量化完成)
+
+    ppfd       : (測站, 12, 24) 各月各時平均 PPFD (μmol/m²/s)
+    comp / sat / target_dli : (作物,)
+    回傳 dict：
+      category    : (測站, 作物, 12, 24) int8 分類代碼
+      hours       : (測站, 作物, 12, 3) 每日時數 [低於補償點, 適當, 超過飽和點] (只計白天 PPFD > 0)
+      annual_hours: (測站, 作物, 3) 全年時數 (每日時數 × 當月天數)
+      dli         : (測站, 12) 月平均 DLI (mol/m²/day)
+      dli_deficit : (測站, 作物, 12) DLI 不足量 max(0, 目標 - DLI)
+    """
+    ppfd = np.asarray(ppfd, dtype='float64')
+    comp = np.asarray(comp, dtype='float64')[np.newaxis, :, np.newaxis, np.newaxis]
+    sat = np.asarray(sat, dtype='float64')[np.newaxis, :, np.newaxis, np.newaxis]
+    target_dli = np.asarray(target_dli, dtype='float64')
+
+    p = ppfd[:, np.newaxis]                     # (測站, 1, 12, 24)
+    category = classify_ppfd(p, comp, sat)      # (測站, 作物, 12, 24)
+    daylight = p > 0
+    hours = np.stack([
+        ((category == BELOW) & daylight).sum(axis=-1),
+        (category == IN_RANGE).sum(axis=-1),
+        (category == ABOVE).sum(axis=-1),
+    ], axis=-1)
+    annual_hours = (hours * DAYS_IN_MONTH[:, np.newaxis]).sum(axis=-2)
+
+    dli = ppfd.sum(axis=-1) * 3600 / 1_000_000
+    dli_deficit = np.maximum(target_dli[np.newaxis, :, np.newaxis] - dli[:, np.newaxis, :], 0.0)
+    return {
+        'category': category, 'hours': hours, 'annual_hours': annual_hours,
+        'dli': dli, 'dli_deficit': dli_deficit,
+    }
@@ -1,5 +1,32 @@
 # 檔案位置: backend/models/psychrometrics.py
 import math
+from functools import lru_cache
+import numpy as np
+
+# 飽和水氣壓查表範圍 (°C) 與間距；表外的溫度直接用公式
+PWS_TABLE_RANGE = (-10.0, 60.0)
+PWS_TABLE_STEP = 0.01
+
+
+@lru_cache(maxsize=1)
+def _pws_table():
+    """
+    PWS_TABLE_RANGE 內等間距的 Pws 表 (唯讀，逐點用純量公式建立)
+    回傳每個區間的 (左端值, 斜率)；公式在 0°C 分成冰面 / 水面兩段 (不連續)，
+    0°C 以下的最後一個區間右端取冰面公式在 0°C 的值
+    """
+    lo, hi = PWS_TABLE_RANGE
+    psy = PsychroModel()
+    n = int(round((hi - lo) / PWS_TABLE_STEP))
+    t = lo + np.arange(n + 1) * PWS_TABLE_STEP
+    pws = np.array([psy.get_saturation_vapor_pressure(x) for x in t.tolist()])
+    right = pws[1:].copy()
+    zero = int(round(-lo / PWS_TABLE_STEP))
+    right[zero - 1] = psy.get_saturation_vapor_pressure(-np.nextafter(0.0, 1.0))
+    left, slope = pws[:-1], (right - pws[:-1]) / PWS_TABLE_STEP
+    for a in (left, slope): a.setflags(write=False)
+    return left, slope, zero
+
 
 class PsychroModel:
     def __init__(self, p_atm_kpa=101.325):
@@ -52,4 +79,120 @@ class PsychroModel:
         """絕對濕度 kg/kg"""
         # [防呆修正] 防止分母為 0
         if self.P_atm <= pw_kpa: return 0.0
-        return 0.62198 * pw_kpa / (self.P_atm - pw_kpa)
\ No newline at end of file
+        return 0.62198 * pw_kpa / (self.P_atm - pw_kpa)
+
+
+    # --- 陣列版 (NumPy)：輸入可為純量或任意形狀的陣列，公式與分支同上面的純量版 ---
+    # NumPy 的 exp / log / **3 與 math 最後一位可能不同 (約 1e-16 相對誤差)
+
+    def get_saturation_vapor_pressure_array(self, t_c, table=False):
+        """
+        飽和水氣壓 Pws (kPa)，陣列版
+        table=True 時 PWS_TABLE_RANGE 內用預先算好的表線性內插 (相對誤差 < 1e-6)，表外用公式
+        """
+        t_c = np.asarray(t_c, dtype='float64')
+        if table:
+            left, slope, zero = _pws_table()
+            pos = (t_c - PWS_TABLE_RANGE[0]) / PWS_TABLE_STEP
+            with np.errstate(invalid='ignore'):
+                k = np.clip(np.floor(pos), 0, len(left) - 1).astype('int64')
+            k = np.where(t_c < 0, np.minimum(k, zero - 1), np.maximum(k, zero))
+            lookup = left[k] + slope[k] * ((pos - k) * PWS_TABLE_STEP)
+            inside = (t_c >= PWS_TABLE_RANGE[0]) & (t_c <= PWS_TABLE_RANGE[1])
+            if inside.all(): return lookup
+            return np.where(inside, lookup, self.get_saturation_vapor_pressure_array(t_c))
+        T_k = t_c + 273.15
+        C8, C9, C10 = -5.8002206E+03, 1.3914993E+00, -4.8640239E-02
+        C11, C12, C13 = 4.1764768E-05, -1.4452093E-08, 6.5459673E+00
+        C1, C2 = -5.6745359E+03, 6.3925247E+00
+        with np.errstate(invalid='ignore', divide='ignore'):
+            warm = np.exp((C8/T_k) + C9 + (C10*T_k) + (C11*T_k**2) + (C12*T_k**3) + (C13*np.log(T_k))) / 1000.0
+            cold = np.exp((C1/T_k) + C2) / 1000.0
+        return np.where((t_c >= 0) & (t_c <= 200), warm, np.where(t_c < 0, cold, 0.001))
+
+    def get_partial_vapor_pressure_array(self, t_c, rh_percent, table=False):
+        """實際水氣壓 Pw (kPa)，陣列版"""
+        return self.get_saturation_vapor_pressure_array(t_c, table) * (np.asarray(rh_percent, dtype='float64') / 100.0)
+
+    def get_vpd_array(self, t_c, rh_percent, table=False):
+        """飽差 VPD (kPa)，陣列版"""
+        pws = self.get_saturation_vapor_pressure_array(t_c, table)
+        pw = pws * (np.asarray(rh_percent, dtype='float64') / 100.0)
+        return pws - pw
+
+    def get_dew_point_array(self, pw_kpa):
+        """露點溫度，陣列版 (pw ≤ 0 時為 -999，同純量版)"""
+        pw_kpa = np.asarray(pw_kpa, dtype='float64')
+        bad = pw_kpa <= 0
+        tmpV = np.log(0.00145 * np.where(bad, 1.0, pw_kpa) * 1000)
+        A0, A1, A2 = 19.5322, 13.6626, 1.17678
+        T_val = A0 + A1*tmpV + A2*(tmpV**2)
+        return np.where(bad, -999.0, T_val - 273.15)
+
+    def get_enthalpy_array(self, t_c, w_kg_kg):
+        """焓值 kJ/kg，陣列版"""
+        t_c = np.asarray(t_c, dtype='float64')
+        return 1.006 * t_c + np.asarray(w_kg_kg, dtype='float64') * (2501 + 1.805 * t_c)
+
+    def get_humidity_ratio_array(self, pw_kpa):
+        """絕對濕度 kg/kg，陣列版 (pw ≥ 大氣壓時為 0)"""
+        pw_kpa = np.asarray(pw_kpa, dtype='float64')
+        full = self.P_atm <= pw_kpa
+        return np.where(full, 0.0, 0.62198 * pw_kpa / np.where(full, 1.0, self.P_atm - pw_kpa))
+
+
+def check_array_methods(n=200_000, rtol=1e-12, table_rtol=1e-6, seed=0):
+    """
+    陣列版與純量版逐點比對 (隨機溫度 -40~80°C、RH 0~100%、水氣壓 0~20 kPa)
+    回傳 {方法: 最大相對誤差}；超過容許值時 raise AssertionError
+    """
+    rng = np.random.default_rng(seed)
+    psy = PsychroModel()
+    t = rng.uniform(-40, 80, n); rh = rng.uniform(0, 100, n); pw = rng.uniform(0, 20, n)
+    t_tab = rng.uniform(*PWS_TABLE_RANGE, n)
+    w = np.array([psy.get_humidity_ratio(x) for x in pw.tolist()])
+    cases = {
+        'saturation_vapor_pressure': (psy.get_saturation_vapor_pressure_array(t), [psy.get_saturation_vapor_pressure(x) for x in t.tolist()], rtol),
+        'saturation_vapor_pressure (table)': (psy.get_saturation_vapor_pressure_array(t_tab, table=True), [psy.get_saturation_vapor_pressure(x) for x in t_tab.tolist()], table_rtol),
+        'partial_vapor_pressure': (psy.get_partial_vapor_pressure_array(t, rh), [psy.get_partial_vapor_pressure(a, b) for a, b in zip(t.tolist(), rh.tolist())], rtol),
+        'vpd': (psy.get_vpd_array(t, rh), [psy.get_vpd(a, b) for a, b in zip(t.tolist(), rh.tolist())], rtol),
+        'dew_point': (psy.get_dew_point_array(pw), [psy.get_dew_point(x) for x in pw.tolist()], rtol),
+        'humidity_ratio': (psy.get_humidity_ratio_array(pw), w, rtol),
+        'enthalpy': (psy.get_enthalpy_array(t, w), [psy.get_enthalpy(a, b) for a, b in zip(t.tolist(), w.tolist())], rtol),
+    }
+    errors = {}
+    for name, (arr, ref, tol) in cases.items():
+        ref = np.asarray(ref, dtype='float64')
+        errors[name] = float(np.max(np.abs(arr - ref) / np.maximum(np.abs(ref), 1e-12)))
+        # VPD 在 RH≈100% 時是兩個相近數相減，改以 Pws 為尺度比較
+        if name == 'vpd': errors[name] = float(np.max(np.abs(arr - ref) / psy.get_saturation_vapor_pressure_array(t)))
+        assert errors[name] <= tol, f"{name} 相對誤差 {errors[name]:.2e} 超過 {tol:.0e}"
+    return errors
+
+
+if __name__ == '__main__':
+    import time
+    for name, err in check_array_methods().items(): print(f"{name:36s} 最大相對誤差 {err:.2e}")
+
+    psy = PsychroModel()
+    t = np.random.default_rng(1).uniform(-10, 60, 100_000)
+    rh = np.full_like(t, 70.0)
+    t_list, rh_list = t.tolist(), rh.tolist()
+
+    def bench(fn, repeat=3):
+        best = math.inf
+        for _ in range(repeat):
+            t0 = time.perf_counter(); fn(); best = min(best, time.perf_counter() - t0)
+        return best * 1000
+
+    print(f"\n{len(t):,} 點 (ms)          純量迴圈     陣列     查表")
+    rows = {
+        'saturation_vapor_pressure': (lambda: [psy.get_saturation_vapor_pressure(x) for x in t_list],
+                                      lambda: psy.get_saturation_vapor_pressure_array(t),
+                                      lambda: psy.get_saturation_vapor_pressure_array(t, table=True)),
+        'vpd': (lambda: [psy.get_vpd(a, b) for a, b in zip(t_list, rh_list)],
+                lambda: psy.get_vpd_array(t, rh), lambda: psy.get_vpd_array(t, rh, table=True)),
+        'dew_point': (lambda: [psy.get_dew_point(x) for x in t_list], lambda: psy.get_dew_point_array(t), None),
+    }
+    for name, (scalar, array, table) in rows.items():
+        print(f"{name:26s} {bench(scalar):9.1f} {bench(array):8.2f} " + (f"{bench(table):8.2f}" if table else "       -"))
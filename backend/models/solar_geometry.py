@@ -0,0 +1,176 @@
+# 檔案位置: backend/models/solar_geometry.py
+"""
+太陽幾何與屋頂入射角透光率
+- 逐時太陽高度角/方位角 (8760 小時，非閏年，依緯度帶快取)
+- 屋頂各斜面的入射角 → Fresnel 角度修正 (相對於垂直入射的透光率)
+- 直射/散射分離 (Erbs 相關式)，得到「屋頂幾何透光修正係數」：
+  乘在材料透光率 (MAT_DB 的 trans，垂直入射值) 上即為實際透光率，所以一律 ≤ 1
+  (斜面朝陽時截到較多直射光的「採光增益」不算在內，只算入射角造成的 Fresnel 損失)
+Venlo / Tunnel / SingleSlope 多組屋頂設定一次向量化計算 (設定 × 8760 小時)。
+"""
+from functools import lru_cache
+import numpy as np
+
+SOLAR_CONSTANT = 1367.0          # W/m²
+REFRACTIVE_INDEX = 1.5           # 玻璃 / PE / EVA 約 1.5
+LATITUDE_BAND = 0.5              # 快取用緯度帶寬 (度)
+DEFAULT_LATITUDE = 23.5          # 測站無座標時 (臺灣中部)
+# 屋脊方位：0 = 南北向屋脊 (斜面朝東西)；單斜屋頂朝南
+RIDGE_AZIMUTH = 0.0
+TUNNEL_FACETS = 9                # 圓拱屋頂以幾個斜面近似
+# CWA 逐時值為「前一小時」的累積/平均，以區間中點計算太陽位置
+HOUR_MIDPOINT = -0.5
+MJ_H_TO_W = 1_000_000 / 3600
+DAYS_IN_MONTH = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+
+
+def sun_position(lat, day_of_year, solar_hour):
+    """
+    太陽高度角與方位角 (度；方位以北為 0、順時針)，可廣播
+    赤緯用 Cooper 式；solar_hour 為真太陽時
+    """
+    phi = np.radians(np.asarray(lat, dtype='float64'))
+    decl = np.radians(23.45) * np.sin(2 * np.pi * (284 + np.asarray(day_of_year, dtype='float64')) / 365)
+    omega = np.radians(15.0 * (np.asarray(solar_hour, dtype='float64') - 12.0))
+    sin_el = np.sin(phi) * np.sin(decl) + np.cos(phi) * np.cos(decl) * np.cos(omega)
+    elevation = np.arcsin(np.clip(sin_el, -1, 1))
+    cos_az = (np.sin(decl) - np.sin(elevation) * np.sin(phi)) / np.maximum(np.cos(elevation) * np.cos(phi), 1e-9)
+    azimuth = np.degrees(np.arccos(np.clip(cos_az, -1, 1)))
+    azimuth = np.where(omega > 0, 360 - azimuth, azimuth)
+    return np.degrees(elevation), azimuth
+
+
+def equation_of_time(day_of_year):
+    """均時差 (小時，Spencer 近似)"""
+    b = 2 * np.pi * (np.asarray(day_of_year, dtype='float64') - 1) / 365
+    minutes = 229.18 * (0.000075 + 0.001868 * np.cos(b) - 0.032077 * np.sin(b)
+                        - 0.014615 * np.cos(2 * b) - 0.040849 * np.sin(2 * b))
+    return minutes / 60
+
+
+@lru_cache(maxsize=32)
+def hourly_sun(lat_band):
+    """
+    某緯度帶一整年 8760 小時的太陽位置 (唯讀陣列)
+    時間以標準子午線 (120°E) 的地方標準時計，經度差 (臺灣 < 8 分鐘) 忽略
+    回傳 (月份 0..11, 小時 0..23, 高度角, 方位角, 水平面大氣層外日射 W/m²)
+    """
+    day = np.repeat(np.arange(1, 366), 24)
+    hour = np.tile(np.arange(24), 365)
+    month = np.repeat(np.repeat(np.arange(12), DAYS_IN_MONTH), 24)
+    elevation, azimuth = sun_position(lat_band, day, hour + HOUR_MIDPOINT + equation_of_time(day))
+    g0 = SOLAR_CONSTANT * (1 + 0.033 * np.cos(2 * np.pi * day / 365)) * np.maximum(np.sin(np.radians(elevation)), 0)
+    for a in (month, hour, elevation, azimuth, g0): a.setflags(write=False)
+    return month, hour, elevation, azimuth, g0
+
+
+def fresnel_factor(incidence_deg, n=REFRACTIVE_INDEX):
+    """
+    單層覆蓋材的 Fresnel 透光率 (含兩界面多次反射)，相對於垂直入射的比值
+    incidence_deg ≥ 90° (背光) 時為 0
+    """
+    theta = np.radians(np.clip(np.asarray(incidence_deg, dtype='float64'), 1e-4, 89.999))
+    theta_t = np.arcsin(np.sin(theta) / n)
+    r_s = (np.sin(theta_t - theta) / np.sin(theta_t + theta)) ** 2
+    r_p = (np.tan(theta_t - theta) / np.tan(theta_t + theta)) ** 2
+    t = 0.5 * ((1 - r_s) / (1 + r_s) + (1 - r_p) / (1 + r_p))
+    r0 = ((n - 1) / (n + 1)) ** 2
+    t0 = (1 - r0) / (1 + r0)
+    return np.where(np.asarray(incidence_deg) >= 90, 0.0, t / t0)
+
+
+# 等向散射光的等效入射角約 60° (半球平均)
+DIFFUSE_FACTOR = float(fresnel_factor(60.0))
+
+
+def roof_facets(roof_type, angle):
+    """
+    屋頂斜面 (傾角, 方位, 水平投影面積比例)
+    Venlo：東西兩面各半；SingleSlope：單面朝南；Tunnel：拱頂由 -angle 到 +angle 等分成 TUNNEL_FACETS 面
+    """
+    angle = float(angle)
+    east, west = (RIDGE_AZIMUTH + 90) % 360, (RIDGE_AZIMUTH + 270) % 360
+    if roof_type == 'SingleSlope':
+        return [(angle, 180.0, 1.0)]
+    if roof_type == 'Tunnel':
+        tilts = np.linspace(-angle, angle, TUNNEL_FACETS)
+        # 等弧長：水平投影 ∝ cos(傾角)
+        proj = np.cos(np.radians(tilts)); proj = proj / proj.sum()
+        return [(abs(t), east if t > 0 else west, p) for t, p in zip(tilts, proj)]
+    return [(angle, east, 0.5), (angle, west, 0.5)]
+
+
+def _facet_arrays(configs):
+    """多組 (屋頂形式, 角度) → 補齊長度的 (設定, 斜面) 陣列"""
+    facets = [roof_facets(t, a) for t, a in configs]
+    width = max(len(f) for f in facets)
+    tilt, azim, weight = (np.zeros((len(configs), width)) for _ in range(3))
+    for i, f in enumerate(facets):
+        for j, (b, g, w) in enumerate(f):
+            tilt[i, j], azim[i, j], weight[i, j] = b, g, w
+    return tilt, azim, weight
+
+
+def beam_factor(elevation, azimuth, configs):
+    """
+    直射光的屋頂透光修正 (相對於垂直入射)，shape (設定, 時數)，值在 0~1
+    各斜面的 Fresnel 修正以該面截到的直射光 (入射角餘弦 / cos(傾角) × 水平投影比例) 加權平均；
+    以總截光量正規化，斜面朝陽的採光增益不會讓係數超過 1。全部斜面背光或太陽在地平線附近時為 0
+    """
+    tilt, azim, weight = (a[..., np.newaxis] for a in _facet_arrays(configs))   # (C, F, 1)
+    el = np.radians(np.asarray(elevation, dtype='float64'))
+    az = np.radians(np.asarray(azimuth, dtype='float64'))
+    b, g = np.radians(tilt), np.radians(azim)
+    cos_i = np.sin(el) * np.cos(b) + np.cos(el) * np.sin(b) * np.cos(az - g)   # (C, F, H)
+    gain = np.maximum(cos_i, 0) / np.cos(b) * fresnel_factor(np.degrees(np.arccos(np.clip(cos_i, -1, 1))))
+    sin_el = np.sin(el)
+    intercept = (weight * np.maximum(cos_i, 0) / np.cos(b)).sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        factor = (weight * gain).sum(axis=1) / intercept
+    return np.where((sin_el > 0.01) & (intercept > 1e-9), factor, 0.0)
+
+
+def diffuse_fraction(kt):
+    """Erbs 直散分離：晴空指數 kt → 散射比例"""
+    kt = np.asarray(kt, dtype='float64')
+    mid = 0.9511 - 0.1604 * kt + 4.388 * kt ** 2 - 16.638 * kt ** 3 + 12.336 * kt ** 4
+    return np.where(kt <= 0.22, 1 - 0.09 * kt, np.where(kt <= 0.8, mid, 0.165))
+
+
+@lru_cache(maxsize=64)
+def _geometry_month_hour(lat_band, configs):
+    """緯度帶 × 屋頂設定 的月×時平均直射修正與大氣層外日射 (快取)"""
+    month, hour, elevation, azimuth, g0 = hourly_sun(lat_band)
+    beam = beam_factor(elevation, azimuth, configs)                  # (C, 8760)
+    cell = month * 24 + hour
+    count = np.bincount(cell, minlength=288)
+    g0_mh = (np.bincount(cell, weights=g0, minlength=288) / count).reshape(12, 24)
+    # 直射修正以大氣層外日射加權平均 (太陽越高的時刻權重越大)
+    weighted = np.stack([np.bincount(cell, weights=b * g0, minlength=288) for b in beam])
+    g0_sum = np.bincount(cell, weights=g0, minlength=288)
+    beam_mh = np.divide(weighted, g0_sum, out=np.zeros_like(weighted), where=g0_sum > 0).reshape(len(configs), 12, 24)
+    for a in (g0_mh, beam_mh): a.setflags(write=False)
+    return g0_mh, beam_mh
+
+
+def latitude_band(lat):
+    return round(float(lat) / LATITUDE_BAND) * LATITUDE_BAND
+
+
+def roof_transmittance(lat, configs, solar_mh):
+    """
+    屋頂幾何透光修正係數
+    lat: 緯度；configs: [(屋頂形式, 角度)...]；solar_mh: 測站 (12, 24) 平均日射 (MJ/m²/h)
+    回傳 (hourly (設定, 12, 24), monthly (設定, 12))：
+      hourly 為各月各時的修正係數；monthly 為以日射量加權的月平均 (夜間/無日射月份為 1)
+    """
+    configs = tuple((str(t), float(a)) for t, a in configs)
+    g0_mh, beam_mh = _geometry_month_hour(latitude_band(lat), configs)
+    g = np.asarray(solar_mh, dtype='float64') * MJ_H_TO_W
+    kt = np.clip(np.divide(g, g0_mh, out=np.zeros_like(g), where=g0_mh > 0), 0, 1)
+    kd = diffuse_fraction(kt)
+    hourly = (1 - kd) * beam_mh + kd * DIFFUSE_FACTOR                   # (C, 12, 24)
+    hourly = np.where(g0_mh > 0, hourly, DIFFUSE_FACTOR)
+    total = g.sum(axis=-1)
+    monthly = np.divide((hourly * g).sum(axis=-1), total, out=np.ones((len(configs), 12)), where=total > 0)
+    return hourly, monthly
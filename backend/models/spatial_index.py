@@ -0,0 +1,103 @@
+# 檔案位置: backend/models/spatial_index.py
+import os
+import numpy as np
+import pandas as pd
+
+# scipy 為選用套件：有就用 KD-tree，沒有就用向量化暴力搜尋 (測站數量少，差異不大)
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def _unit_vectors(lat, lon):
+    """經緯度 (度) → 單位球面座標，弦長與大圓距離單調對應，可直接用歐氏距離搜尋"""
+    lat = np.radians(np.asarray(lat, dtype='float64'))
+    lon = np.radians(np.asarray(lon, dtype='float64'))
+    return np.stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)], axis=-1)
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """大圓距離 (km)，可廣播"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype='float64')) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def idw_weights(dist_km, power=2.0, snap_km=1e-6):
+    """
+    反距離權重 (最後一軸為鄰近測站)，每列加總為 1
+    距離在 snap_km 以內 (視為就在測站上) 時只用該測站
+    """
+    dist_km = np.asarray(dist_km, dtype='float64')
+    exact = dist_km <= snap_km
+    with np.errstate(divide='ignore'):
+        w = np.where(exact, 0.0, 1.0 / np.power(np.maximum(dist_km, 1e-9), power))
+    hit = exact.any(axis=-1, keepdims=True)
+    w = np.where(hit, exact.astype('float64'), w)
+    return w / w.sum(axis=-1, keepdims=True)
+
+
+class StationIndex:
+    """
+    測站座標空間索引
+    names / lats / lons 為同長度序列；query() 可一次查多個點
+    """
+    def __init__(self, names, lats, lons):
+        self.names = [str(n) for n in names]
+        self.lats = np.asarray(lats, dtype='float64')
+        self.lons = np.asarray(lons, dtype='float64')
+        self._xyz = _unit_vectors(self.lats, self.lons)
+        self._tree = cKDTree(self._xyz) if (cKDTree is not None and len(self.names)) else None
+        self._pos = {n: i for i, n in enumerate(self.names)}
+
+    @classmethod
+    def from_csv(cls, path, names=None):
+        """讀取 station_coords.csv (StationName, Lat, Lon)；names 可限定只收錄部分測站"""
+        if not os.path.exists(path): return cls([], [], [])
+        df = pd.read_csv(path).dropna(subset=['Lat', 'Lon'])
+        if names is not None: df = df[df['StationName'].astype(str).isin(set(names))]
+        return cls(df['StationName'].astype(str).tolist(), df['Lat'].values, df['Lon'].values)
+
+    def __len__(self):
+        return len(self.names)
+
+    def coords(self, name):
+        """測站座標 (lat, lon)；查無此站回傳 None"""
+        i = self._pos.get(name)
+        return None if i is None else (float(self.lats[i]), float(self.lons[i]))
+
+    def match(self, keys):
+        """
+        WEATHER_DB 鍵 → 座標：先比對完全相同的站名 (dict 查表)，
+        找不到時才退回「站名包含於鍵」的子字串比對
+        回傳 {鍵: (lat, lon)}
+        """
+        out = {}
+        for key in keys:
+            i = self._pos.get(key)
+            if i is None: i = next((j for j, n in enumerate(self.names) if n in key), None)
+            if i is not None: out[key] = (float(self.lats[i]), float(self.lons[i]))
+        return out
+
+    def query(self, lat, lon, k=4):
+        """
+        最近 k 個測站：回傳 (距離 km, 索引)，shape 為 (..., k)
+        lat / lon 可為純量或陣列
+        """
+        k = min(int(k), len(self.names))
+        pts = _unit_vectors(lat, lon)
+        flat = pts.reshape(-1, 3)
+        if self._tree is not None:
+            _, idx = self._tree.query(flat, k=k)
+            idx = np.asarray(idx).reshape(len(flat), k)
+        else:
+            chord = ((flat[:, np.newaxis, :] - self._xyz[np.newaxis, :, :]) ** 2).sum(axis=-1)
+            idx = np.argsort(chord, axis=1, kind='stable')[:, :k]
+        lat_f = np.broadcast_to(np.asarray(lat, dtype='float64'), pts.shape[:-1]).reshape(-1, 1)
+        lon_f = np.broadcast_to(np.asarray(lon, dtype='float64'), pts.shape[:-1]).reshape(-1, 1)
+        dist = haversine_km(lat_f, lon_f, self.lats[idx], self.lons[idx])
+        shape = pts.shape[:-1] + (k,)
+        return dist.reshape(shape), idx.reshape(shape)
@@ -0,0 +1,199 @@
+# 檔案位置: backend/models/station_dataset.py
+import numpy as np
+import pandas as pd
+
+# 標準欄位 (其餘數值欄位一律保留為 extras)
+CORE_COLUMNS = ['Temp', 'Solar', 'Wind', 'RH']
+# 選用標準欄位：有就讀 (float64)，不進逐時表 / 月摘要
+GUST_COLUMNS = ['Gust', 'GustDir']
+# 用來辨認表頭列的關鍵字
+HEADER_MARKERS = ('觀測時間', 'Time')
+
+HOUR_NS = 3_600_000_000_000
+
+
+def hour_index(time_ns):
+    """
+    int64 ns 時間 → 自 1970 起的整點序號 (四捨五入)
+    CWA 以 23:59 表示 24:00，四捨五入後會落在隔日 00:00，而不是重複算進 23 時
+    """
+    return (np.asarray(time_ns, dtype='int64') + HOUR_NS // 2) // HOUR_NS
+
+
+def stack_hourly(time_list, *values_lists):
+    """
+    多站逐時資料接成一條長陣列 (供跨測站向量化分析)：依 (測站, 整點) 排序、去除重複整點
+    time_list: 每站 int64 ns 時間；values_lists: 每個變數一份「每站一個陣列」的清單
+    回傳 (測站編號, 整點序號, [各變數 float64], 不連續旗標 (換站或缺時為 True))
+    """
+    station = np.concatenate([np.full(len(t), i, dtype='int64') for i, t in enumerate(time_list)])
+    hours = np.concatenate([hour_index(t) for t in time_list])
+    values = [np.concatenate([np.asarray(v, dtype='float64') for v in lst]) for lst in values_lists]
+    order = np.lexsort((hours, station))
+    station, hours = station[order], hours[order]
+    keep = np.r_[True, (station[1:] != station[:-1]) | (hours[1:] != hours[:-1])]
+    station, hours = station[keep], hours[keep]
+    values = [v[order][keep] for v in values]
+    breaks = np.r_[True, (station[1:] != station[:-1]) | (hours[1:] - hours[:-1] != 1)]
+    return station, hours, values, breaks
+
+
+def map_station_columns(columns):
+    """
+    Smart Mapping：原始欄位名 → 標準欄位 {'Time': '觀測時間', 'Temp': '氣溫(℃)', ...}
+    瞬間最大風 (陣風) 另外對應到 Gust / GustDir；Wind 只用平均風速
+    """
+    col_map = {}
+    for c in columns:
+        if '觀測時間' in c or 'Time' in c: col_map['Time'] = c
+        elif '氣溫' in c or 'Temp' in c: col_map['Temp'] = c
+        elif '日射' in c or 'Solar' in c: col_map['Solar'] = c
+        elif '最大瞬間' in c or 'Gust' in c:
+            if '風向' in c or 'Dir' in c: col_map['GustDir'] = c
+            elif '風速' in c or 'Speed' in c or c == 'Gust': col_map['Gust'] = c
+        elif '風速' in c or 'Wind' in c:
+            if 'Wind' not in col_map or '平均' in c: col_map['Wind'] = c
+        elif '濕度' in c or 'RH' in c: col_map['RH'] = c
+    return col_map
+
+
+class StationDataset:
+    """
+    單一氣象站的逐時資料 (只解析一次)
+    columns: {'Time': int64 ns, 'Temp'/'Solar'/'Wind'/'RH': float64, 其他原始欄位名: float32}
+    月摘要、逐時表、光環境表都是由此衍生並記憶的檢視 (view)。
+    """
+    def __init__(self, columns, source=None):
+        self.columns = columns
+        self.source = source
+        self._views = {}
+
+    # --- 建立 ---
+    @classmethod
+    def from_frame(cls, df, source=None):
+        """由已讀入的原始 DataFrame 建立 (欄位名會先去除空白)"""
+        df.columns = [c.strip() for c in df.columns]
+        col_map = map_station_columns(df.columns)
+        if 'Time' not in col_map: return None
+
+        times = pd.to_datetime(df[col_map['Time']], errors='coerce')
+        valid = times.notna().values
+        columns = {'Time': times[valid].values.astype('datetime64[ns]').view('int64')}
+        for k in CORE_COLUMNS + GUST_COLUMNS:
+            if k in col_map:
+                columns[k] = pd.to_numeric(df[col_map[k]], errors='coerce').values[valid].astype('float64')
+
+        # extras：未對應的數值欄位 (全空欄位略過)
+        mapped = set(col_map.values())
+        for c in df.columns:
+            if c in mapped: continue
+            vals = pd.to_numeric(df[c], errors='coerce').values[valid]
+            if np.isnan(vals).all(): continue
+            columns[c] = vals.astype('float32')
+        return cls(columns, source=source)
+
+    # --- 基本屬性 ---
+    @property
+    def extras(self):
+        return [k for k in self.columns if k != 'Time' and k not in CORE_COLUMNS and k not in GUST_COLUMNS]
+
+    def has(self, name):
+        return name in self.columns
+
+    def __len__(self):
+        return len(self.columns['Time'])
+
+    def _memo(self, key, builder):
+        if key not in self._views: self._views[key] = builder()
+        return self._views[key]
+
+    # --- 衍生檢視 ---
+    def _build_frame(self, names):
+        df = pd.DataFrame({k: self.columns[k] for k in names})
+        df.insert(0, 'Time', pd.to_datetime(self.columns['Time'], unit='ns'))
+        return df
+
+    def frame(self):
+        """完整逐時表 (標準欄位 + extras，保留 NaN)"""
+        return self._memo('frame', lambda: self._build_frame([k for k in self.columns if k != 'Time']))
+
+    def core_frame(self):
+        """只含標準欄位的逐時表 (保留 NaN)"""
+        return self._memo('core', lambda: self._build_frame([c for c in CORE_COLUMNS if self.has(c)]))
+
+    def hourly_frame(self):
+        """Tab 2 用逐時表：Time + 標準欄位，缺值補 0"""
+        def build():
+            df = self.core_frame().copy()
+            for c in df.columns[1:]: df[c] = df[c].fillna(0)
+            return df
+        return self._memo('hourly', build).copy()
+
+    def daily(self):
+        """日統計：Temp 均/高/低、Solar 日總量、Wind/RH 日均"""
+        def build():
+            df = self.core_frame().set_index('Time')
+            agg_rules = {}
+            if self.has('Temp'): agg_rules['Temp'] = ['mean', 'max', 'min']
+            if self.has('Solar'): agg_rules['Solar'] = ['sum']
+            if self.has('Wind'): agg_rules['Wind'] = ['mean']
+            if self.has('RH'): agg_rules['RH'] = ['mean']
+            daily = df.resample('D').agg(agg_rules)
+            # Flatten columns
+            daily.columns = [f"{col[0]}_{col[1].capitalize()}" for col in daily.columns]
+            return daily
+        return self._memo('daily', build)
+
+    def monthly(self):
+        """月統計 (日統計的月平均，index = 1..12)"""
+        def build():
+            daily = self.daily()
+            return daily.groupby(daily.index.month).mean().reindex(range(1, 13))
+        return self._memo('monthly', build)
+
+    def yearly_monthly(self):
+        """逐年月統計 (日統計依 (年, 月) 一次 groupby)：index = (Year, Month)，另含有效天數 Days"""
+        def build():
+            daily = self.daily()
+            keys = [daily.index.year.rename('Year'), daily.index.month.rename('Month')]
+            grp = daily.groupby(keys)
+            out = grp.mean()
+            first = daily.columns[0] if len(daily.columns) else None
+            out['Days'] = grp[first].count() if first is not None else 0
+            return out
+        return self._memo('yearly_monthly', build)
+
+    def light_base(self):
+        """光環境基礎表：Time / Raw_MJ (缺值補 0) / Month / Hour"""
+        def build():
+            if not self.has('Solar'): return None
+            df = pd.DataFrame({'Time': pd.to_datetime(self.columns['Time'], unit='ns')})
+            df['Raw_MJ'] = np.nan_to_num(self.columns['Solar'], nan=0.0)
+            df['Month'] = df['Time'].dt.month
+            df['Hour'] = df['Time'].dt.hour
+            return df
+        return self._memo('light', build)
+
+    def month_hour(self):
+        """每列的 (月份 0..11, 小時 0..23) 整數索引，供 bincount 分組使用"""
+        def build():
+            t = self.columns['Time'].astype('datetime64[ns]')
+            month = t.astype('datetime64[M]').astype('int64') % 12
+            hour = (t - t.astype('datetime64[D]')).astype('timedelta64[h]').astype('int64')
+            return month, hour
+        return self._memo('month_hour', build)
+
+    def light_matrix(self):
+        """
+        各月各時平均日射量 (MJ/m²/h)，shape (12, 24)
+        與 light_base() 的 pivot_table 平均相同 (缺值以 0 計入，無資料的格子為 0)
+        """
+        def build():
+            if not self.has('Solar'): return None
+            month, hour = self.month_hour()
+            cell = month * 24 + hour
+            mj = np.nan_to_num(self.columns['Solar'], nan=0.0)
+            total = np.bincount(cell, weights=mj, minlength=288)
+            count = np.bincount(cell, minlength=288)
+            return np.divide(total, count, out=np.zeros(288), where=count > 0).reshape(12, 24)
+        return self._memo('light_matrix', build)
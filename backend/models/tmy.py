@@ -0,0 +1,164 @@
+# 檔案位置: backend/models/tmy.py
+"""
+典型氣象年 (TMY) 產生器
+每個月從歷年資料中挑出「日統計分佈」最接近長期分佈的那一年 (Finkelstein-Schafer 統計量)，
+再把 12 個被選中的月份接成一個 8760 小時的年份 (2001 年，非閏年)。
+"""
+import numpy as np
+
+from backend.models.station_dataset import hour_index
+
+# FS 權重 (參考 Sandia 方法；沒有露點/直達日射資料，以相對濕度代替露點，日射只用全天空日射量)
+FS_WEIGHTS = {
+    'Temp_Max': 1, 'Temp_Min': 1, 'Temp_Mean': 2,
+    'RH_Mean': 2, 'Wind_Mean': 2, 'Solar_Sum': 12,
+}
+TMY_YEAR = 2001
+TMY_VARIABLES = ['Temp', 'Solar', 'Wind', 'RH']
+# 候選月份至少要有這個比例的日資料
+MIN_MONTH_COVERAGE = 0.8
+# FS 分數差在此以內視為同分 (年份少時常有數學上完全相同的分數)
+FS_TIE = 1e-12
+# 短缺口 (小時) 用線性內插；更長的缺口以長期「月×時」平均補上
+MAX_INTERP_GAP = 6
+
+
+def fs_statistic(values, pool, group, n_pools, n_groups):
+    """
+    Finkelstein-Schafer 統計量 (一次算完所有候選)：候選樣本的經驗累積分佈，
+    在長期樣本每個點上與長期分佈的平均絕對差
+    values: 1 維陣列 (NaN 不計)；pool: 各值所屬的長期樣本 0..n_pools-1 (月份)；
+    group: 各值所屬的候選 0..n_groups-1 (年份)。候選 (g, p) 的樣本 = pool p 中屬於 g 的值
+    回傳 (n_groups, n_pools)；沒有樣本的組合為 NaN
+    全部值依 (pool, 值) 只排序一次：候選值 v ≤ x_j 等價於 v 在長期樣本中的左插入位置 ≤ j，
+    所以各候選的累積分佈 = 插入位置的直方圖 (候選 × 點) 在每個 pool 區段內累加
+    """
+    out = np.full((n_groups, n_pools), np.nan)
+    ok = ~np.isnan(values)
+    if not ok.any(): return out
+    v, p, g = values[ok], np.asarray(pool)[ok], np.asarray(group)[ok]
+    order = np.lexsort((v, p))
+    v, p, g = v[order], p[order], g[order]
+    n = len(v)
+    idx = np.arange(n)
+
+    new_pool = np.r_[True, p[1:] != p[:-1]]
+    new_run = new_pool | np.r_[True, v[1:] != v[:-1]]                     # 同一 pool 內相同值為一段
+    run_start = np.maximum.accumulate(np.where(new_run, idx, 0))          # = 左插入位置 (全域索引)
+    run_end = np.minimum.accumulate(np.where(np.r_[new_run[1:], True], idx, n)[::-1])[::-1]
+    starts = idx[new_pool]
+    lengths = np.diff(np.r_[starts, n])
+    ordinal = np.cumsum(new_pool) - 1                                     # 第幾個 pool 區段
+    seg_start = starts[ordinal]
+    cdf_x = (run_end + 1 - seg_start) / lengths[ordinal]
+
+    hist = np.bincount(g * n + run_start, minlength=n_groups * n).reshape(n_groups, n)
+    cum = np.cumsum(hist, axis=1)
+    cum = cum - np.where(seg_start > 0, cum[:, np.maximum(seg_start - 1, 0)], 0)
+    size = np.add.reduceat(hist, starts, axis=1)                          # (候選, pool 區段)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cdf_c = cum / size[:, ordinal]
+        dist = np.add.reduceat(np.abs(cdf_c - cdf_x), starts, axis=1) / lengths
+    out[:, p[starts]] = np.where(size > 0, dist, np.nan)
+    return out
+
+
+def fs_scores(daily):
+    """
+    每個 (年, 月) 的加權 FS 分數 (所有年、月一次以陣列計算)
+    daily: StationDataset.daily() (DatetimeIndex + Temp_Mean... 欄位)
+    回傳 {(年, 月): 分數}；資料不足的月份不列入
+    """
+    fields = [f for f in FS_WEIGHTS if f in daily.columns]
+    if not fields or len(daily) == 0: return {}
+    total_w = sum(FS_WEIGHTS[f] for f in fields)
+    values = {f: daily[f].values.astype('float64') for f in fields}
+    cand, group = np.unique(daily.index.year.values, return_inverse=True)
+    month = daily.index.month.values - 1
+    days_in = np.zeros(12)
+    days_in[month] = daily.index.days_in_month.values
+    has_data = ~np.all([np.isnan(values[f]) for f in fields], axis=0)
+
+    # 候選 (年, 月)：該月有資料的天數達 MIN_MONTH_COVERAGE
+    present = np.bincount(group * 12 + month, minlength=len(cand) * 12).reshape(len(cand), 12) > 0
+    covered = np.bincount(group * 12 + month, weights=has_data, minlength=len(cand) * 12).reshape(len(cand), 12)
+    eligible = present & (covered >= MIN_MONTH_COVERAGE * days_in)
+
+    s = np.zeros((len(cand), 12))
+    for f in fields:
+        s += FS_WEIGHTS[f] * np.nan_to_num(fs_statistic(values[f], month, group, 12, len(cand)), nan=0.0)
+    s /= total_w
+    return {(int(cand[y]), int(m) + 1): float(s[y, m]) for y, m in sorted(zip(*np.nonzero(eligible)), key=lambda k: (k[1], k[0]))}
+
+
+def select_months(scores):
+    """
+    每個月取 FS 分數最小的年份：回傳 (年份陣列[12], 分數陣列[12])，無候選時年份為 -1
+    分數差在 FS_TIE 以內視為同分 (只差捨入誤差)，取較早的年份
+    """
+    years = np.full(12, -1, dtype='int64')
+    best = np.full(12, np.nan)
+    for (y, m), s in sorted(scores.items()):
+        if np.isnan(best[m - 1]) or s < best[m - 1] - FS_TIE:
+            years[m - 1], best[m - 1] = y, s
+    return years, best
+
+
+def assemble_tmy(time_ns, columns, years):
+    """
+    把選中的月份接成 8760 小時
+    time_ns: int64 ns 時間 (不需排序)；columns: {變數: float 陣列}；years: 每月選用的年份 (12,)
+    回傳 {'Time': datetime64[h] (8760,), 變數: float32 (8760,)}
+    """
+    all_hours = hour_index(time_ns)
+    order = np.argsort(all_hours, kind='stable')
+    uniq, first = np.unique(all_hours[order], return_index=True)
+
+    ref = np.arange(f'{TMY_YEAR}-01-01T00', f'{TMY_YEAR + 1}-01-01T00', dtype='datetime64[h]')
+    ref_month = ref.astype('datetime64[M]')
+    offset = ref - ref_month.astype('datetime64[h]')          # 該月第幾個小時
+    month_idx = ref_month.astype('int64') % 12                  # 0..11
+    src_month = np.array([np.datetime64(f'{y if y >= 0 else TMY_YEAR}-{m + 1:02d}', 'M') for m, y in enumerate(years)])
+    src = (src_month[month_idx].astype('datetime64[h]') + offset).astype('int64')
+
+    pos = np.searchsorted(uniq, src)
+    pos = np.minimum(pos, len(uniq) - 1)
+    found = (uniq[pos] == src) & (years[month_idx] >= 0)
+    rows = order[first[pos]]
+
+    # 長期「月×時」平均：補長缺口用
+    cell = (all_hours.astype('datetime64[h]').astype('datetime64[M]').astype('int64') % 12) * 24 + all_hours % 24
+    ref_cell = month_idx * 24 + ref.astype('int64') % 24
+
+    out = {'Time': ref}
+    for v in TMY_VARIABLES:
+        if v not in columns: continue
+        x = np.asarray(columns[v], dtype='float64')
+        series = np.where(found, x[rows], np.nan)
+        ok = ~np.isnan(x)
+        total = np.bincount(cell[ok], weights=x[ok], minlength=288)
+        count = np.bincount(cell[ok], minlength=288)
+        profile = np.divide(total, count, out=np.full(288, np.nan), where=count > 0)
+        out[v] = _fill_gaps(series, profile[ref_cell]).astype('float32')
+    return out
+
+
+def _fill_gaps(series, fallback):
+    """MAX_INTERP_GAP 小時以內的缺口線性內插，其餘以 fallback 補上 (fallback 也缺時再內插)"""
+    nan = np.isnan(series)
+    if not nan.any(): return series
+    idx = np.arange(len(series))
+    valid = idx[~nan]
+    if len(valid) == 0: return fallback.copy()
+    interp = np.interp(idx, valid, series[~nan])
+    # 每個缺值點所在缺口的長度
+    starts = np.flatnonzero(nan & ~np.r_[False, nan[:-1]])
+    ends = np.flatnonzero(nan & ~np.r_[nan[1:], False])
+    gap_len = np.zeros(len(series), dtype='int64')
+    gap_len[nan] = np.repeat(ends - starts + 1, ends - starts + 1)
+    inside = (idx > valid[0]) & (idx < valid[-1])
+    short = nan & inside & (gap_len <= MAX_INTERP_GAP)
+    out = np.where(short, interp, series)
+    out = np.where(np.isnan(out), fallback, out)
+    # 月×時平均也沒有的格子 (極少數)：最後以線性內插/外插補齊，保證沒有 NaN
+    return np.where(np.isnan(out), interp, out)
@@ -0,0 +1,83 @@
+# 檔案位置: backend/models/ventilation.py
+"""
+自然通風：浮力 (煙囪效應) + 風力耦合模型
+- 流量係數 Cd 由防蟲網開孔率換算 (網的壓損係數與開口串聯)
+- 浮力通風與室內外溫差、天窗/側窗高差有關；風力通風與風速成正比；兩者以平方和開根號合成
+- 屋頂結構修正 gh_specs['_vent_struct'] (app：1 + sin(屋頂角)·0.5，即 'wind' 模型 _vent_eff 的結構部分)
+  乘在合成流量上；_vent_eff 的防蟲網部分由流量係數 Cd 取代，不重複計入
+- 室溫取決於通風量、通風量又取決於室溫 → 以有上限次數的阻尼固定點迭代求解，
+  整個 (設計 × 時數) 陣列一起迭代
+所有輸入可為純量或可廣播的陣列。
+"""
+import numpy as np
+
+GRAVITY = 9.81
+CD_OPEN = 0.65                 # 無網開口的流量係數
+SCREEN_LOSS = 1.2              # 網的壓損係數 ξ = SCREEN_LOSS · (1 - ε) / ε²  (ε：開孔率)
+WIND_COEF = 0.1                # 風壓係數 Cw (屋頂通風窗的經驗值)
+SINGLE_OPENING_HEIGHT = 1.0    # 只有一種通風窗時，開口本身的高度 (m)
+VENT_MAX_ITER = 30
+VENT_TOL = 1e-4                # 溫差收斂門檻 (°C)
+VENT_RELAX = 0.5               # 阻尼係數：新值與舊值各半
+
+
+def discharge_coefficient(insect_net):
+    """防蟲網開孔率 (%) → 通風窗的等效流量係數 Cd (開孔率 0 時為 0)"""
+    eps = np.clip(np.asarray(insect_net, dtype='float64') / 100, 0, 1)
+    with np.errstate(divide='ignore'):
+        xi = np.where(eps > 0, SCREEN_LOSS * (1 - eps) / np.maximum(eps, 1e-9) ** 2, np.inf)
+    return CD_OPEN / np.sqrt(1 + xi * CD_OPEN ** 2)
+
+
+def natural_ventilation(gh_specs, delta_t, wind, t_out):
+    """
+    自然通風量 (m³/s)
+    浮力：天窗 + 側窗時以兩者串聯的等效面積、高差 = 簷高 / 2 (側窗中心到簷高的天窗)；
+          只有一種窗時用單開口式 Cd·A/3·√(g·h·ΔT/T)
+    風力：Cd · (天窗 + 側窗) / 2 · √Cw · 風速
+    合成流量再乘屋頂結構修正 _vent_struct (沒有時為 1)
+    """
+    a_roof = np.asarray(gh_specs['roofVentArea'], dtype='float64')
+    a_side = np.asarray(gh_specs['sideVentArea'], dtype='float64')
+    cd = discharge_coefficient(gh_specs['insectNet'])
+    t_mean = np.asarray(t_out, dtype='float64') + 273.15 + np.asarray(delta_t) / 2
+    buoyancy = GRAVITY * np.abs(delta_t) / t_mean
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        a_pair = np.where((a_roof > 0) & (a_side > 0), a_roof * a_side / np.sqrt(a_roof ** 2 + a_side ** 2), 0.0)
+    height = np.asarray(gh_specs['gutterHeight'], dtype='float64') / 2
+    pair = cd * a_pair * np.sqrt(2 * buoyancy * height)
+    single = cd * (a_roof + a_side) / 3 * np.sqrt(buoyancy * SINGLE_OPENING_HEIGHT)
+    stack = np.where(a_pair > 0, pair, single)
+    wind_flow = cd * (a_roof + a_side) / 2 * np.sqrt(WIND_COEF) * np.asarray(wind, dtype='float64')
+    structure = np.asarray(gh_specs.get('_vent_struct', 1.0), dtype='float64')
+    return structure * np.sqrt(stack ** 2 + wind_flow ** 2)
+
+
+def solve_coupled(gh_specs, q_gain, conductance, forced_vent, t_out, wind,
+                  max_iter=VENT_MAX_ITER, tol=VENT_TOL):
+    """
+    耦合求解 ΔT = q_gain / (1200·(自然通風(ΔT) + 強制通風) + U·A)
+    q_gain: 淨得熱 (W，日射 - 噴霧)；conductance: U·A (W/K)；forced_vent: 風扇風量 (m³/s)
+    起始值用「只有風力通風」的解；阻尼固定點迭代，全部元素收斂或達 max_iter 即停止
+    回傳 {'delta_t', 'nat_vent', 'iterations', 'converged' (布林陣列)}
+    """
+    q_gain = np.asarray(q_gain, dtype='float64')
+    fixed = np.asarray(forced_vent, dtype='float64') * 1200 + np.asarray(conductance, dtype='float64')
+
+    def update(dt):
+        loss = natural_ventilation(gh_specs, dt, wind, t_out) * 1200 + fixed
+        return np.divide(q_gain, loss, out=np.zeros(np.broadcast(q_gain, loss).shape), where=loss > 0)
+
+    delta_t = update(0.0)
+    converged = np.zeros(delta_t.shape, dtype=bool)
+    it = 0
+    for it in range(1, max_iter + 1):
+        new = (1 - VENT_RELAX) * delta_t + VENT_RELAX * update(delta_t)
+        converged = np.abs(new - delta_t) < tol
+        delta_t = new
+        if converged.all(): break
+    if not converged.all():
+        print(f"⚠️ 通風耦合求解 {max_iter} 次未全部收斂 ({(~converged).sum()} / {converged.size} 筆)")
+    return {'delta_t': delta_t, 'nat_vent': natural_ventilation(gh_specs, delta_t, wind, t_out),
+            'iterations': it, 'converged': converged}
@@ -1,155 +1,537 @@
 import os
+import time
+import threading
 import pandas as pd
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+from backend.models.climate_accumulator import MonthlyAccumulator
+from backend.models.design_conditions import DESIGN_LEVELS, design_conditions
+from backend.models.diurnal_profile import PROFILE_VARIABLES, diurnal_profiles, temperature_offsets
+from backend.models.extreme_wind import gust_extremes
+from backend.models.heat_events import HEAT_THRESHOLDS, heat_event_stats
+from backend.models.solar_geometry import DEFAULT_LATITUDE, roof_transmittance
+from backend.models.light_suitability import DAYS_IN_MONTH, crop_arrays, light_suitability
+from backend.models.spatial_index import StationIndex, idw_weights
+from backend.models.tmy import TMY_VARIABLES, assemble_tmy, fs_scores, select_months
+from backend.models.station_dataset import StationDataset, map_station_columns, HEADER_MARKERS, CORE_COLUMNS
+from backend.services.csv_schema import SchemaRegistry
+from backend.services.data_watcher import FolderWatcher
+from backend.services.hourly_store import HourlyStore
+from backend.services.weather_cache import WeatherCache
+
+# 摘要欄位 → (月統計欄位, 缺值預設)
+SUMMARY_FIELDS = {
+    'temps': ('Temp_Mean', 25.0), 'maxTemps': ('Temp_Max', 30.0), 'minTemps': ('Temp_Min', 20.0),
+    'solar': ('Solar_Sum', 12.0), 'wind': ('Wind_Mean', 1.0), 'humidities': ('RH_Mean', 75.0),
+}
+# 「最差年」的判斷方向：溫度/濕度越高越差，日射/低溫/風速越低越差
+WORST_DIRECTION = {'temps': 'max', 'maxTemps': 'max', 'humidities': 'max', 'minTemps': 'min', 'solar': 'min', 'wind': 'min'}
+
+# 逐時模擬的氣象來源 → 說明
+HOURLY_SOURCES = {'record': '測站全紀錄', 'tmy': '典型氣象年 TMY'}
+
+# 1 MJ/m² 日射 ≈ 571.2 μmol/m²/s 的 PAR (45% 有效波段 × 4.57 μmol/J ÷ 3600 s)
+PPFD_PER_MJ = 571.2
+
+
+def _default_summary():
+    return {
+        'months': list(range(1,13)),
+        'temps': [25.0]*12, 'maxTemps': [30.0]*12, 'minTemps': [20.0]*12,
+        'solar': [12.0]*12, 'wind': [1.0]*12, 'humidities': [75.0]*12,
+        'rain': [100.0]*12, 'marketPrice': [30.0]*12
+    }
+
+
+def _read_station_csv(path, schemas):
+    """依推斷出的格式 (編碼/表頭列) 只讀一次；格式錯誤的行記錄到隔離報告"""
+    schema = schemas.get(path, HEADER_MARKERS)
+    if schema['header'] is None: return None
+    return schemas.read_csv(path, schema)
+
+
+def _load_station(path, cache, schemas):
+    """磁碟快取 → CSV 解析 (解析後寫回快取)；缺少觀測時間欄位時回傳 None"""
+    columns = cache.load(path)
+    if columns is not None: return StationDataset(columns, source=path)
+    df = _read_station_csv(path, schemas)
+    ds = StationDataset.from_frame(df, source=path) if df is not None else None
+    if ds is not None: cache.save(path, ds.columns)
+    return ds
+
+
+def _stream_monthly(path, schemas, chunksize):
+    """
+    分批讀取 CSV 並以線上累加器計算月統計
+    回傳與 StationDataset.monthly() 相同欄位的 DataFrame (index = 1..12)
+    讀取參數與完整解析相同 (不用 usecols：usecols 模式下欄位數不符的列也會被讀進來)，
+    經由 SchemaRegistry.stream_csv 讀取：壞行一樣進隔離報告、檔頭之後的解碼錯誤一樣換編碼重讀；
+    氣象欄位全空的列照樣計入日序 (完整解析的 resample('D') 把這些日子的日射量算成 0)
+    """
+    schema = schemas.get(path, HEADER_MARKERS)
+    if schema['header'] is None: raise ValueError("缺少觀測時間欄位")
+    header = pd.read_csv(path, header=schema['header'], nrows=0, encoding=schema['encoding'])
+    raw_cols = list(header.columns)
+    col_map = {k: c for k, c in map_station_columns([c.strip() for c in raw_cols]).items() if k == 'Time' or k in CORE_COLUMNS}
+    if 'Time' not in col_map: raise ValueError("缺少觀測時間欄位")
+
+    # strip 後的名稱 → 原始欄位名
+    raw_of = {c.strip(): c for c in raw_cols}
+
+    def accumulate(reader):
+        acc = MonthlyAccumulator([k for k in col_map if k != 'Time'])
+        for chunk in reader:
+            times = pd.to_datetime(chunk[raw_of[col_map['Time']]], errors='coerce')
+            valid = times.notna().values
+            days = times.values[valid].astype('datetime64[D]').astype('int64')
+            values = {k: pd.to_numeric(chunk[raw_of[c]], errors='coerce').values[valid].astype('float64')
+                      for k, c in col_map.items() if k != 'Time'}
+            acc.add(days, values)
+        return acc
+
+    acc = schemas.stream_csv(path, schema, accumulate, chunksize, dtype=str)
+    if acc.out_of_order:
+        print(f"⚠️ {os.path.basename(path)} 時間未排序 ({acc.out_of_order} 處)，串流月統計可能有誤差")
+    return pd.DataFrame(acc.finish(), index=range(1, 13))
+
+
+def _build_summary(path, load_dataset, schemas, stream_threshold_mb, stream_chunksize):
+    """月摘要 (解析失敗時直接拋出例外，由呼叫端決定如何處理)；load_dataset(path) → StationDataset"""
+    default_data = _default_summary()
+    # 超大檔案改走分批串流，記憶體用量與檔案長度無關
+    if stream_threshold_mb is not None and os.path.getsize(path) > stream_threshold_mb * 1024 * 1024:
+        monthly_grp = _stream_monthly(path, schemas, stream_chunksize)
+    else:
+        ds = load_dataset(path)
+        if ds is None: raise ValueError("缺少觀測時間欄位")
+        monthly_grp = ds.monthly()
+
+    for key, (col, fill) in SUMMARY_FIELDS.items():
+        if col in monthly_grp: default_data[key] = monthly_grp[col].fillna(fill).tolist()
+    return default_data
+
+
+def _timed_summary(filename, build):
+    """build() 計時並攔截例外，回傳 (檔名, 摘要, 耗時秒數, 錯誤訊息)"""
+    t0 = time.perf_counter()
+    try:
+        summary, error = build(), None
+    except Exception as e:
+        summary, error = _default_summary(), f"{type(e).__name__}: {e}"
+    return filename, summary, time.perf_counter() - t0, error
+
+
+def _ingest_station(filename, base_folder, cache_folder, stream_threshold_mb, stream_chunksize):
+    """
+    (子行程用) 讀取單一測站摘要，回傳 ((檔名, 摘要, 耗時秒數, 錯誤訊息), 壞行隔離紀錄)
+    只建立磁碟快取與格式索引；隔離紀錄交回父行程併入 (子行程的 SchemaRegistry 隨行程結束)
+    """
+    cache, schemas = WeatherCache(cache_folder), SchemaRegistry(cache_folder)
+    path = os.path.join(base_folder, filename)
+    result = _timed_summary(filename, lambda: _build_summary(
+        path, lambda p: _load_station(p, cache, schemas), schemas, stream_threshold_mb, stream_chunksize))
+    return result, schemas.quarantine.get(os.path.abspath(path), [])
+
 
 class ClimateService:
-    def __init__(self, base_folder='data/weather_data'):
+    def __init__(self, base_folder='data/weather_data', cache_folder=None, workers=1,
+                 stream_threshold_mb=200, stream_chunksize=50000, coords_path=None):
         self.base_folder = base_folder
+        # 測站座標檔 (預設 data/station_coords.csv)
+        if coords_path is None:
+            coords_path = os.path.join(os.path.dirname(os.path.normpath(base_folder)), 'station_coords.csv')
+        self.coords_path = coords_path
+        # 解析結果快取於 data/cache/weather (與 weather_data 同層)
+        if cache_folder is None:
+            cache_folder = os.path.join(os.path.dirname(os.path.normpath(base_folder)), 'cache', 'weather')
+        self.cache = WeatherCache(cache_folder)
+        # 各檔編碼/表頭列推斷結果 (依檔案指紋快取) 與壞行隔離報告
+        self.schemas = SchemaRegistry(cache_folder)
+        # 平行讀取的行程數 (1 = 單執行緒；0 或 None = 依 CPU 核心數)
+        self.workers = workers
+        # 超過此大小 (MB) 的檔案以分批串流計算月摘要；None = 停用
+        self.stream_threshold_mb = stream_threshold_mb
+        self.stream_chunksize = stream_chunksize
+        self.load_errors = {}   # {檔名: 錯誤訊息}
+        self.load_timings = {}  # {檔名: 讀取秒數}
+        self._datasets = {}     # {絕對路徑: (指紋, StationDataset)}
+        self._stores = {}       # {絕對路徑: (指紋, HourlyStore)}
+        self._light = {}        # {絕對路徑: (指紋, 12×24 平均日射量)}
+        self._yearly = {}       # {絕對路徑: (指紋, 逐年月統計 DataFrame)}
+        self._tmy = {}          # {絕對路徑: (指紋, {'hourly': 8760 小時 DataFrame, 'selection': 選月表})}
+        self._heat = {}         # {門檻: ((檔名, 指紋)..., 高溫事件統計)}
+        self._design = {}       # {絕對路徑: (指紋, 設計條件 dict)}
+        self._gust = None       # ((檔名, 指紋)..., 陣風極值分析)
+        self._profiles = {}     # {絕對路徑: (指紋, 12×24×變數 日變化)}
+        self._station_index = None  # (座標檔 mtime + 測站清單, StationIndex)
+        self._virtual = {}      # {(lat, lon, k, power, snap_km): 虛擬測站結果}
+        # 增量更新用：資料夾變動偵測 + 目前的 WEATHER_DB
+        self.watcher = FolderWatcher(base_folder, '.csv')
+        self.weather_db = None
+        self._refresh_lock = threading.Lock()
 
     # 1. 掃描與摘要
-    def scan_and_load_weather_data(self):
+    def scan_and_load_weather_data(self, workers=None):
         weather_db = {}
         if not os.path.exists(self.base_folder):
             try: os.makedirs(self.base_folder)
             except: pass
             return weather_db
-        
-        for f in os.listdir(self.base_folder):
-            if f.endswith('.csv'):
-                try:
-                    path = os.path.join(self.base_folder, f)
-                    loc_id = f.split('.')[0]
-                    summary_data = self._read_summary(path)
-                    weather_db[loc_id] = {
-                        'id': loc_id, 'name': loc_id, 'data': summary_data, 'filename': f
-                    }
-                except: continue
+
+        files = [f for f in os.listdir(self.base_folder) if f.endswith('.csv')]
+        workers = self.workers if workers is None else workers
+        if not workers or workers < 0: workers = os.cpu_count() or 1
+        workers = min(workers, len(files))
+
+        results = None
+        if workers > 1:
+            try:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    jobs = [pool.submit(_ingest_station, f, self.base_folder, self.cache.cache_folder,
+                                        self.stream_threshold_mb, self.stream_chunksize) for f in files]
+                    outputs = [job.result() for job in jobs]
+                results = [result for result, _ in outputs]
+                for f, (_, bad_lines) in zip(files, outputs):
+                    self.schemas.merge_quarantine(os.path.join(self.base_folder, f), bad_lines)
+                # 子行程已把格式寫進磁碟上的索引，下次存取時重讀
+                self.schemas.reload()
+            except Exception as e:
+                # 行程池無法啟動時 (例如受限環境)，退回單執行緒
+                print(f"⚠️ 平行讀取失敗，改用單執行緒: {e}")
+                results = None
+        if results is None:
+            results = [self._ingest(f) for f in files]
+
+        self.load_errors = {}
+        self.load_timings = {}
+        for result in results: self._add_station(weather_db, *result)
         return weather_db
 
-    def _read_summary(self, path):
-        default_data = {
-            'months': list(range(1,13)),
-            'temps': [25.0]*12, 'maxTemps': [30.0]*12, 'minTemps': [20.0]*12,
-            'solar': [12.0]*12, 'wind': [1.0]*12, 'humidities': [75.0]*12, 
-            'rain': [100.0]*12, 'marketPrice': [30.0]*12
+    def refresh_weather_data(self):
+        """
+        增量更新 WEATHER_DB (適合長時間執行的部署)
+        第一次呼叫時完整掃描；之後只重新讀取新增/內容變更的檔案、移除已刪除的測站，
+        其餘測站與快取原封不動。沒有變動時只花一輪 os.stat 的時間。
+        """
+        with self._refresh_lock:
+            if self.weather_db is None:
+                self.watcher.prime()  # 先記基準：掃描期間才放進來的檔案下次會被偵測到
+                self.weather_db = self.scan_and_load_weather_data()
+                return dict(self.weather_db)
+
+            changes = self.watcher.poll()
+            for f in changes['removed']:
+                self.invalidate(f, remove=True)
+                self.weather_db.pop(f.split('.')[0], None)
+            for f in changes['added'] + changes['changed']:
+                self.invalidate(f)
+                self._add_station(self.weather_db, *self._ingest(f))
+            if FolderWatcher.has_changes(changes):
+                print(f"🔄 氣象資料更新: 新增 {len(changes['added'])}、變更 {len(changes['changed'])}、移除 {len(changes['removed'])}")
+            return dict(self.weather_db)
+
+    def invalidate(self, filename, remove=False):
+        """讓單一檔案的記憶體快取失效；remove=True 時一併清除磁碟快取 (原始檔已刪除)"""
+        path = os.path.join(self.base_folder, os.path.basename(filename))
+        key = os.path.abspath(path)
+        self._datasets.pop(key, None)
+        self._stores.pop(key, None)
+        self._light.pop(key, None)
+        self._yearly.pop(key, None)
+        self._tmy.pop(key, None)
+        self._design.pop(key, None)
+        self._profiles.pop(key, None)
+        # 虛擬測站由多個測站內插而來，任何測站變動都整批失效
+        self._virtual.clear()
+        self._heat.clear()
+        self._gust = None
+        self._station_index = None
+        self.load_errors.pop(filename, None)
+        self.load_timings.pop(filename, None)
+        if remove:
+            self.cache.discard(path)
+            self.schemas.discard(path)
+
+    def _ingest(self, filename):
+        """讀取單一測站摘要，回傳 (檔名, 摘要, 耗時秒數, 錯誤訊息)"""
+        return _timed_summary(filename, lambda: self._build_summary(os.path.join(self.base_folder, filename)))
+
+    def _add_station(self, weather_db, f, summary_data, elapsed, error):
+        loc_id = f.split('.')[0]
+        weather_db[loc_id] = {
+            'id': loc_id, 'name': loc_id, 'data': summary_data, 'filename': f
         }
+        self.load_timings[f] = elapsed
+        if error:
+            self.load_errors[f] = error
+            print(f"⚠️ {f} 讀取失敗，改用預設氣候: {error}")
+
+    # 0. 共用：每個測站只解析一次 (記憶體 → 磁碟快取 → CSV)
+    def get_dataset(self, path):
+        """取得測站資料集；原始檔變動 (大小/mtime) 時自動重新載入"""
+        key = os.path.abspath(path)
+        fingerprint = self.cache.fingerprint(path)
+        hit = self._datasets.get(key)
+        if hit and hit[0] == fingerprint: return hit[1]
+
+        ds = _load_station(path, self.cache, self.schemas)
+        if ds is None: return None
+        self._datasets[key] = (fingerprint, ds)
+        return ds
+
+    def _default_summary(self):
+        return _default_summary()
+
+    def _build_summary(self, path):
+        """月摘要 (解析失敗時直接拋出例外，由呼叫端決定如何處理)"""
+        return _build_summary(path, self.get_dataset, self.schemas, self.stream_threshold_mb, self.stream_chunksize)
+
+    def _read_summary(self, path):
+        try: return self._build_summary(path)
+        except: return self._default_summary()
+
+    def stream_monthly(self, path, chunksize=None):
+        """分批串流計算月統計 (見 _stream_monthly)"""
+        return _stream_monthly(path, self.schemas, chunksize or self.stream_chunksize)
+
+    def compare_stream(self, filename, chunksize=None):
+        """
+        同一檔案的串流月統計 vs 完整解析 (StationDataset.monthly) 的最大差異 {欄位: 絕對誤差}
+        兩邊缺值位置不同時該欄為 inf；用來確認摘要不因檔案是否超過串流門檻而改變
+        """
+        path = os.path.join(self.base_folder, os.path.basename(filename))
+        ds = self.get_dataset(path)
+        if ds is None: raise ValueError("缺少觀測時間欄位")
+        full, stream = ds.monthly(), self.stream_monthly(path, chunksize)
+        diff = {}
+        for col in full.columns:
+            a = full[col].to_numpy(dtype='float64')
+            b = stream[col].to_numpy(dtype='float64') if col in stream else np.full(12, np.nan)
+            if not np.array_equal(np.isnan(a), np.isnan(b)): diff[col] = np.inf
+            else: diff[col] = float(np.nanmax(np.abs(a - b), initial=0.0))
+        return diff
+
+    # 1b. 逐年月統計與年際變異
+    def get_yearly_monthly(self, filename):
+        """
+        逐年月統計 DataFrame：index = (Year, Month)，欄位同月摘要 (Temp_Mean...) 另含 Days
+        每站只算一次，存於記憶體與磁碟快取 (與測站快取同一指紋)
+        """
+        path = self._find_weather_file(filename)
+        if path is None: return None
         try:
-            try: df = pd.read_csv(path, header=1, on_bad_lines='skip', encoding='cp950')
-            except: df = pd.read_csv(path, header=1, on_bad_lines='skip', encoding='utf-8')
-            df.columns = [c.strip() for c in df.columns]
-
-            col_map = {}
-            for c in df.columns:
-                if '觀測時間' in c or 'Time' in c: col_map['Time'] = c
-                elif '氣溫' in c or 'Temp' in c: col_map['Temp'] = c
-                elif '日射' in c or 'Solar' in c: col_map['Solar'] = c
-                elif '風速' in c or 'Wind' in c: col_map['Wind'] = c
-                elif '濕度' in c or 'RH' in c: col_map['RH'] = c
-
-            if 'Time' in col_map:
-                df['Time'] = pd.to_datetime(df[col_map['Time']], errors='coerce')
-                df = df.dropna(subset=['Time'])
-                df.set_index('Time', inplace=True)
-                for k, v in col_map.items(): 
-                    if k!='Time': df[v] = pd.to_numeric(df[v], errors='coerce')
-
-                agg_rules = {}
-                if 'Temp' in col_map: agg_rules[col_map['Temp']] = ['mean', 'max', 'min']
-                if 'Solar' in col_map: agg_rules[col_map['Solar']] = 'sum'
-                if 'Wind' in col_map: agg_rules[col_map['Wind']] = 'mean'
-                if 'RH' in col_map: agg_rules[col_map['RH']] = 'mean'
-
-                daily = df.resample('D').agg(agg_rules)
-                
-                # Flatten columns
-                new_cols = []
-                for col in daily.columns:
-                    base = "Temp" if col[0]==col_map.get('Temp') else "Solar" if col[0]==col_map.get('Solar') else "Wind" if col[0]==col_map.get('Wind') else "RH"
-                    new_cols.append(f"{base}_{col[1].capitalize()}")
-                daily.columns = new_cols
-                
-                monthly_grp = daily.groupby(daily.index.month).mean().reindex(range(1, 13))
-
-                if 'Temp_Mean' in monthly_grp:
-                    default_data['temps'] = monthly_grp['Temp_Mean'].fillna(25.0).tolist()
-                    default_data['maxTemps'] = monthly_grp['Temp_Max'].fillna(30.0).tolist()
-                    default_data['minTemps'] = monthly_grp['Temp_Min'].fillna(20.0).tolist()
-                if 'Solar_Sum' in monthly_grp: default_data['solar'] = monthly_grp['Solar_Sum'].fillna(12.0).tolist()
-                if 'Wind_Mean' in monthly_grp: default_data['wind'] = monthly_grp['Wind_Mean'].fillna(1.0).tolist()
-                if 'RH_Mean' in monthly_grp: default_data['humidities'] = monthly_grp['RH_Mean'].fillna(75.0).tolist()
-        except: pass
-        return default_data
+            key = os.path.abspath(path)
+            fingerprint = self.cache.fingerprint(path)
+            hit = self._yearly.get(key)
+            if hit and hit[0] == fingerprint: return hit[1]
+
+            cached = self.cache.load(path, 'yearly')
+            if cached is not None:
+                df = pd.DataFrame(cached).set_index(['Year', 'Month'])
+            else:
+                ds = self.get_dataset(path)
+                if ds is None: return None
+                df = ds.yearly_monthly()
+                self.cache.save(path, {'Year': df.index.get_level_values(0).values.astype('int64'),
+                                       'Month': df.index.get_level_values(1).values.astype('int64'),
+                                       **{c: df[c].values for c in df.columns}}, 'yearly')
+            self._yearly[key] = (fingerprint, df)
+            return df
+        except Exception as e:
+            print(f"⚠️ 逐年統計失敗 ({filename}): {e}")
+            return None
+
+    def available_years(self, filename):
+        yearly = self.get_yearly_monthly(filename)
+        if yearly is None or yearly.empty: return []
+        return sorted(int(y) for y in yearly.index.get_level_values('Year').unique())
+
+    def get_interannual_stats(self, filename):
+        """
+        各月的年際變異：index = 月份 1..12，欄位 = (月統計欄位, 統計量)
+        統計量：mean (逐年月平均的平均) / std (年際標準差，只有一年時為 NaN) / min / max / min_year / max_year
+        """
+        yearly = self.get_yearly_monthly(filename)
+        if yearly is None or yearly.empty: return None
+        years = np.array(sorted(yearly.index.get_level_values('Year').unique()))
+        stats = {}
+        for col in [c for c in yearly.columns if c != 'Days']:
+            wide = yearly[col].unstack('Year').reindex(index=range(1, 13), columns=years).values  # (12, 年數)
+            has = ~np.isnan(wide)
+            any_year = has.any(axis=1)
+            cnt = has.sum(axis=1)
+            mean = np.divide(np.where(has, wide, 0).sum(axis=1), cnt, out=np.full(12, np.nan), where=cnt > 0)
+            dev = np.where(has, wide - mean[:, np.newaxis], 0)
+            std = np.sqrt(np.divide((dev ** 2).sum(axis=1), cnt - 1, out=np.full(12, np.nan), where=cnt > 1))
+            i_min = np.where(has, wide, np.inf).argmin(axis=1)
+            i_max = np.where(has, wide, -np.inf).argmax(axis=1)
+            rows = np.arange(12)
+            stats[(col, 'mean')] = mean
+            stats[(col, 'std')] = std
+            stats[(col, 'min')] = np.where(any_year, wide[rows, i_min], np.nan)
+            stats[(col, 'max')] = np.where(any_year, wide[rows, i_max], np.nan)
+            stats[(col, 'min_year')] = np.where(any_year, years[i_min], np.nan)
+            stats[(col, 'max_year')] = np.where(any_year, years[i_max], np.nan)
+        return pd.DataFrame(stats, index=pd.Index(range(1, 13), name='Month'))
+
+    def worst_year(self, filename, by='maxTemps'):
+        """
+        依指定摘要欄位找出最差年 (方向見 WORST_DIRECTION)；
+        只比較資料月份數最多的年份，避免不完整年份被誤選
+        """
+        yearly = self.get_yearly_monthly(filename)
+        col = SUMMARY_FIELDS[by][0]
+        if yearly is None or col not in yearly: return None
+        wide = yearly[col].unstack('Year')
+        coverage = wide.notna().sum(axis=0)
+        candidates = wide.loc[:, coverage == coverage.max()].mean(axis=0)
+        if candidates.dropna().empty: return None
+        return int(candidates.idxmax() if WORST_DIRECTION[by] == 'max' else candidates.idxmin())
+
+    def get_year_summary(self, filename, year=None, worst_by='maxTemps'):
+        """
+        指定年份的月摘要 (格式同 WEATHER_DB 的 data，另含 'year')
+        year=None → 全部年份平均 (典型年)；year='worst' → worst_year()；
+        該年缺資料的月份以全部年份平均補上
+        """
+        path = self._find_weather_file(filename)
+        if path is None: return None
+        typical = self._read_summary(path)
+        profile = self.temp_profile(filename)
+        if profile is not None: typical['tempProfile'] = profile
+        if year is None: return typical
+        if year == 'worst': year = self.worst_year(filename, worst_by)
+        yearly = self.get_yearly_monthly(filename)
+        if year is None or yearly is None or year not in yearly.index.get_level_values('Year'): return typical
+
+        monthly_grp = yearly.xs(year, level='Year').reindex(range(1, 13))
+        data = dict(typical)
+        # 日變化曲線沿用全部年份的平均 (單一年份的月×時樣本太少)
+        for key, (col, _) in SUMMARY_FIELDS.items():
+            if col in monthly_grp:
+                data[key] = monthly_grp[col].fillna(pd.Series(typical[key], index=range(1, 13))).tolist()
+        data['year'] = int(year)
+        return data
+
+    # 1c. 典型氣象年 (TMY)
+    def _load_tmy(self, filename):
+        path = self._find_weather_file(filename)
+        if path is None: return None
+        try:
+            key = os.path.abspath(path)
+            fingerprint = self.cache.fingerprint(path)
+            hit = self._tmy.get(key)
+            if hit and hit[0] == fingerprint: return hit[1]
+
+            arrays = self.cache.load(path, 'tmy')
+            if arrays is None:
+                ds = self.get_dataset(path)
+                if ds is None: return None
+                years, scores = select_months(fs_scores(ds.daily()))
+                if (years < 0).all(): return None
+                built = assemble_tmy(ds.columns['Time'], {v: ds.columns[v] for v in TMY_VARIABLES if ds.has(v)}, years)
+                arrays = {'Time': built['Time'].astype('datetime64[ns]').view('int64'),
+                          **{v: built[v] for v in TMY_VARIABLES if v in built},
+                          '__years__': years, '__fs__': scores}
+                self.cache.save(path, arrays, 'tmy')
+
+            hourly = pd.DataFrame({v: arrays[v].astype('float64') for v in TMY_VARIABLES if v in arrays})
+            hourly.insert(0, 'Time', pd.to_datetime(arrays['Time'], unit='ns'))
+            selection = pd.DataFrame({'Month': range(1, 13), 'Year': arrays['__years__'], 'FS': arrays['__fs__']})
+            result = {'hourly': hourly, 'selection': selection}
+            self._tmy[key] = (fingerprint, result)
+            return result
+        except Exception as e:
+            print(f"⚠️ TMY 建立失敗 ({filename}): {e}")
+            return None
+
+    def get_tmy(self, filename):
+        """
+        典型氣象年 8760 小時 (Time 為 2001 年；Temp/Solar/Wind/RH)
+        每月選 FS 統計量最小的歷史月份拼接；短缺口內插、長缺口以「月×時」平均補上
+        每站只建一次，存於記憶體與磁碟快取
+        """
+        tmy = self._load_tmy(filename)
+        return tmy['hourly'].copy() if tmy else None
+
+    def tmy_selection(self, filename):
+        """TMY 各月選用的年份與加權 FS 分數 (越小越接近長期分佈；年份 -1 表示無可用月份)"""
+        tmy = self._load_tmy(filename)
+        return tmy['selection'].copy() if tmy else None
+
+    def hourly_record(self, filename, source='record'):
+        """
+        逐時模擬 (run_hourly_simulation / SweepService.run 的 hourly['record']) 用的氣象紀錄
+        {'Time': int64 ns, 'Temp', 'Solar', 'Wind', 'RH'}；無資料時回傳 None
+        source: 'record' = 測站全紀錄 (HourlyStore)；'tmy' = 典型氣象年 8760 小時 (get_tmy)
+        """
+        if source not in HOURLY_SOURCES: raise ValueError(f"未知的逐時氣象來源: {source}")
+        if source == 'tmy':
+            tmy = self.get_tmy(filename)
+            if tmy is None: return None
+            return {'Time': tmy['Time'].values.astype('datetime64[ns]').view('int64'),
+                    **{v: tmy[v].to_numpy(dtype='float64') for v in TMY_VARIABLES if v in tmy}}
+        store = self.get_hourly_store(filename)
+        return {'Time': store.time, **store.arrays} if store is not None else None
 
     # 2. 讀取小時 (Tab 2 用)
     def read_hourly_data(self, filename):
         path = os.path.join(self.base_folder, filename)
         if not os.path.exists(path): return None
         try:
-            try: df = pd.read_csv(path, header=1, on_bad_lines='skip', encoding='cp950')
-            except: df = pd.read_csv(path, header=1, on_bad_lines='skip', encoding='utf-8')
-            df.columns = [c.strip() for c in df.columns]
-            
-            # Smart Mapping
-            col_map = {}
-            for c in df.columns:
-                if '觀測時間' in c or 'Time' in c: col_map['Time'] = c
-                elif '氣溫' in c or 'Temp' in c: col_map['Temp'] = c
-                elif '日射' in c or 'Solar' in c: col_map['Solar'] = c
-                elif '風速' in c or 'Wind' in c: col_map['Wind'] = c
-                elif '濕度' in c or 'RH' in c: col_map['RH'] = c
-
-            if 'Time' in col_map:
-                rename_dict = {col_map['Time']: 'Time'}
-                if 'Temp' in col_map: rename_dict[col_map['Temp']] = 'Temp'
-                if 'Solar' in col_map: rename_dict[col_map['Solar']] = 'Solar'
-                if 'Wind' in col_map: rename_dict[col_map['Wind']] = 'Wind'
-                if 'RH' in col_map: rename_dict[col_map['RH']] = 'RH'
-                
-                df = df.rename(columns=rename_dict)
-                df['Time'] = pd.to_datetime(df['Time'], errors='coerce')
-                df = df.dropna(subset=['Time'])
-                for c in ['Temp', 'Solar', 'Wind', 'RH']:
-                    if c in df.columns: df[c] = pd.to_numeric(df[c], errors='coerce').fillna(0)
-                return df
-            return None
+            ds = self.get_dataset(path)
+            return ds.hourly_frame() if ds is not None else None
         except: return None
 
+    def get_hourly_store(self, filename):
+        """逐時 float32 mmap 儲存 (含日期索引)；原始檔變動時自動重建"""
+        path = os.path.join(self.base_folder, os.path.basename(filename))
+        if not os.path.exists(path): return None
+        try:
+            key = os.path.abspath(path)
+            fingerprint = self.cache.fingerprint(path)
+            hit = self._stores.get(key)
+            if hit and hit[0] == fingerprint: return hit[1]
+
+            root = self.cache.artifact_dir(path, 'hourly')
+            store = HourlyStore.open(root, fingerprint)
+            if store is None:
+                ds = self.get_dataset(path)
+                if ds is None: return None
+                store = HourlyStore.build(ds, root, fingerprint)
+            self._stores[key] = (fingerprint, store)
+            return store
+        except Exception as e:
+            print(f"⚠️ 逐時儲存建立失敗 ({filename}): {e}")
+            return None
+
     # 3. [關鍵修正] 進階光環境分析
-    def analyze_advanced_light(self, filename, transmittance_percent=100):
-        # 尋找檔案
+    def _find_weather_file(self, filename):
         target_path = os.path.join(self.base_folder, os.path.basename(filename))
         if not os.path.exists(target_path):
             target_path = os.path.join('data', os.path.basename(filename))
             if not os.path.exists(target_path): return None
+        return target_path
 
-        try:
-            # 讀取檔案
-            try: df = pd.read_csv(target_path, header=1, on_bad_lines='skip', encoding='cp950')
-            except: df = pd.read_csv(target_path, header=1, on_bad_lines='skip', encoding='utf-8')
-            
-            df.columns = [c.strip() for c in df.columns]
+    def analyze_advanced_light(self, filename, transmittance_percent=100):
+        # 尋找檔案
+        target_path = self._find_weather_file(filename)
+        if target_path is None: return None
 
-            # [重點] 智慧尋找「日射量」欄位，而不是只抓第 13 欄
-            col_time = next((c for c in df.columns if '觀測時間' in c or 'Time' in c), None)
-            col_solar = next((c for c in df.columns if '全天空日射量' in c or '日射' in c or 'Solar' in c), None)
+        try:
+            ds = self.get_dataset(target_path)
+            base = ds.light_base() if ds is not None else None
 
-            if col_time and col_solar:
-                df = df.rename(columns={col_time: 'Time', col_solar: 'Raw_MJ'})
-                df['Time'] = pd.to_datetime(df['Time'], errors='coerce')
-                df = df.dropna(subset=['Time'])
-                
-                # 轉數值 (確保真的是數字，不是 "X" 或 "--")
-                df['Raw_MJ'] = pd.to_numeric(df['Raw_MJ'], errors='coerce').fillna(0)
+            if base is not None:
+                df = base.copy()
                 
                 # 核心運算
                 ratio = transmittance_percent / 100.0
                 df['Val_MJ'] = df['Raw_MJ'] * ratio
                 df['Val_Wh'] = df['Val_MJ'] * 277.78
-                df['Val_PPFD'] = df['Val_MJ'] * 571.2 # 1 MJ solar ~ 571 umol PAR
+                df['Val_PPFD'] = df['Val_MJ'] * PPFD_PER_MJ # 1 MJ solar ~ 571 umol PAR
                 df['Val_DLI_Hr'] = df['Val_MJ'] * 2.056
-                
-                df['Month'] = df['Time'].dt.month
-                df['Hour'] = df['Time'].dt.hour
                 return df
             
             print(f"⚠️ {filename} 缺少必要欄位 (需要: 觀測時間, 全天空日射量)")
@@ -178,15 +560,462 @@ class ClimateService:
         return default_crops
 
     # 5. 計算矩陣
-    def calculate_monthly_light_matrix(self, filename, transmittance_percent=100):
-        df = self.analyze_advanced_light(filename, transmittance_percent)
-        if df is None or df.empty: return None, None
+    def get_light_matrix(self, filename):
+        """
+        各月各時平均日射量 (MJ/m²/h，12×24 陣列)
+        每個測站只算一次 (bincount 分組平均)，結果存於記憶體與磁碟快取；原始檔變動時自動重算
+        """
+        path = self._find_weather_file(filename)
+        if path is None: return None
+        try:
+            key = os.path.abspath(path)
+            fingerprint = self.cache.fingerprint(path)
+            hit = self._light.get(key)
+            if hit and hit[0] == fingerprint: return hit[1]
+
+            cached = self.cache.load(path, 'light')
+            if cached is not None:
+                base = cached['mj']
+            else:
+                ds = self.get_dataset(path)
+                base = ds.light_matrix() if ds is not None else None
+                if base is None:
+                    print(f"⚠️ {filename} 缺少必要欄位 (需要: 觀測時間, 全天空日射量)")
+                    return None
+                self.cache.save(path, {'mj': base}, 'light')
+            self._light[key] = (fingerprint, base)
+            return base
+        except Exception as e:
+            print(f"Error analyzing light: {e}")
+            return None
+
+    def light_sweep(self, filename, transmittances, ppfd_coef=PPFD_PER_MJ):
+        """
+        一次算出多個透光率 (%) 的 PPFD 矩陣 (μmol/m²/s)
+        回傳 shape (透光率數, 12, 24) 的陣列；每日加總 × 3600 / 1e6 即為 DLI
+        """
+        base = self.get_light_matrix(filename)
+        if base is None: return None
+        ratio = np.asarray(transmittances, dtype='float64').reshape(-1, 1, 1) / 100.0
+        return base[np.newaxis] * ratio * ppfd_coef
+
+    @staticmethod
+    def dli_from_ppfd(ppfd):
+        """PPFD 矩陣 (..., 24) → 日累積光量 DLI (mol/m²/day)"""
+        return np.asarray(ppfd).sum(axis=-1) * 3600 / 1_000_000
+
+    def calculate_monthly_light_matrix(self, filename, transmittance_percent=100, ppfd_coef=PPFD_PER_MJ):
+        sweep = self.light_sweep(filename, [transmittance_percent], ppfd_coef)
+        if sweep is None: return None, None
         try:
-            # 算出平均
-            matrix_ppfd = df.pivot_table(index='Month', columns='Hour', values='Val_PPFD', aggfunc='mean').fillna(0)
-            matrix_ppfd = matrix_ppfd.reindex(index=range(1, 13), columns=range(0, 24), fill_value=0)
+            matrix_ppfd = pd.DataFrame(sweep[0], index=pd.Index(range(1, 13), name='Month'),
+                                       columns=pd.Index(range(0, 24), name='Hour'))
             # DLI (日總量)
-            daily_sum_ppfd = matrix_ppfd.sum(axis=1) 
-            dli_series = daily_sum_ppfd * 3600 / 1_000_000
+            dli_series = pd.Series(self.dli_from_ppfd(sweep[0]), index=matrix_ppfd.index)
             return matrix_ppfd, dli_series
-        except: return None, None
\ No newline at end of file
+        except: return None, None
+
+    # 6. 多測站 × 多作物 光環境適性 (批次)
+    def batch_light_suitability(self, filenames, crops=None, transmittance_percent=100, ppfd_coef=PPFD_PER_MJ):
+        """
+        一次分類所有測站 × 作物 × 月 × 時 (各站 12×24 基礎矩陣已快取，只做陣列運算)
+        回傳 light_suitability() 的結果，另加 'stations' (檔名) 與 'crops' (作物名稱)；
+        缺日射資料的測站略過，全部缺資料時回傳 None
+        """
+        if crops is None: crops = self.get_crop_light_requirements()
+        stations, mats = [], []
+        for f in filenames:
+            base = self.get_light_matrix(f)
+            if base is None: continue
+            stations.append(f); mats.append(base)
+        if not mats or not crops: return None
+
+        names, comp, sat, target_dli = crop_arrays(crops)
+        ppfd = np.stack(mats) * (transmittance_percent / 100.0) * ppfd_coef
+        result = light_suitability(ppfd, comp, sat, target_dli)
+        result.update(stations=stations, crops=names)
+        return result
+
+    @staticmethod
+    def rank_sites(result, crop):
+        """
+        某作物的測站排名：全年「適當範圍」時數多者優先，同分時 DLI 全年不足量少者優先
+        DLI_Deficit 單位為 mol/m²/年 (每月不足量 × 當月天數)
+        """
+        c = result['crops'].index(crop)
+        annual = result['annual_hours'][:, c]
+        deficit = result['dli_deficit'][:, c]
+        df = pd.DataFrame({
+            'Station': [f.split('.')[0] for f in result['stations']],
+            'InRange_Hours': annual[:, 1], 'Below_Hours': annual[:, 0], 'Above_Hours': annual[:, 2],
+            'DLI_Deficit': (deficit * DAYS_IN_MONTH).sum(axis=-1),
+            'Deficit_Months': (deficit > 0).sum(axis=-1),
+        })
+        return df.sort_values(['InRange_Hours', 'DLI_Deficit'], ascending=[False, True]).reset_index(drop=True)
+
+    # 6b. 多測站 極端高溫事件 (批次)
+    def get_heat_events(self, filenames=None, thresholds=HEAT_THRESHOLDS):
+        """
+        所有測站的連續高溫事件、熱浪天數、月×時超標機率 (heat_event_stats 一次向量化計算)
+        filenames 省略時使用全部可用測站；結果依各檔指紋快取，任一檔變動才重算
+        回傳 heat_event_stats() 的結果，另加 'stations' (檔名)；無資料時回傳 None
+        """
+        if filenames is None: filenames = sorted(self.station_files().values())
+        paths = [(f, self._find_weather_file(f)) for f in filenames]
+        paths = [(f, p) for f, p in paths if p is not None]
+        signature = tuple((f, self.cache.fingerprint(p)) for f, p in paths)
+        key = tuple(float(t) for t in thresholds)
+        hit = self._heat.get(key)
+        if hit and hit[0] == signature: return hit[1]
+
+        stations, times, temps = [], [], []
+        for f, p in paths:
+            ds = self.get_dataset(p)
+            if ds is None or not ds.has('Temp'): continue
+            stations.append(f); times.append(ds.columns['Time']); temps.append(ds.columns['Temp'])
+        if not stations: return None
+        try:
+            result = heat_event_stats(times, temps, thresholds)
+        except Exception as e:
+            print(f"⚠️ 高溫事件分析失敗: {e}")
+            return None
+        result['stations'] = stations
+        self._heat[key] = (signature, result)
+        return result
+
+    @staticmethod
+    def heat_event_table(result):
+        """高溫事件統計 → 各測站一列的比較表 (次數與時數換算為每年平均)"""
+        years = np.maximum(result['years'], 1e-9)
+        df = pd.DataFrame({'Station': [f.split('.')[0] for f in result['stations']], 'Years': result['years']})
+        for j, thr in enumerate(result['thresholds']):
+            tag = f"{thr:g}"
+            df[f'Hours_{tag}'] = result['hours'][:, j] / years
+            df[f'Events_{tag}'] = result['events'][:, j] / years
+            df[f'MaxRun_{tag}'] = result['max_run'][:, j]
+            df[f'MeanRun_{tag}'] = result['mean_run'][:, j]
+        df['HotDays'] = result['hot_days'] / years
+        df['HeatwaveDays'] = result['heatwave_days'] / years
+        df['LongestHeatwave'] = result['longest_wave']
+        return df
+
+    # 6c. 設計氣象條件 (0.4% / 1% / 2% 超越機率)
+    def get_design_conditions(self, filenames=None):
+        """
+        各測站設計條件 {檔名: {'levels','DB','Solar','MCRH','MCSolar','MCWind','Hours'}}
+        (各值為 (L,) 陣列，L = DESIGN_LEVELS；Hours 為純量)
+        每站結果存於記憶體與磁碟快取 ('design')；尚未計算的測站整批一次向量化算完
+        """
+        if filenames is None: filenames = sorted(self.station_files().values())
+        result, missing = {}, []
+        for f in filenames:
+            path = self._find_weather_file(f)
+            if path is None: continue
+            key = os.path.abspath(path)
+            fingerprint = self.cache.fingerprint(path)
+            hit = self._design.get(key)
+            if hit and hit[0] == fingerprint:
+                result[f] = hit[1]; continue
+            cached = self.cache.load(path, 'design')
+            if cached is not None and np.array_equal(cached['levels'], DESIGN_LEVELS):
+                cached['Hours'] = int(cached['Hours'])
+                self._design[key] = (fingerprint, cached)
+                result[f] = cached; continue
+            missing.append((f, path, fingerprint))
+
+        datasets = [(f, p, fp, self.get_dataset(p)) for f, p, fp in missing]
+        datasets = [d for d in datasets if d[3] is not None and d[3].has('Temp')]
+        if datasets:
+            col = lambda ds, v: ds.columns[v] if ds.has(v) else None
+            try:
+                dc = design_conditions([ds.columns['Temp'] for *_, ds in datasets],
+                                       [col(ds, 'Solar') for *_, ds in datasets],
+                                       [col(ds, 'RH') for *_, ds in datasets],
+                                       [col(ds, 'Wind') for *_, ds in datasets])
+            except Exception as e:
+                print(f"⚠️ 設計條件計算失敗: {e}")
+                dc = None
+            for i, (f, path, fingerprint, _) in enumerate(datasets if dc else []):
+                entry = {k: (v[i] if k != 'levels' else v) for k, v in dc.items()}
+                self.cache.save(path, entry, 'design')
+                entry['Hours'] = int(entry['Hours'])
+                self._design[os.path.abspath(path)] = (fingerprint, entry)
+                result[f] = entry
+        return result
+
+    @staticmethod
+    def design_condition_table(conditions):
+        """設計條件 → 各測站一列 (欄位如 DB_0.4%、MCRH_1%...)"""
+        rows = []
+        for f, dc in conditions.items():
+            row = {'Station': f.split('.')[0]}
+            for i, lv in enumerate(dc['levels']):
+                for k in ('DB', 'MCRH', 'Solar', 'MCSolar', 'MCWind'):
+                    row[f"{k}_{lv:g}%"] = float(dc[k][i])
+            rows.append(row)
+        return pd.DataFrame(rows)
+
+    def attach_design_conditions(self, weather_db):
+        """把設計條件寫入 WEATHER_DB 各站的 'design' (與月摘要放在一起)"""
+        files = {v['filename']: k for k, v in weather_db.items() if v.get('filename') and v['filename'] not in self.load_errors}
+        for f, dc in self.get_design_conditions(list(files)).items():
+            weather_db[files[f]]['design'] = dc
+        return weather_db
+
+    # 6d. 陣風極值 (颱風) 與回歸期
+    def get_extreme_wind(self, filenames=None):
+        """
+        所有測站的最大瞬間風速極值分析 (gust_extremes 一次向量化：月/年最大值 + Gumbel/GEV 配適)
+        filenames 省略時使用全部可用測站；結果依各檔指紋快取
+        回傳 gust_extremes() 的結果，另加 'stations' (檔名)；沒有陣風欄位時回傳 None
+        """
+        if filenames is None: filenames = sorted(self.station_files().values())
+        paths = [(f, self._find_weather_file(f)) for f in filenames]
+        paths = [(f, p) for f, p in paths if p is not None]
+        signature = tuple((f, self.cache.fingerprint(p)) for f, p in paths)
+        if self._gust and self._gust[0] == signature: return self._gust[1]
+
+        stations, times, gusts, dirs = [], [], [], []
+        for f, p in paths:
+            ds = self.get_dataset(p)
+            if ds is None or not ds.has('Gust'): continue
+            stations.append(f); times.append(ds.columns['Time']); gusts.append(ds.columns['Gust'])
+            dirs.append(ds.columns['GustDir'] if ds.has('GustDir') else np.full(len(ds), np.nan))
+        if not stations: return None
+        try:
+            result = gust_extremes(times, gusts, dirs)
+        except Exception as e:
+            print(f"⚠️ 陣風極值分析失敗: {e}")
+            return None
+        result['stations'] = stations
+        self._gust = (signature, result)
+        return result
+
+    @staticmethod
+    def extreme_wind_table(result, model='gumbel'):
+        """陣風極值 → 各測站一列 (紀錄最大值與各回歸期設計陣風 m/s)"""
+        levels = result[f'{model}_levels']
+        df = pd.DataFrame({
+            'Station': [f.split('.')[0] for f in result['stations']],
+            'MaxGust': result['max_gust'], 'MaxGustDir': result['max_gust_dir'],
+            'Basis': result['basis'], 'Months': result['n_months'],
+        })
+        for j, T in enumerate(result['return_periods']): df[f'{T:g}yr'] = levels[:, j]
+        return df
+
+    def design_gust(self, filename, return_period=50, model='gumbel'):
+        """
+        單一測站某回歸期的設計陣風 (m/s)，回歸期不在表上時以對數內插；無資料回傳 None
+        預設用 Gumbel：資料年數短時 GEV 的形狀參數不穩定，長回歸期容易外插過頭
+        短紀錄的配適可能低於實際觀測過的陣風，設計值不低於紀錄最大陣風
+        """
+        result = self.get_extreme_wind()
+        if result is None or filename not in result['stations']: return None
+        i = result['stations'].index(filename)
+        levels = result[f'{model}_levels'][i]
+        if np.isnan(levels).all(): return None
+        level = float(np.interp(np.log(return_period), np.log(result['return_periods']), levels))
+        return float(np.fmax(level, result['max_gust'][i]))
+
+    # 6e. 實測日變化曲線 (取代 ±5°C 正弦)
+    def get_diurnal_profiles(self, filenames=None):
+        """
+        各測站 × 12 月 × 24 時 × 變數 (PROFILE_VARIABLES) 的平均日變化，float32 四維陣列
+        回傳 {'stations': 檔名, 'variables': 變數名, 'profiles': (測站, 12, 24, 變數)}；無資料時回傳 None
+        每站結果存於記憶體與磁碟快取 ('profile')；尚未計算的測站整批一次 bincount 分組算完
+        """
+        if filenames is None: filenames = sorted(self.station_files().values())
+        found, missing = {}, []
+        for f in filenames:
+            path = self._find_weather_file(f)
+            if path is None: continue
+            key = os.path.abspath(path)
+            fingerprint = self.cache.fingerprint(path)
+            hit = self._profiles.get(key)
+            if hit and hit[0] == fingerprint:
+                found[f] = hit[1]; continue
+            cached = self.cache.load(path, 'profile')
+            if cached is not None and [str(v) for v in cached['variables']] == PROFILE_VARIABLES:
+                self._profiles[key] = (fingerprint, cached['profile'])
+                found[f] = cached['profile']; continue
+            missing.append((f, path, fingerprint))
+
+        datasets = [(f, p, fp, self.get_dataset(p)) for f, p, fp in missing]
+        datasets = [d for d in datasets if d[3] is not None]
+        if datasets:
+            try:
+                built = diurnal_profiles([ds.columns['Time'] for *_, ds in datasets],
+                                         [ds.columns for *_, ds in datasets])
+            except Exception as e:
+                print(f"⚠️ 日變化曲線計算失敗: {e}")
+                built = []
+            for (f, path, fingerprint, _), profile in zip(datasets, built):
+                self.cache.save(path, {'profile': profile, 'variables': np.array(PROFILE_VARIABLES)}, 'profile')
+                self._profiles[os.path.abspath(path)] = (fingerprint, profile)
+                found[f] = profile
+
+        stations = [f for f in filenames if f in found]
+        if not stations: return None
+        return {'stations': stations, 'variables': list(PROFILE_VARIABLES),
+                'profiles': np.stack([found[f] for f in stations])}
+
+    def temp_profile(self, filename):
+        """單一測站氣溫日變化 (相對日平均的偏差，12×24 list)，供氣候摘要的 'tempProfile' 使用；無資料回傳 None"""
+        result = self.get_diurnal_profiles([filename])
+        if result is None: return None
+        return temperature_offsets(result['profiles'][0, :, :, PROFILE_VARIABLES.index('Temp')]).tolist()
+
+    def attach_diurnal_profiles(self, weather_db):
+        """把各站氣溫日變化寫入 WEATHER_DB 月摘要的 'tempProfile' (run_simulation 的日變化來源)"""
+        files = {v['filename']: k for k, v in weather_db.items() if v.get('filename') and v['filename'] not in self.load_errors}
+        result = self.get_diurnal_profiles(list(files))
+        if result is None: return weather_db
+        offsets = temperature_offsets(result['profiles'][..., PROFILE_VARIABLES.index('Temp')])
+        for f, off in zip(result['stations'], offsets):
+            weather_db[files[f]]['data']['tempProfile'] = off.tolist()
+        return weather_db
+
+    # 6f. 屋頂幾何透光修正 (太陽位置 × 屋頂斜面入射角)
+    def station_latitude(self, filename):
+        """測站緯度 (WEATHER_DB 已附座標時)；找不到時用 DEFAULT_LATITUDE"""
+        for v in (self.weather_db or {}).values():
+            if v.get('filename') == filename and v.get('lat') is not None: return float(v['lat'])
+        return DEFAULT_LATITUDE
+
+    def roof_transmittance(self, filename, configs, lat=None):
+        """
+        多組屋頂設定 [(屋頂形式, 角度)...] 的透光修正係數 (乘在材料垂直入射透光率上，0~1)
+        回傳 {'configs', 'hourly': (設定, 12, 24), 'monthly': (設定, 12)}；無日射資料回傳 None
+        太陽幾何依緯度帶快取，這裡只用測站的 12×24 日射矩陣做直散分離與加權
+        """
+        base = self.get_light_matrix(filename)
+        if base is None: return None
+        if lat is None: lat = self.station_latitude(filename)
+        configs = [(str(t), float(a)) for t, a in configs]
+        try:
+            hourly, monthly = roof_transmittance(lat, configs, base)
+        except Exception as e:
+            print(f"⚠️ 屋頂透光修正計算失敗: {e}")
+            return None
+        return {'configs': configs, 'hourly': hourly, 'monthly': monthly}
+
+    # 7. 空間索引與虛擬測站
+    def station_files(self):
+        """可用測站 {測站代碼: 檔名} (讀取失敗、只有預設氣候的測站不列入)"""
+        if self.weather_db:
+            return {k: v['filename'] for k, v in self.weather_db.items()
+                    if v.get('filename') and v['filename'] not in self.load_errors}
+        if not os.path.isdir(self.base_folder): return {}
+        return {f.split('.')[0]: f for f in os.listdir(self.base_folder) if f.endswith('.csv')}
+
+    def get_station_index(self):
+        """有原始檔的測站座標索引；座標檔或測站清單變動時重建"""
+        files = self.station_files()
+        try: coords_mtime = os.stat(self.coords_path).st_mtime_ns
+        except OSError: coords_mtime = None
+        signature = (coords_mtime, tuple(sorted(files)))
+        if self._station_index is None or self._station_index[0] != signature:
+            matched = StationIndex.from_csv(self.coords_path).match(files.keys())
+            names = list(matched)
+            index = StationIndex(names, [matched[n][0] for n in names], [matched[n][1] for n in names])
+            self._station_index = (signature, index)
+        return self._station_index[1]
+
+    def attach_station_coords(self, weather_db):
+        """把 station_coords.csv 的座標寫入 WEATHER_DB 各站的 lat / lon"""
+        matched = StationIndex.from_csv(self.coords_path).match(weather_db.keys())
+        for key, (lat, lon) in matched.items():
+            weather_db[key]['lat'] = lat
+            weather_db[key]['lon'] = lon
+        return weather_db
+
+    def station_summary(self, loc_id, filename):
+        """單一測站月摘要：已載入 WEATHER_DB 時直接取用，否則讀檔 (失敗時為預設氣候)"""
+        if self.weather_db and loc_id in self.weather_db: return self.weather_db[loc_id]['data']
+        return self._read_summary(os.path.join(self.base_folder, filename))
+
+    def virtual_station(self, lat, lon, k=4, power=2.0, snap_km=0.1):
+        """
+        任意座標的虛擬測站：取最近 k 站，以反距離權重 (IDW) 內插月摘要 (k=1 即最近站)
+        距離某站 snap_km 以內時直接使用該站
+        回傳 {'lat', 'lon', 'neighbors': [{'id','filename','distance_km','weight'}...], 'data': 月摘要}
+        結果依 (座標取到小數 4 位, k, power, snap_km) 快取
+        """
+        key = (round(float(lat), 4), round(float(lon), 4), int(k), float(power), float(snap_km))
+        hit = self._virtual.get(key)
+        if hit is not None: return hit
+
+        index = self.get_station_index()
+        if len(index) == 0: return None
+        files = self.station_files()
+        dist, idx = index.query(key[0], key[1], k)
+        weights = idw_weights(dist, power, snap_km)
+        names = [index.names[i] for i in idx]
+
+        summaries = [self.station_summary(n, files[n]) for n in names]
+        data = self._default_summary()
+        for field in SUMMARY_FIELDS:
+            stack = np.array([s[field] for s in summaries], dtype='float64')  # (k, 12)
+            data[field] = (weights[:, np.newaxis] * stack).sum(axis=0).tolist()
+        profiles = [self.temp_profile(files[n]) for n in names]
+        if all(p is not None for p in profiles):
+            data['tempProfile'] = (weights[:, np.newaxis, np.newaxis] * np.array(profiles)).sum(axis=0).tolist()
+
+        result = {
+            'lat': key[0], 'lon': key[1],
+            'neighbors': [{'id': n, 'filename': files[n], 'distance_km': float(d), 'weight': float(w)}
+                          for n, d, w in zip(names, dist, weights)],
+            'data': data,
+        }
+        self._virtual[key] = result
+        return result
+
+    def virtual_hourly(self, lat, lon, k=4, power=2.0, snap_km=0.1):
+        """
+        虛擬測站逐時資料 (Time + Temp/Solar/Wind/RH，缺值保留 NaN)
+        各鄰近測站依整點對齊後做加權平均；某站某時缺值時，其餘測站的權重重新正規化
+        """
+        vs = self.virtual_station(lat, lon, k, power, snap_km)
+        if vs is None: return None
+        if 'hourly' not in vs:
+            hour_ns = 3600 * 1_000_000_000
+            parts = []
+            for nb in vs['neighbors']:
+                store = self.get_hourly_store(nb['filename'])
+                if store is not None and len(store): parts.append((store, np.asarray(store.time) // hour_ns, nb['weight']))
+            if not parts: return None
+
+            t0 = min(int(t.min()) for _, t, _ in parts)
+            n = max(int(t.max()) for _, t, _ in parts) - t0 + 1
+            columns, any_data = {}, np.zeros(n, dtype=bool)
+            for v in CORE_COLUMNS:
+                num, den = np.zeros(n), np.zeros(n)
+                for store, ticks, w in parts:
+                    if v not in store.arrays: continue
+                    x = np.asarray(store.arrays[v], dtype='float64')
+                    ok = ~np.isnan(x)
+                    num += np.bincount(ticks[ok] - t0, weights=x[ok] * w, minlength=n)
+                    den += np.bincount(ticks[ok] - t0, minlength=n) * w
+                if not den.any(): continue
+                columns[v] = np.divide(num, den, out=np.full(n, np.nan), where=den > 0)
+                any_data |= den > 0
+
+            df = pd.DataFrame({v: a[any_data] for v, a in columns.items()})
+            df.insert(0, 'Time', pd.to_datetime((t0 + np.flatnonzero(any_data)) * hour_ns, unit='ns'))
+            vs['hourly'] = df
+        return vs['hourly'].copy()
+
+
+if __name__ == '__main__':
+    # 串流 / 完整解析一致性檢查：python -m backend.services.climate_service [檔名 ...]
+    import sys
+    svc = ClimateService()
+    names = sys.argv[1:] or ['E2P990_林試扇平站.csv']
+    worst = 0.0
+    for name in names:
+        for chunk in (svc.stream_chunksize, 997):
+            diff = svc.compare_stream(name, chunk)
+            worst = max([worst] + list(diff.values()))
+            print(f"{name} (chunksize={chunk}): " + ", ".join(f"{k} {v:.2e}" for k, v in diff.items()))
+    assert worst < 1e-9, f"串流月統計與完整解析不一致 (最大差異 {worst})"
+    print("✅ 串流月統計與完整解析一致")
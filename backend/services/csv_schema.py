@@ -0,0 +1,242 @@
+import os
+import io
+import re
+import csv
+import json
+import time
+import warnings
+from contextlib import contextmanager
+import pandas as pd
+
+# 只讀取檔頭這麼多位元組來判斷編碼與表頭位置
+SNIFF_BYTES = 64 * 1024
+# 依序嘗試：UTF-8 (含 BOM) 解碼失敗率高、不易誤判，放前面；CWA 匯出檔則為 cp950
+CANDIDATE_ENCODINGS = ['utf-8-sig', 'cp950']
+
+_BAD_LINE_RE = re.compile(r"Skipping line (\d+): (.*)")
+
+# 格式快取索引的跨行程鎖：等待上限與「持有者已當掉」的判定時間 (秒)
+LOCK_TIMEOUT = 10.0
+LOCK_STALE = 30.0
+
+
+@contextmanager
+def _file_lock(path, timeout=LOCK_TIMEOUT):
+    """
+    跨行程的簡易檔案鎖 (以 O_EXCL 建立 <path>.lock)
+    鎖檔超過 LOCK_STALE 秒視為殘留並移除；等待逾時則不上鎖繼續 (只影響快取，不影響結果)
+    """
+    lock = f"{path}.lock"
+    deadline = time.monotonic() + timeout
+    owned = False
+    while True:
+        try:
+            os.close(os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            owned = True
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock) > LOCK_STALE:
+                    os.remove(lock)
+                    continue
+            except OSError:
+                continue
+            if time.monotonic() > deadline:
+                print(f"⚠️ 等待 {os.path.basename(lock)} 逾時，不上鎖繼續")
+                break
+            time.sleep(0.01)
+    try:
+        yield
+    finally:
+        if owned:
+            try: os.remove(lock)
+            except OSError: pass
+
+
+def sniff_schema(path, header_markers, max_records=30):
+    """
+    由檔頭推斷 CSV 格式
+    回傳 {'encoding', 'header' (表頭所在的第幾筆紀錄，對應 pd.read_csv 的 header=), 'columns'}
+    找不到含 header_markers 的表頭列時 header 為 None
+    """
+    with open(path, 'rb') as fh:
+        head = fh.read(SNIFF_BYTES)
+    # 截在最後一個換行，避免多位元組字元被切半
+    if len(head) == SNIFF_BYTES and b'\n' in head:
+        head = head[:head.rfind(b'\n') + 1]
+
+    encoding, text = None, None
+    for enc in CANDIDATE_ENCODINGS:
+        try:
+            text = head.decode(enc)
+            encoding = enc
+            break
+        except UnicodeDecodeError:
+            continue
+    if encoding is None:
+        encoding, text = 'utf-8', head.decode('utf-8', errors='replace')
+
+    # csv.reader 以「紀錄」計數 (引號內換行不算新列)，與 pandas 的 header= 一致
+    header, columns = None, []
+    for i, record in enumerate(csv.reader(io.StringIO(text))):
+        if i >= max_records: break
+        cells = [c.strip() for c in record]
+        if any(m in c for c in cells for m in header_markers):
+            header, columns = i, cells
+            break
+    return {'encoding': encoding, 'header': header, 'columns': columns}
+
+
+class SchemaRegistry:
+    """
+    各檔案的 CSV 格式快取 (以檔案指紋為鍵，存成 JSON)，以及壞行隔離報告
+    多個行程 (平行讀取) 可共用同一個索引：寫入時上鎖、重讀磁碟上的索引再併入自己的變更
+    """
+    def __init__(self, cache_folder):
+        self.cache_folder = cache_folder
+        self.index_path = os.path.join(cache_folder, 'schemas.json')
+        self.quarantine_folder = os.path.join(cache_folder, 'quarantine')
+        self.quarantine = {}    # {絕對路徑: [(行號, 原因, 原始內容), ...]}
+        self._schemas = None
+
+    @staticmethod
+    def fingerprint(path):
+        st = os.stat(path)
+        return f"{st.st_size}|{st.st_mtime_ns}"
+
+    def _read_index(self):
+        try:
+            with open(self.index_path, encoding='utf-8') as fh: return json.load(fh)
+        except Exception:
+            return {}
+
+    def _load_index(self):
+        if self._schemas is None: self._schemas = self._read_index()
+        return self._schemas
+
+    def reload(self):
+        """捨棄記憶體中的索引，下次存取時重讀磁碟 (其他行程寫入後使用)"""
+        self._schemas = None
+
+    def _save_index(self, key, entry=None):
+        """單一鍵的變更寫回索引 (entry=None 為刪除)：上鎖後以磁碟上最新的索引為底，避免蓋掉其他行程的紀錄"""
+        try:
+            os.makedirs(self.cache_folder, exist_ok=True)
+            with _file_lock(self.index_path):
+                schemas = self._read_index()
+                if entry is None: schemas.pop(key, None)
+                else: schemas[key] = entry
+                tmp = f"{self.index_path}.{os.getpid()}.tmp"
+                with open(tmp, 'w', encoding='utf-8') as fh: json.dump(schemas, fh, ensure_ascii=False)
+                os.replace(tmp, self.index_path)
+            self._schemas = schemas
+        except Exception as e:
+            print(f"⚠️ 格式快取寫入失敗: {e}")
+
+    def get(self, path, header_markers):
+        """取得 (必要時推斷並快取) 檔案格式"""
+        schemas = self._load_index()
+        key = os.path.abspath(path)
+        fp = self.fingerprint(path)
+        hit = schemas.get(key)
+        if hit and hit.get('fingerprint') == fp: return hit['schema']
+        schema = sniff_schema(path, header_markers)
+        schemas[key] = {'fingerprint': fp, 'schema': schema}
+        self._save_index(key, schemas[key])
+        return schema
+
+    def discard(self, path):
+        """移除某檔案的格式快取與隔離報告 (原始檔被刪除時使用)"""
+        schemas = self._load_index()
+        key = os.path.abspath(path)
+        if schemas.pop(key, None) is not None: self._save_index(key)
+        self._record_bad_lines(path, None, [])
+
+    def merge_quarantine(self, path, rows):
+        """併入子行程回傳的隔離結果 (報告檔已由子行程寫好)；rows 為空表示該檔沒有壞行"""
+        key = os.path.abspath(path)
+        if rows: self.quarantine[key] = rows
+        else: self.quarantine.pop(key, None)
+
+    def read_csv(self, path, schema, **kwargs):
+        """
+        依格式一次讀完 CSV；欄位數不符的列不再默默丟棄，而是記錄到隔離報告
+        (data/cache/.../quarantine/<檔名>.bad_lines.csv)
+        編碼只由檔頭推斷：檔頭之後才出現無法解碼的位元組時，改用另一個候選編碼重讀一次，
+        成功就更新格式快取 (schema 會被就地修改)
+        """
+        return self._read_checked(path, schema, lambda s: self._read_with_warnings(path, s, **kwargs))
+
+    def stream_csv(self, path, schema, reduce, chunksize, **kwargs):
+        """
+        分批讀取版的 read_csv：reduce(chunks) 走完整個 DataFrame 迭代器並回傳結果
+        壞行隔離與編碼重試同 read_csv；換編碼重讀時 reduce 會從頭再被呼叫一次 (不可沿用前一次的累加狀態)
+        """
+        return self._read_checked(path, schema, lambda s: self._reduce_with_warnings(path, s, reduce, chunksize, **kwargs))
+
+    def _read_checked(self, path, schema, read):
+        """read(schema) → (結果, 攔到的警告)；處理編碼重試並記錄壞行"""
+        try:
+            result, caught = read(schema)
+        except UnicodeDecodeError as first_error:
+            result = None
+            for enc in [e for e in CANDIDATE_ENCODINGS if e != schema['encoding']]:
+                try:
+                    result, caught = read(dict(schema, encoding=enc))
+                except UnicodeDecodeError:
+                    continue
+                print(f"⚠️ {os.path.basename(path)} 以 {schema['encoding']} 解碼失敗，改用 {enc}")
+                schema['encoding'] = enc
+                key = os.path.abspath(path)
+                self._save_index(key, {'fingerprint': self.fingerprint(path), 'schema': schema})
+                break
+            if result is None: raise first_error
+        bad = []
+        for w in caught:
+            if not issubclass(w.category, pd.errors.ParserWarning):
+                warnings.warn_explicit(w.message, w.category, w.filename, w.lineno)
+                continue
+            bad += [(int(m.group(1)), m.group(2)) for m in _BAD_LINE_RE.finditer(str(w.message))]
+        self._record_bad_lines(path, schema['encoding'], bad)
+        return result
+
+    @staticmethod
+    def _read_with_warnings(path, schema, **kwargs):
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always', pd.errors.ParserWarning)
+            df = pd.read_csv(path, header=schema['header'], encoding=schema['encoding'],
+                             on_bad_lines='warn', **kwargs)
+        return df, caught
+
+    @staticmethod
+    def _reduce_with_warnings(path, schema, reduce, chunksize, **kwargs):
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always', pd.errors.ParserWarning)
+            with pd.read_csv(path, header=schema['header'], encoding=schema['encoding'],
+                             on_bad_lines='warn', chunksize=chunksize, **kwargs) as reader:
+                result = reduce(reader)
+        return result, caught
+
+    def _record_bad_lines(self, path, encoding, bad):
+        key = os.path.abspath(path)
+        report_path = os.path.join(self.quarantine_folder, f"{os.path.basename(path)}.bad_lines.csv")
+        if not bad:
+            self.quarantine.pop(key, None)
+            if os.path.exists(report_path):
+                try: os.remove(report_path)
+                except OSError: pass
+            return
+
+        # 取回被跳過那幾行的原始內容 (行號為 1 起算的實體行)
+        wanted = {n: reason for n, reason in bad}
+        rows = []
+        with open(path, encoding=encoding, errors='replace', newline='') as fh:
+            for n, line in enumerate(fh, start=1):
+                if n in wanted: rows.append((n, wanted[n], line.rstrip('\r\n')))
+        self.quarantine[key] = rows
+        try:
+            os.makedirs(self.quarantine_folder, exist_ok=True)
+            pd.DataFrame(rows, columns=['line', 'reason', 'raw']).to_csv(report_path, index=False, encoding='utf-8-sig')
+        except Exception as e:
+            print(f"⚠️ 隔離報告寫入失敗: {e}")
+        print(f"⚠️ {os.path.basename(path)} 有 {len(rows)} 行格式錯誤，已隔離至 {report_path}")
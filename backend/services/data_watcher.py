@@ -0,0 +1,66 @@
+import os
+import hashlib
+
+
+def file_digest(path, block_size=1 << 20):
+    """檔案內容 SHA-1 (分塊讀取)"""
+    h = hashlib.sha1()
+    with open(path, 'rb') as fh:
+        for block in iter(lambda: fh.read(block_size), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+class FolderWatcher:
+    """
+    資料夾變動偵測 (輪詢式)
+    每次 poll() 只對每個檔案做一次 os.stat；大小/mtime 有變才計算內容雜湊，
+    因此只是被 touch 或重新複製但內容相同的檔案不會觸發重新讀取。
+    """
+    def __init__(self, folder, suffix='.csv'):
+        self.folder = folder
+        self.suffix = suffix
+        self.snapshot = {}  # {檔名: (大小, mtime_ns, sha1)}
+
+    def _stat_all(self):
+        stats = {}
+        if not os.path.isdir(self.folder): return stats
+        with os.scandir(self.folder) as it:
+            for entry in it:
+                if not entry.name.endswith(self.suffix) or not entry.is_file(): continue
+                st = entry.stat()
+                stats[entry.name] = (st.st_size, st.st_mtime_ns)
+        return stats
+
+    def prime(self, files=None):
+        """以目前狀態當作基準 (不回報變動)；files 可限定只記錄部分檔案"""
+        self.snapshot = {}
+        for name, (size, mtime) in self._stat_all().items():
+            if files is not None and name not in files: continue
+            try: self.snapshot[name] = (size, mtime, file_digest(os.path.join(self.folder, name)))
+            except OSError: continue
+
+    def poll(self):
+        """
+        與上次狀態比較，回傳 {'added': [...], 'changed': [...], 'removed': [...]} (檔名)
+        並更新基準
+        """
+        changes = {'added': [], 'changed': [], 'removed': []}
+        current = self._stat_all()
+        for name in [n for n in self.snapshot if n not in current]:
+            del self.snapshot[name]
+            changes['removed'].append(name)
+
+        for name, (size, mtime) in current.items():
+            old = self.snapshot.get(name)
+            if old and old[:2] == (size, mtime): continue
+            try: digest = file_digest(os.path.join(self.folder, name))
+            except OSError: continue  # 複製中 / 已被刪除，下次再看
+            self.snapshot[name] = (size, mtime, digest)
+            if old is None: changes['added'].append(name)
+            elif old[2] != digest: changes['changed'].append(name)
+        return changes
+
+    @staticmethod
+    def has_changes(changes):
+        return any(changes.values())
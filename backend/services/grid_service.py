@@ -0,0 +1,201 @@
+import os
+import json
+import time
+import hashlib
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+from backend.models.greenhouse_physics import simulate_monthly
+from backend.models.spatial_index import idw_weights
+
+# 臺灣本島範圍 (lat_min, lat_max, lon_min, lon_max)
+TAIWAN_BOUNDS = (21.85, 25.35, 119.95, 122.05)
+KM_PER_DEG_LAT = 111.32
+
+# 可輸出的網格指標 → 說明
+GRID_METRICS = {
+    'netRevenue': '年淨收益 (元)',
+    'totalYield': '年產量 (kg)',
+    'heat30_In': '室內 ≥30°C 時數 (時/年)',
+    'heat35_In': '室內 ≥35°C 時數 (時/年)',
+    'maxSummerTemp': '7 月室內均溫 (°C)',
+}
+CLIMATE_FIELDS = ['temps', 'solar', 'wind', 'humidities']
+# 網格快取最多保留幾張 (超過時刪除最久沒用到的)
+GRID_CACHE_MAX = 24
+
+
+def make_grid(bounds=TAIWAN_BOUNDS, cell_km=1.0):
+    """
+    規則經緯度網格的格心座標
+    回傳 (lats, lons)：lats 由北到南 (影像第 0 列在最上方)，lons 由西到東
+    """
+    lat_min, lat_max, lon_min, lon_max = bounds
+    d_lat = cell_km / KM_PER_DEG_LAT
+    d_lon = cell_km / (KM_PER_DEG_LAT * np.cos(np.radians((lat_min + lat_max) / 2)))
+    lats = np.arange(lat_max - d_lat / 2, lat_min, -d_lat)
+    lons = np.arange(lon_min + d_lon / 2, lon_max, d_lon)
+    return lats, lons
+
+
+def _metric_values(result, metric):
+    if metric in ('heat30_In', 'heat35_In', 'heat30_Base', 'heat35_Base'):
+        return result[metric].sum(axis=-1)  # 逐月 (時/月) → 全年
+    return result[metric]
+
+
+def _evaluate_chunk(job):
+    """
+    (子行程用) 一塊格點：IDW 內插氣候 → 向量化月模擬 → 指標值 (float32，超出範圍為 NaN)
+    """
+    lats, lons, index, stacks, design, metric, k, power, max_distance_km = job
+    dist, idx = index.query(lats, lons, k)
+    out = np.full(len(lats), np.nan, dtype='float32')
+    inside = dist[:, 0] <= max_distance_km
+    if not inside.any(): return out
+
+    w = idw_weights(dist[inside], power)[..., np.newaxis]            # (n, k, 1)
+    climate = {f: (w * stacks[f][idx[inside]]).sum(axis=1) for f in CLIMATE_FIELDS}  # (n, 12)
+    if 'tempProfile' in stacks:                                      # (n, 12, 24)
+        climate['tempProfile'] = (w[..., np.newaxis] * stacks['tempProfile'][idx[inside]]).sum(axis=1)
+    result = simulate_monthly(design['gh_specs'], design['fan_specs'], climate, design['crops'],
+                              design['density'], design['cycles'], design['prices'],
+                              design['crop_db'], design['mat_db'], design.get('seedling_unit_cost'))
+    out[inside] = _metric_values(result, metric)
+    return out
+
+
+class GridService:
+    """
+    全臺網格適性圖：測站月氣候 → 各格 IDW 內插 → 向量化溫室模擬 → 指標網格
+    - 分塊計算 (chunk_cells)，記憶體用量與網格大小無關；可用行程池平行
+    - 結果存成 float32 .npy + .json (範圍/解析度/指標)，依設計、測站座標與氣候內容雜湊快取；
+      最多保留 GRID_CACHE_MAX 張，超過時刪除最久沒用到的
+    """
+    def __init__(self, climate_svc, cache_folder=None):
+        self.climate_svc = climate_svc
+        if cache_folder is None:
+            cache_folder = os.path.join(os.path.dirname(os.path.normpath(climate_svc.base_folder)), 'cache', 'grid')
+        self.cache_folder = cache_folder
+
+    def _station_stacks(self, index):
+        files = self.climate_svc.station_files()
+        summaries = [self.climate_svc.station_summary(n, files[n]) for n in index.names]
+        stacks = {f: np.array([s[f] for s in summaries], dtype='float64') for f in CLIMATE_FIELDS}
+        profiles = [self.climate_svc.temp_profile(files[n]) for n in index.names]
+        if profiles and all(p is not None for p in profiles):
+            stacks['tempProfile'] = np.array(profiles, dtype='float64')        # (測站, 12, 24)
+        return stacks
+
+    def _raster_key(self, index, stacks, design, metric, bounds, cell_km, k, power, max_distance_km):
+        h = hashlib.sha1()
+        h.update(json.dumps({'design': design, 'metric': metric, 'bounds': list(bounds), 'cell_km': cell_km,
+                             'k': k, 'power': power, 'max_km': max_distance_km, 'stations': index.names},
+                            sort_keys=True, ensure_ascii=False, default=str).encode('utf-8'))
+        # 測站座標 (station_coords.csv 修改後 IDW 權重就不同)
+        h.update(np.ascontiguousarray(index.lats).tobytes())
+        h.update(np.ascontiguousarray(index.lons).tobytes())
+        for f in CLIMATE_FIELDS + ['tempProfile']:
+            if f in stacks: h.update(np.ascontiguousarray(stacks[f]).tobytes())
+        return h.hexdigest()[:16]
+
+    def evaluate(self, design, metric='netRevenue', cell_km=1.0, bounds=TAIWAN_BOUNDS, k=4, power=2.0,
+                 max_distance_km=30.0, chunk_cells=20000, workers=1):
+        """
+        design: {'gh_specs','fan_specs','crops','density','cycles','prices','crop_db','mat_db',
+                 'seedling_unit_cost' (選填)} ，同 run_simulation 的參數
+        離最近測站超過 max_distance_km 的格子 (多為海面或深山) 填 NaN
+        回傳 {'values': (列, 行) float32, 'bounds', 'cell_km', 'metric', 'path', 'elapsed'}
+        """
+        if metric not in GRID_METRICS: raise ValueError(f"未知的網格指標: {metric}")
+        index = self.climate_svc.get_station_index()
+        if len(index) == 0: return None
+        stacks = self._station_stacks(index)
+        key = self._raster_key(index, stacks, design, metric, bounds, cell_km, k, power, max_distance_km)
+        path = os.path.join(self.cache_folder, f"{metric}_{key}.npy")
+        cached = self.load(path)
+        if cached is not None:
+            try: os.utime(path)  # 更新使用時間 (淘汰順序依 mtime)
+            except OSError: pass
+            return cached
+
+        t0 = time.perf_counter()
+        lats, lons = make_grid(bounds, cell_km)
+        lat_grid, lon_grid = np.meshgrid(lats, lons, indexing='ij')
+        flat_lat, flat_lon = lat_grid.ravel(), lon_grid.ravel()
+        jobs = [(flat_lat[s:s + chunk_cells], flat_lon[s:s + chunk_cells], index, stacks, design,
+                 metric, k, power, max_distance_km) for s in range(0, len(flat_lat), chunk_cells)]
+
+        workers = workers if workers else (os.cpu_count() or 1)
+        parts = None
+        if workers > 1 and len(jobs) > 1:
+            try:
+                with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+                    parts = list(pool.map(_evaluate_chunk, jobs))
+            except Exception as e:
+                print(f"⚠️ 平行網格計算失敗，改用單執行緒: {e}")
+                parts = None
+        if parts is None: parts = [_evaluate_chunk(job) for job in jobs]
+
+        values = np.concatenate(parts).reshape(lat_grid.shape)
+        raster = {'values': values, 'bounds': list(bounds), 'cell_km': cell_km, 'metric': metric,
+                  'path': path, 'elapsed': time.perf_counter() - t0}
+        self.save(raster)
+        return raster
+
+    def save(self, raster):
+        try:
+            os.makedirs(self.cache_folder, exist_ok=True)
+            path = raster['path']
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, 'wb') as fh: np.save(fh, raster['values'].astype('float32'))
+            os.replace(tmp, path)
+            meta = {k: raster[k] for k in ('bounds', 'cell_km', 'metric')}
+            meta['shape'] = list(raster['values'].shape)
+            with open(os.path.splitext(path)[0] + '.json', 'w', encoding='utf-8') as fh: json.dump(meta, fh)
+        except Exception as e:
+            print(f"⚠️ 網格檔寫入失敗: {e}")
+        self._evict()
+
+    def _evict(self, keep=GRID_CACHE_MAX):
+        """網格快取超過 keep 張時，依 mtime 刪除最久沒用到的 .npy / .json"""
+        try:
+            rasters = [os.path.join(self.cache_folder, f) for f in os.listdir(self.cache_folder) if f.endswith('.npy')]
+        except OSError:
+            return
+        if len(rasters) <= keep: return
+        rasters.sort(key=lambda p: os.path.getmtime(p) if os.path.exists(p) else 0.0, reverse=True)
+        for path in rasters[keep:]:
+            for f in (path, os.path.splitext(path)[0] + '.json'):
+                try: os.remove(f)
+                except OSError: pass
+
+    @staticmethod
+    def load(path):
+        meta_path = os.path.splitext(path)[0] + '.json'
+        if not (os.path.exists(path) and os.path.exists(meta_path)): return None
+        try:
+            with open(meta_path, encoding='utf-8') as fh: meta = json.load(fh)
+            values = np.load(path)
+            return {'values': values, **meta, 'path': path, 'elapsed': 0.0}
+        except Exception:
+            return None
+
+    @staticmethod
+    def to_rgba(values, vmin=None, vmax=None, reverse=False):
+        """
+        網格 → RGBA 影像 (0~1 浮點，NaN 透明)，供 folium ImageOverlay 疊圖
+        色階：紅 (低) → 黃 → 綠 (高)；reverse=True 時顛倒 (例如高溫時數越多越差)
+        """
+        v = np.asarray(values, dtype='float64')
+        valid = ~np.isnan(v)
+        if not valid.any(): return np.zeros(v.shape + (4,))
+        lo = np.nanmin(v) if vmin is None else vmin
+        hi = np.nanmax(v) if vmax is None else vmax
+        x = np.clip((v - lo) / (hi - lo), 0, 1) if hi > lo else np.full(v.shape, 0.5)
+        if reverse: x = 1 - x
+        stops = np.array([[0.84, 0.10, 0.11], [1.00, 0.85, 0.25], [0.10, 0.60, 0.31]])  # 紅 / 黃 / 綠
+        pos = np.array([0.0, 0.5, 1.0])
+        rgb = np.stack([np.interp(np.nan_to_num(x), pos, stops[:, c]) for c in range(3)], axis=-1)
+        alpha = np.where(valid, 1.0, 0.0)[..., np.newaxis]
+        return np.concatenate([rgb, alpha], axis=-1)
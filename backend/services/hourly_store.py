@@ -0,0 +1,109 @@
+import os
+import json
+import shutil
+import hashlib
+import numpy as np
+import pandas as pd
+
+from backend.models.station_dataset import CORE_COLUMNS
+
+
+class HourlyStore:
+    """
+    單一測站的逐時資料 (磁碟 .npy + 記憶體映射)
+    - time.npy   : int64 ns，已依時間排序
+    - <變數>.npy : float32 (缺值為 NaN)
+    - days.npy / offsets.npy : 日期 (日序) → 列偏移，第 i 天為 offsets[i]:offsets[i+1]
+    列出日期、取出某一天都只是陣列切片，不必對整年的時間欄位做字串轉換。
+    """
+    def __init__(self, folder):
+        self.folder = folder
+        load = lambda name: np.load(os.path.join(folder, f"{name}.npy"), mmap_mode='r')
+        with open(os.path.join(folder, 'meta.json'), encoding='utf-8') as fh:
+            self.meta = json.load(fh)
+        self.time = load('time')
+        self.days = np.asarray(load('days'))
+        self.offsets = np.asarray(load('offsets'))
+        self.variables = self.meta['variables']
+        self.arrays = {v: load(v) for v in self.variables}
+        self._date_strings = None
+
+    # --- 建立 / 開啟 ---
+    @staticmethod
+    def _folder_for(root, fingerprint):
+        # 以指紋雜湊當子資料夾名稱：舊版本仍被 mmap 開著時也不會被覆寫
+        return os.path.join(root, hashlib.sha1(fingerprint.encode('utf-8')).hexdigest()[:16])
+
+    @classmethod
+    def open(cls, root, fingerprint):
+        folder = cls._folder_for(root, fingerprint)
+        if not os.path.exists(os.path.join(folder, 'meta.json')): return None
+        try:
+            store = cls(folder)
+            return store if store.meta.get('fingerprint') == fingerprint else None
+        except Exception:
+            return None
+
+    @classmethod
+    def build(cls, dataset, root, fingerprint):
+        """由 StationDataset 建立儲存檔並開啟；舊版本資料夾盡量清除"""
+        t = dataset.columns['Time']
+        order = np.argsort(t, kind='stable')
+        t = t[order]
+        day_of_row = t // 86_400_000_000_000  # ns → 日序
+        days, starts = np.unique(day_of_row, return_index=True)
+        offsets = np.append(starts, len(t)).astype('int64')
+        variables = [v for v in CORE_COLUMNS if dataset.has(v)]
+
+        folder = cls._folder_for(root, fingerprint)
+        tmp = f"{folder}.{os.getpid()}.tmp"
+        os.makedirs(tmp, exist_ok=True)
+        np.save(os.path.join(tmp, 'time.npy'), t)
+        np.save(os.path.join(tmp, 'days.npy'), days.astype('int64'))
+        np.save(os.path.join(tmp, 'offsets.npy'), offsets)
+        for v in variables:
+            np.save(os.path.join(tmp, f"{v}.npy"), dataset.columns[v][order].astype('float32'))
+        with open(os.path.join(tmp, 'meta.json'), 'w', encoding='utf-8') as fh:
+            json.dump({'fingerprint': fingerprint, 'variables': variables, 'rows': int(len(t))}, fh, ensure_ascii=False)
+
+        if os.path.exists(folder): shutil.rmtree(folder, ignore_errors=True)
+        os.replace(tmp, folder)
+        for old in os.listdir(root):
+            old_path = os.path.join(root, old)
+            if old_path != folder and not old.endswith('.tmp'):
+                shutil.rmtree(old_path, ignore_errors=True)  # Windows 上仍被開啟的會略過
+        return cls(folder)
+
+    # --- 查詢 ---
+    def __len__(self):
+        return len(self.time)
+
+    def available_dates(self, reverse=True):
+        """可選日期字串 'YYYY-MM-DD' (預設新→舊)"""
+        if self._date_strings is None:
+            self._date_strings = np.datetime_as_string(self.days.astype('datetime64[D]')).tolist()
+        return self._date_strings[::-1] if reverse else list(self._date_strings)
+
+    def day_slice(self, date):
+        """某一天的列範圍 (start, stop)；查無此日回傳 None"""
+        day = np.datetime64(date, 'D').astype('int64')
+        i = np.searchsorted(self.days, day)
+        if i >= len(self.days) or self.days[i] != day: return None
+        return int(self.offsets[i]), int(self.offsets[i + 1])
+
+    def day(self, date):
+        """某一天的陣列 (mmap 切片，不複製)：{'Time': int64 ns, 變數: float32}"""
+        rng = self.day_slice(date)
+        if rng is None: return None
+        s, e = rng
+        out = {'Time': self.time[s:e]}
+        for v in self.variables: out[v] = self.arrays[v][s:e]
+        return out
+
+    def day_frame(self, date):
+        """某一天的 DataFrame (Time + 變數，缺值保留 NaN)"""
+        arrays = self.day(date)
+        if arrays is None: return None
+        df = pd.DataFrame({v: np.asarray(arrays[v], dtype='float64') for v in self.variables})
+        df.insert(0, 'Time', pd.to_datetime(np.asarray(arrays['Time']), unit='ns'))
+        return df
@@ -1,9 +1,23 @@
 import os
-import pandas as pd
+import threading
+
+from backend.services.csv_schema import SchemaRegistry
+from backend.services.data_watcher import FolderWatcher
+
+# 用來辨認表頭列的關鍵字
+HEADER_MARKERS = ('交易日期',)
 
 class MarketService:
-    def __init__(self, base_folder='data/market_data'):
+    def __init__(self, base_folder='data/market_data', cache_folder=None):
         self.base_folder = base_folder
+        if cache_folder is None:
+            cache_folder = os.path.join(os.path.dirname(os.path.normpath(base_folder)), 'cache', 'market')
+        # 各檔編碼/表頭列推斷結果與壞行隔離報告
+        self.schemas = SchemaRegistry(cache_folder)
+        # 增量更新用
+        self.watcher = FolderWatcher(base_folder, '.csv')
+        self.price_db = None
+        self._refresh_lock = threading.Lock()
 
     def scan_and_load_market_prices(self):
         price_db = {}
@@ -11,14 +25,41 @@ class MarketService:
         
         for f in os.listdir(self.base_folder):
             if f.endswith('.csv'):
-                try:
-                    path = os.path.join(self.base_folder, f)
-                    try: df = pd.read_csv(path, header=2)
-                    except: df = pd.read_csv(path, header=0)
-                    
-                    if '交易日期' in df.columns and '平均價' in df.columns:
-                        df['M'] = df['交易日期'].astype(str).apply(lambda x: int(x.split('年')[1].replace('月','')) if '年' in x else None)
-                        avg = df.groupby('M')['平均價'].mean()
-                        price_db[os.path.splitext(f)[0]] = [round(avg.get(m, 30.0), 1) for m in range(1, 13)]
-                except: continue
-        return price_db
\ No newline at end of file
+                prices = self._load_price_file(f)
+                if prices is not None: price_db[os.path.splitext(f)[0]] = prices
+        return price_db
+
+    def refresh_market_prices(self):
+        """增量更新 MARKET_DB：只重新讀取新增/變更的檔案，移除已刪除的品項"""
+        with self._refresh_lock:
+            if self.price_db is None:
+                self.watcher.prime()
+                self.price_db = self.scan_and_load_market_prices()
+                return dict(self.price_db)
+
+            changes = self.watcher.poll()
+            for f in changes['removed']:
+                self.price_db.pop(os.path.splitext(f)[0], None)
+                self.schemas.discard(os.path.join(self.base_folder, f))
+            for f in changes['added'] + changes['changed']:
+                prices = self._load_price_file(f)
+                if prices is not None: self.price_db[os.path.splitext(f)[0]] = prices
+                else: self.price_db.pop(os.path.splitext(f)[0], None)
+            if FolderWatcher.has_changes(changes):
+                print(f"🔄 市場資料更新: 新增 {len(changes['added'])}、變更 {len(changes['changed'])}、移除 {len(changes['removed'])}")
+            return dict(self.price_db)
+
+    def _load_price_file(self, f):
+        """單一品項的 12 個月平均價；格式不符回傳 None"""
+        try:
+            path = os.path.join(self.base_folder, f)
+            schema = self.schemas.get(path, HEADER_MARKERS)
+            if schema['header'] is None: schema = {**schema, 'header': 0}
+            df = self.schemas.read_csv(path, schema)
+            
+            if '交易日期' in df.columns and '平均價' in df.columns:
+                df['M'] = df['交易日期'].astype(str).apply(lambda x: int(x.split('年')[1].replace('月','')) if '年' in x else None)
+                avg = df.groupby('M')['平均價'].mean()
+                return [round(avg.get(m, 30.0), 1) for m in range(1, 13)]
+        except: pass
+        return None
\ No newline at end of file
@@ -0,0 +1,139 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+from backend.services.sweep_service import SweepService
+
+# 最佳化目標 → (說明, 越大越好?, 排序欄位)
+# netRevenue 以「年淨收益 - 年化建置成本」排序，多花的建置成本要靠收益賺回來
+OPT_OBJECTIVES = {
+    'netRevenue': ('年淨收益 (扣建置折舊) 最大', True, 'netProfit'),
+    'maxSummerTemp': ('7 月室內均溫最低', False, 'maxSummerTemp'),
+}
+# 建置成本項目 → (COST_DB 折舊年限欄位, 預設年限)
+CAPEX_LIFE = {
+    'Structure': ('Structure_Life_Year', 20),
+    'Net': ('Net_Life_Year', 5),
+    'Fan': ('Fan_Life_Year', 10),
+}
+# 搜尋變數與預設範圍；整數變數 (台數) 取整
+OPT_VARIABLES = {
+    'exhaustCount': (0, 200),
+    'shadingScreen': (0, 90),
+    'roofVentArea': (0.0, 6000.0),
+    'sideVentArea': (0.0, 3000.0),
+}
+INTEGER_VARIABLES = ('exhaustCount', 'shadingScreen')
+
+
+def _capex_parts(designs, gh_specs, cost_db):
+    """
+    各設計的建置成本，依項目分開 {項目: 陣列 (元，COST_DB 單價)}
+    Structure：地板面積 × Greenhouse_Structure_Price + 天/側窗面積 × Vent_Structure_Price
+    Net：遮蔭網 (遮蔭率 > 0 時鋪滿地板面積) + 防蟲網 (天/側窗面積) × Net_Unit_Price
+    Fan：exhaustCount × Fan_Unit_Price
+    """
+    price = lambda k, d: float(cost_db.get(k, d))
+    col = lambda k: designs[k].to_numpy(dtype='float64') if k in designs else np.full(len(designs), float(gh_specs.get(k, 0)))
+    floor_area = gh_specs['width'] * gh_specs['length']
+    vent_area = col('roofVentArea') + col('sideVentArea')
+    fans = designs['exhaustCount'].to_numpy(dtype='float64') if 'exhaustCount' in designs else np.zeros(len(designs))
+    net_area = np.where(col('shadingScreen') > 0, floor_area, 0.0) + vent_area
+    return {
+        'Structure': floor_area * price('Greenhouse_Structure_Price', 2000) + vent_area * price('Vent_Structure_Price', 600),
+        'Net': net_area * price('Net_Unit_Price', 60),
+        'Fan': fans * price('Fan_Unit_Price', 16000),
+    }
+
+
+def design_capex(designs, gh_specs, cost_db):
+    """各設計的建置成本 (元)；項目見 _capex_parts"""
+    return sum(_capex_parts(designs, gh_specs, cost_db).values())
+
+
+def design_capex_annual(designs, gh_specs, cost_db):
+    """各設計的年化建置成本 (元/年)：各項目 ÷ COST_DB 的折舊年限 (直線折舊)"""
+    parts = _capex_parts(designs, gh_specs, cost_db)
+    return sum(v / max(float(cost_db.get(*CAPEX_LIFE[k])), 1.0) for k, v in parts.items())
+
+
+class OptimizerService:
+    """
+    設計最佳化：在使用者給的範圍與預算內，搜尋排風扇台數 / 遮蔭率 / 天窗 / 側窗面積
+    - 由粗到細的格點搜尋：每輪在目前範圍取 levels^維度 個格點批次評估 (SweepService)，
+      再以前 keep 名為中心把範圍縮小 shrink 倍，重複 rounds 輪
+    - 每輪的設計分塊送進同一個行程池；評估過的設計不重算
+    """
+    def __init__(self, sweep_svc=None):
+        self.sweep_svc = sweep_svc or SweepService()
+
+    @staticmethod
+    def _axis(lo, hi, levels, integer):
+        if hi <= lo: return np.array([lo], dtype='float64')
+        axis = np.linspace(lo, hi, levels)
+        return np.unique(np.round(axis)) if integer else axis
+
+    def optimize(self, gh_specs, fan_specs, climate, crops, density, cycles, prices, crop_db, mat_db, cost_db,
+                 bounds=None, objective='netRevenue', budget=None, levels=5, rounds=4, keep=3, shrink=0.35,
+                 top=5, workers=None, ventilation='wind', hourly=None):
+        """
+        bounds: {變數: (下限, 上限)}，沒給的變數用 OPT_VARIABLES 的範圍；要固定某變數就給 (值, 值)
+        budget: 建置成本上限 (元)；超過預算的設計不列入
+        ventilation: 自然通風模型 ('wind' / 'coupled')
+        hourly: 改用逐時紀錄評估 (格式同 SweepService.run；典型氣象年的 8760 小時最省時)
+        回傳 {'best': 前 top 名設計 (DataFrame，含 capex / capexAnnual / netProfit 與模擬指標), 'evaluations': 評估次數,
+              'elapsed': 秒數, 'rounds': 每輪最佳的排序欄位值, 'objective', 'feasible': 是否有設計在預算內}
+        """
+        if objective not in OPT_OBJECTIVES: raise ValueError(f"未知的最佳化目標: {objective}")
+        _, maximize, rank_col = OPT_OBJECTIVES[objective]
+        bounds = {k: tuple(map(float, (bounds or {}).get(k, v))) for k, v in OPT_VARIABLES.items()}
+        t0 = time.perf_counter()
+        workers = workers if workers else (os.cpu_count() or 1)
+
+        seen = pd.DataFrame()
+        history = []
+        pool = None
+        try:
+            if workers > 1:
+                try: pool = ProcessPoolExecutor(max_workers=workers)
+                except Exception as e: print(f"⚠️ 無法建立行程池，改用單執行緒: {e}")
+            box = dict(bounds)
+            for r in range(rounds):
+                axes = {k: self._axis(lo, hi, levels, k in INTEGER_VARIABLES) for k, (lo, hi) in box.items()}
+                grid = self.sweep_svc.grid(**axes).astype('float64')
+                if len(seen): grid = grid.merge(seen[list(OPT_VARIABLES)], how='left', indicator=True).query("_merge == 'left_only'").drop(columns='_merge')
+                if len(grid):
+                    chunk = max(1, -(-len(grid) // workers)) if pool is not None else len(grid)
+                    result = self.sweep_svc.run(grid, gh_specs, fan_specs, climate, crops, density, cycles, prices,
+                                                crop_db, mat_db, chunk_designs=chunk, pool=pool, ventilation=ventilation,
+                                                hourly=hourly)
+                    result['capex'] = design_capex(result, gh_specs, cost_db)
+                    result['capexAnnual'] = design_capex_annual(result, gh_specs, cost_db)
+                    result['netProfit'] = result['netRevenue'] - result['capexAnnual']
+                    seen = pd.concat([seen, result], ignore_index=True)
+
+                ranked = self._rank(seen, rank_col, maximize, budget)
+                if ranked.empty: break
+                history.append(float(ranked[rank_col].iloc[0]))
+                # 以前 keep 名的外框為中心縮小範圍 (不超出使用者範圍)
+                lead = ranked.head(keep)
+                for k, (lo, hi) in bounds.items():
+                    half = (box[k][1] - box[k][0]) * shrink / 2
+                    c_lo, c_hi = lead[k].min() - half, lead[k].max() + half
+                    box[k] = (max(lo, c_lo), min(hi, c_hi))
+        finally:
+            if pool is not None: pool.shutdown()
+
+        ranked = self._rank(seen, rank_col, maximize, budget)
+        return {'best': ranked.head(top).reset_index(drop=True), 'evaluations': len(seen),
+                'elapsed': time.perf_counter() - t0, 'rounds': history, 'objective': objective,
+                'feasible': not ranked.empty}
+
+    @staticmethod
+    def _rank(results, column, maximize, budget):
+        """預算內的設計 (硬限制) 依排序欄位排序；相同時建置成本低者優先"""
+        if results.empty: return results
+        ok = results if budget is None else results[results['capex'] <= budget]
+        return ok.sort_values([column, 'capex'], ascending=[not maximize, True], kind='mergesort')
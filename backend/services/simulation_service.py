@@ -17,6 +17,8 @@ if root_dir not in sys.path:
 # 一般 import (現在可以正常讀取 backend 了)
 # ==========================================
 import math
+import time
+import numpy as np
 import pandas as pd
 import streamlit as st
 
@@ -31,9 +33,13 @@ except ImportError:
     except:
         pass # 暫時忽略，等用到再報錯
 
+from backend.models.greenhouse_physics import simulate_hourly, simulate_monthly
 from backend.services.nursery_service import NurseryService
 
 class SimulationService:
+    # seedling_unit_costs 的查價快取 {'stamp': CSV 修改時間, 'prices': {作物名稱: (單價, 來源)}}
+    _seedling_cache = {}
+
     # ... (原本的程式碼)
     @staticmethod
     @st.cache_data
@@ -64,11 +70,14 @@ class SimulationService:
         mat = mat_db.get(gh_specs['material'], {'uValue': 5.8, 'trans': 0.9})
         u_value = mat['uValue']
         trans = mat['trans']
+        # 屋頂幾何透光修正 (12 個月，由太陽位置與屋頂角度算出)
+        trans_coef = gh_specs.get('_trans_coef')
 
         data = []
         total_revenue = 0; total_yield = 0; max_summer_temp = 0
         # ✨ 新增總成本變數
         total_seedling_cost = 0 
+        temp_profile = climate.get('tempProfile')
 
         # 4. 月份迴圈
         for i in range(12):
@@ -77,6 +86,7 @@ class SimulationService:
 
             # --- A. 熱平衡運算 ---
             t_trans = trans * (1 - gh_specs['shadingScreen']/100)
+            if trans_coef is not None: t_trans *= trans_coef[i]
             q_solar = (solar * 1000000 / 43200) * floor_area * t_trans
             
             # 通風量計算
@@ -100,10 +110,11 @@ class SimulationService:
             vpd_in = psy.get_vpd(t_in, rh)
 
             # --- B. 高溫累積模擬 ---
+            # 日變化：有實測曲線 (climate['tempProfile']，12×24 相對日均的偏差) 就用，否則用 ±5°C 正弦
             t_base = t_out + delta_t * 1.5
             h30_base = 0; h35_base = 0; h30_in = 0; h35_in = 0
             for h in range(24):
-                diff = 5 * math.sin((h-9)*math.pi/12)
+                diff = temp_profile[i][h] if temp_profile is not None else 5 * math.sin((h-9)*math.pi/12)
                 if (t_base + diff) >= 30: h30_base += 1
                 if (t_base + diff) >= 35: h35_base += 1
                 if (t_in + diff) >= 30: h30_in += 1
@@ -202,6 +213,93 @@ class SimulationService:
         }
     
 
+    @staticmethod
+    @st.cache_data
+    def run_simulation_vectorized(gh_specs, fan_specs, climate, crops, density, cycles, prices, crop_db, mat_db,
+                                  ventilation='wind'):
+        """
+        run_simulation 的 NumPy 版：12 個月一次以陣列運算 (greenhouse_physics.simulate_monthly)
+        回傳結構與數值都和 run_simulation 相同 (逐位元一致)，可直接替換
+        ventilation='coupled' 時自然通風改用浮力 + 風力耦合模型 (此時與 run_simulation 不同)
+        """
+        unit_costs, sources = SimulationService.seedling_unit_costs(crops, crop_db)
+        r = simulate_monthly(gh_specs, fan_specs, climate, crops, density, cycles, prices, crop_db, mat_db,
+                             seedling_unit_cost=unit_costs, exact=True, ventilation=ventilation)
+        return SimulationService._as_result(r, unit_costs, sources)
+
+    @staticmethod
+    def run_hourly_simulation(gh_specs, fan_specs, hourly, crops, density, cycles, prices, crop_db, mat_db,
+                              fog=None, trans_mh=None, transient=False, ventilation='wind'):
+        """
+        逐時模式：測站全紀錄的每個小時都跑熱平衡 / 通風 / 噴霧 (greenhouse_physics.simulate_hourly，全部陣列運算)
+        hourly: {'Time', 'Temp', 'Solar', 'Wind', 'RH'} 逐時陣列 (例如 HourlyStore 的欄位)
+        fog: {'capacity', 'trigger'}；trans_mh: (12, 24) 屋頂透光修正
+        transient: 室溫用暫態雙節點模型 (地面/作物蓄熱，前一小時的熱量延續到下一小時)
+        ventilation: 自然通風模型 ('wind' / 'coupled')
+        回傳與 run_simulation 相同的結構 (逐月 data 與年度合計皆由逐時結果彙整)，
+        另加 'hourly' (逐時室內外溫度)、'years' (資料年數)、'elapsed' (秒)；有月份完全沒有資料時回傳 None
+        """
+        t0 = time.perf_counter()
+        unit_costs, sources = SimulationService.seedling_unit_costs(crops, crop_db)
+        r = simulate_hourly(gh_specs, fan_specs, hourly, crops, density, cycles, prices, crop_db, mat_db,
+                            seedling_unit_cost=unit_costs, fog=fog, trans_mh=trans_mh, transient=transient,
+                            ventilation=ventilation)
+        if (r['hours'] == 0).any():
+            print(f"⚠️ 逐時資料缺少月份 {[i+1 for i in np.flatnonzero(r['hours'] == 0)]}，無法使用逐時模式")
+            return None
+        out = SimulationService._as_result(r, unit_costs, sources)
+        out.update(hourly=r['hourly'], years=float(r['years']), elapsed=time.perf_counter() - t0)
+        return out
+
+    @staticmethod
+    def _as_result(r, unit_costs, sources):
+        """向量化模型的陣列結果 → run_simulation 的 dict 結構 (Python float)"""
+        cols = {k: np.asarray(r[k]).tolist() for k in ('tempOut', 'tempIn', 'vpd', 'ach', 'yield', 'revenue', 'seedling_cost', 'efficiency',
+                                                    'heat30_Base', 'heat35_Base', 'heat30_In', 'heat35_In')}
+        data = [{
+            'month': i+1, 'cropName': r['cropName'][i],
+            'tempOut': cols['tempOut'][i], 'tempIn': cols['tempIn'][i], 'vpd': cols['vpd'][i],
+            'vIn': 0.5, 'ach': cols['ach'][i],
+            'yield': cols['yield'][i], 'revenue': cols['revenue'][i],
+            'seedling_cost': cols['seedling_cost'][i], 'seedling_source': sources[i], 'seedling_unit_cost': unit_costs[i],
+            'efficiency': cols['efficiency'][i],
+            'heat30_Base': cols['heat30_Base'][i], 'heat35_Base': cols['heat35_Base'][i],
+            'heat30_In': cols['heat30_In'][i], 'heat35_In': cols['heat35_In'][i]
+        } for i in range(12)]
+        return {
+            'data': data,
+            'totalYield': float(r['totalYield']),
+            'totalRevenue': float(r['totalRevenue']),
+            'totalSeedlingCost': float(r['totalSeedlingCost']),
+            'netRevenue': float(r['netRevenue']),
+            'maxSummerTemp': float(r['maxSummerTemp'])
+        }
+
+    @staticmethod
+    def seedling_unit_costs(crops, crop_db):
+        """
+        12 個月的種苗單價與來源 (查 nursery_crops.csv 的 Market_Price_Buy_TWD，找不到用 1.5 元)
+        與 run_simulation 的 D. 育苗成本計算相同，供向量化模型 (greenhouse_physics) 使用
+        每個作物名稱只查一次 CSV，結果依 nursery_crops.csv 的修改時間快取 (批次模擬時不必每次重讀)
+        """
+        base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        data_path = os.path.join(base_dir, 'data')
+        try: stamp = os.stat(os.path.join(data_path, 'biological_data', 'nursery_crops.csv')).st_mtime_ns
+        except OSError: stamp = None
+        cache = SimulationService._seedling_cache
+        if cache.get('stamp') != stamp: cache.clear(); cache.update(stamp=stamp, prices={})
+        prices = cache['prices']
+
+        fallback = list(crop_db.values())[0]
+        names = [crop_db.get(crops[i], fallback)['name'] for i in range(12)]
+        missing = [n for n in dict.fromkeys(names) if n not in prices]
+        if missing:
+            nursery_service = NurseryService(data_path)
+            for name in missing:
+                n_data = nursery_service.get_seedling_cost(name)
+                prices[name] = (float(n_data.get('Market_Price_Buy_TWD', 1.5)), "外部採購 (CSV)") if n_data else (1.5, "預設價格")
+        return [prices[n][0] for n in names], [prices[n][1] for n in names]
+
     def calculate_nursery_business_model(self, crop_name, gh_area_m2):
         """
         模擬【純育苗商業模式】的年獲利
@@ -0,0 +1,121 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+from backend.models.greenhouse_physics import simulate_hourly, simulate_monthly
+
+# 可以逐設計變動的欄位 → 所屬的規格字典
+GH_SWEEP_KEYS = ['width', 'length', 'gutterHeight', 'material', 'roofVentArea', 'sideVentArea',
+                 'shadingScreen', 'insectNet', '_vol_coef', '_surf_coef', '_vent_eff', '_vent_struct']
+FAN_SWEEP_KEYS = ['exhaustCount', 'exhaustFlow', 'circCount']
+# 結果表的欄位
+SWEEP_RESULTS = ['totalYield', 'totalRevenue', 'netRevenue', 'maxSummerTemp']
+# 逐時批次每塊的設計數上限 (每塊約 設計數 × 時數 × 十幾個 float64 陣列)
+HOURLY_CHUNK_DESIGNS = 64
+
+
+def design_specs(designs, gh_specs, fan_specs):
+    """
+    設計表 → 批次用的 (gh_specs, fan_specs)：表上有的欄位換成 (設計數, 1) 陣列，其餘沿用基準設計
+    _vent_eff 與防蟲網開孔率成正比 (app 的公式)，只改 insectNet 時依比例換算
+    """
+    n = len(designs)
+    gh, fan = dict(gh_specs), dict(fan_specs)
+    for col in designs.columns:
+        values = designs[col].to_numpy()
+        values = values.astype(str) if col == 'material' else values.astype('float64')
+        column = values.reshape(n, 1)
+        if col in GH_SWEEP_KEYS: gh[col] = column
+        else: fan[col] = column
+    if 'insectNet' in designs.columns and '_vent_eff' not in designs.columns and gh_specs.get('insectNet'):
+        gh['_vent_eff'] = gh_specs.get('_vent_eff', 1.0) * gh['insectNet'] / gh_specs['insectNet']
+    return gh, fan
+
+
+def _evaluate_chunk(job):
+    """(子行程用) 一塊設計：向量化月模擬 (或逐時模擬) → 各設計的年度指標 (設計數, 指標數)"""
+    designs, gh_specs, fan_specs, climate, crops, density, cycles, prices, crop_db, mat_db, unit_cost, exact, hourly, ventilation = job
+    gh, fan = design_specs(designs, gh_specs, fan_specs)
+    if hourly is not None:
+        result = simulate_hourly(gh, fan, hourly['record'], crops, density, cycles, prices, crop_db, mat_db,
+                                 seedling_unit_cost=unit_cost, fog=hourly.get('fog'), trans_mh=hourly.get('trans_mh'),
+                                 transient=hourly.get('transient', False), ventilation=ventilation)
+    else:
+        result = simulate_monthly(gh, fan, climate, crops, density, cycles, prices, crop_db, mat_db,
+                                  seedling_unit_cost=unit_cost, exact=exact, ventilation=ventilation)
+    return np.stack([np.broadcast_to(result[k], (len(designs),)) for k in SWEEP_RESULTS], axis=-1)
+
+
+class SweepService:
+    """
+    批次設計比較：同一個場址/作物計畫下，一次評估數百~數萬組 gh_specs / fan_specs 組合
+    - 設計表 (DataFrame 或結構化陣列) 每列一個設計，欄位名稱同 gh_specs / fan_specs 的鍵
+    - 所有設計以 (設計數, 12) 陣列一次模擬；設計很多時分塊，可用行程池平行
+    """
+    def __init__(self, sim_svc=None):
+        self.sim_svc = sim_svc
+
+    @staticmethod
+    def to_frame(designs):
+        """DataFrame / 結構化陣列 / dict 清單 → DataFrame，並檢查欄位"""
+        df = designs if isinstance(designs, pd.DataFrame) else pd.DataFrame(designs)
+        unknown = [c for c in df.columns if c not in GH_SWEEP_KEYS + FAN_SWEEP_KEYS]
+        if unknown: raise ValueError(f"未知的設計欄位: {unknown}")
+        return df.reset_index(drop=True)
+
+    def run(self, designs, gh_specs, fan_specs, climate, crops, density, cycles, prices, crop_db, mat_db,
+            chunk_designs=5000, workers=1, exact=False, pool=None, hourly=None, ventilation='wind'):
+        """
+        designs: 設計表；gh_specs / fan_specs: 基準設計 (表上沒有的欄位沿用)；其餘參數同 run_simulation
+        exact: VPD 逐點用 PsychroModel 計算 (結果與 run_simulation 逐位元相同，較慢)
+        pool: 已開好的行程池 (多次呼叫共用，省去每次啟動子行程的時間)；給了就忽略 workers
+        hourly: 改用測站逐時紀錄評估 {'record': {'Time','Temp','Solar','Wind','RH'}, 'fog', 'trans_mh',
+                'transient': 暫態熱慣性模型}；每塊設計一次以 (設計數, 時數) 陣列推進，塊大小不超過 HOURLY_CHUNK_DESIGNS
+        ventilation: 自然通風模型 ('wind' / 'coupled'，見 greenhouse_physics.VENTILATION_MODELS)
+        回傳 DataFrame：設計欄位 + totalYield / totalRevenue / netRevenue / maxSummerTemp，
+        df.attrs['elapsed'] 為計算秒數
+        """
+        df = self.to_frame(designs)
+        t0 = time.perf_counter()
+        unit_cost = self.seedling_unit_costs(crops, crop_db)
+        # 月摘要只取模擬用得到的欄位 (避免把整份摘要送進子行程)
+        climate = {k: climate[k] for k in ('temps', 'solar', 'wind', 'humidities', 'tempProfile') if climate.get(k) is not None}
+        if hourly is not None: chunk_designs = min(chunk_designs, HOURLY_CHUNK_DESIGNS)
+        jobs = [(df.iloc[s:s + chunk_designs], gh_specs, fan_specs, climate, crops, density, cycles, prices,
+                 crop_db, mat_db, unit_cost, exact, hourly, ventilation) for s in range(0, len(df), chunk_designs)]
+
+        workers = workers if workers else (os.cpu_count() or 1)
+        parts = None
+        if pool is not None and len(jobs) > 1:
+            try: parts = list(pool.map(_evaluate_chunk, jobs))
+            except Exception as e:
+                print(f"⚠️ 平行批次模擬失敗，改用單執行緒: {e}")
+                parts = None
+        elif workers > 1 and len(jobs) > 1:
+            try:
+                with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+                    parts = list(pool.map(_evaluate_chunk, jobs))
+            except Exception as e:
+                print(f"⚠️ 平行批次模擬失敗，改用單執行緒: {e}")
+                parts = None
+        if parts is None: parts = [_evaluate_chunk(job) for job in jobs]
+
+        values = np.concatenate(parts) if parts else np.zeros((0, len(SWEEP_RESULTS)))
+        out = pd.concat([df, pd.DataFrame(values, columns=SWEEP_RESULTS)], axis=1)
+        out.attrs['elapsed'] = time.perf_counter() - t0
+        return out
+
+    def seedling_unit_costs(self, crops, crop_db):
+        if self.sim_svc is None:
+            from backend.services.simulation_service import SimulationService
+            return SimulationService.seedling_unit_costs(crops, crop_db)[0]
+        return self.sim_svc.seedling_unit_costs(crops, crop_db)[0]
+
+    @staticmethod
+    def grid(**axes):
+        """各欄位取值的全組合 → 設計表，例如 grid(exhaustCount=[20, 40], shadingScreen=[30, 50])"""
+        if not axes: return pd.DataFrame()
+        mesh = np.meshgrid(*[np.asarray(v, dtype=object) for v in axes.values()], indexing='ij')
+        return pd.DataFrame({k: m.ravel() for k, m in zip(axes, mesh)})
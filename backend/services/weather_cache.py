@@ -0,0 +1,72 @@
+import os
+import shutil
+import hashlib
+import numpy as np
+
+# 快取格式版本：欄位對應規則改變時請 +1，舊快取會自動失效
+CACHE_VERSION = 3
+
+
+class WeatherCache:
+    """
+    氣象 CSV 解析結果的磁碟快取 (.npz)
+    以「絕對路徑 + 檔案大小 + 修改時間」當作鍵，原始檔一有變動就自動重新解析。
+    """
+    def __init__(self, cache_folder='data/cache/weather'):
+        self.cache_folder = cache_folder
+
+    def fingerprint(self, path):
+        """檔案指紋：路徑|大小|mtime(ns)|版本"""
+        st = os.stat(path)
+        return f"{os.path.abspath(path)}|{st.st_size}|{st.st_mtime_ns}|v{CACHE_VERSION}"
+
+    def _cache_path(self, path, kind):
+        digest = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.cache_folder, f"{digest}.{kind}.npz")
+
+    def artifact_dir(self, path, kind):
+        """其他衍生資料 (例如 mmap 逐時檔) 的專屬資料夾"""
+        return os.path.splitext(self._cache_path(path, kind))[0]
+
+    def discard(self, path):
+        """刪除某個原始檔的所有快取 (.npz 與衍生資料夾)；原始檔被移除時使用"""
+        prefix = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()[:16] + '.'
+        if not os.path.isdir(self.cache_folder): return
+        for name in os.listdir(self.cache_folder):
+            if not name.startswith(prefix): continue
+            target = os.path.join(self.cache_folder, name)
+            try:
+                if os.path.isdir(target): shutil.rmtree(target, ignore_errors=True)
+                else: os.remove(target)
+            except OSError: pass
+
+    def load(self, path, kind='station'):
+        """讀取快取；指紋不符或檔案不存在時回傳 None"""
+        cache_path = self._cache_path(path, kind)
+        if not os.path.exists(cache_path): return None
+        try:
+            key = self.fingerprint(path)
+            with np.load(cache_path, allow_pickle=False) as npz:
+                if str(npz['__key__']) != key: return None
+                names = [str(n) for n in npz['__names__']]
+                return {name: npz[f"col_{i}"] for i, name in enumerate(names)}
+        except Exception:
+            return None
+
+    def save(self, path, columns, kind='station'):
+        """寫入快取 (欄位名稱另存，避免 '/' 等字元無法當作 npz 鍵)"""
+        try:
+            os.makedirs(self.cache_folder, exist_ok=True)
+            cache_path = self._cache_path(path, kind)
+            arrays = {f"col_{i}": np.asarray(v) for i, v in enumerate(columns.values())}
+            arrays['__names__'] = np.array(list(columns.keys()), dtype=str)
+            arrays['__key__'] = np.array(self.fingerprint(path))
+            # 先寫暫存檔再取代，避免平行寫入時讀到半成品
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as fh:
+                np.savez(fh, **arrays)
+            os.replace(tmp_path, cache_path)
+            return True
+        except Exception as e:
+            print(f"⚠️ 快取寫入失敗 ({os.path.basename(path)}): {e}")
+            return False